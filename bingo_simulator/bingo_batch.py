@@ -0,0 +1,255 @@
+"""Vectorized NumPy engines that play BINGO games in large blocks instead of one game at a time."""
+
+from functools import lru_cache
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_factory
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_monitor import NULL_TIMER
+
+DEFAULT_BATCH_SIZE = 100000
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_pattern_matrix(geometry=None):
+    """Returns the win patterns as a cell/pattern incidence matrix, plus the number of cells in each pattern.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray, np.ndarray) a (num_cells, num_patterns) matrix where [c, p] is 1 if cell c belongs to
+    pattern p, and a (num_patterns,) array of the number of cells in each pattern.  Patterns are in
+    geometry.win_patterns order.  Both are cached per geometry, do not modify them."""
+
+    geometry = bc.as_geometry(geometry)
+    pattern_matrix = np.zeros((geometry.num_cells, len(geometry.win_patterns)), dtype=np.int8)
+
+    for p, (_, _, cells) in enumerate(geometry.win_patterns):
+        pattern_matrix[list(cells), p] = 1
+
+    return pattern_matrix, pattern_matrix.sum(axis=0, dtype=np.int8)
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_pattern_cells(geometry=None):
+    """Returns the cells of each win pattern as a rectangular array, for gathering per-cell values by pattern.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int array of shape (num_patterns, largest pattern size), in geometry.win_patterns order.
+    Smaller patterns are padded with the index num_cells, one past the last cell, for a padding value to be gathered.
+    Cached per geometry, do not modify it."""
+
+    geometry = bc.as_geometry(geometry)
+    max_size = max(len(cells) for _, _, cells in geometry.win_patterns)
+    pattern_cells = np.full((len(geometry.win_patterns), max_size), geometry.num_cells, dtype=np.intp)
+
+    for p, (_, _, cells) in enumerate(geometry.win_patterns):
+        pattern_cells[p, :len(cells)] = cells
+
+    return pattern_cells
+
+
+# ------------------------------------------------------------------------
+
+def generate_cards(num_cards, free_cell, rng, geometry=None):
+    """Generates a block of random BINGO cards, each column sampled without replacement from its column range.
+    :param: num_cards (int) The number of cards to generate
+    :param: free_cell (bool) Is the center cell considered free?  Free cells hold the number 0.
+    :param: rng (np.random.Generator) The random number generator to use
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (num_cards, card_length, card_length)"""
+
+    bounds = bingo_factory.get_sample_bounds(geometry)
+    samples = rng.integers(0, bounds, size=(num_cards,) + bounds.shape)
+    return bingo_factory.build_cards(samples, free_cell, geometry)
+
+
+# ------------------------------------------------------------------------
+
+def generate_draws(num_games, rng, geometry=None):
+    """Generates a block of random bingo ball draw orders.
+    :param: num_games (int) The number of draw orders to generate
+    :param: rng (np.random.Generator) The random number generator to use
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (num_games, num_balls), each row a permutation of 1..num_balls"""
+
+    num_balls = bc.as_geometry(geometry).num_balls
+    return (rng.random((num_games, num_balls)).argsort(axis=1) + 1).astype(np.int8)
+
+
+# ------------------------------------------------------------------------
+
+def find_bingo(cards, draws, timer=NULL_TIMER, geometry=None, return_completion=False):
+    """Plays every card against its draw order, ball by ball, and finds the first BINGO of each game.
+    :param: cards (np.ndarray) int array of shape (N, card_length, card_length), 0 for a free (marked) cell
+    :param: draws (np.ndarray) int array of shape (N, num_balls)
+    :param: timer (PhaseTimer) Times the marking and win_check phases (default: no timing)
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :param: return_completion (bool) Also return the ball each pattern completes on (default: False).  Marking
+    stops at each game's BINGO, so these come from the draw ranks, see get_completion_ranks().
+    :return: (np.ndarray, np.ndarray) the number of bingo balls called to get BINGO and the index into
+    geometry.win_patterns of the winning pattern, both of shape (N,).  Simultaneous wins are credited to the first
+    pattern in win_patterns, the same as check_traditional_bingo().  With return_completion, a third int8 array of
+    shape (N, num_patterns) of the ball on which each pattern completes."""
+
+    geometry = bc.as_geometry(geometry)
+    num_games = cards.shape[0]
+    num_balls = geometry.num_balls
+    cards = cards.reshape(num_games, geometry.num_cells)
+    pattern_matrix, pattern_sizes = get_pattern_matrix(geometry)
+
+    # Inverse index: cell_of[n, ball] is the cell holding that ball on card n, or -1 if it is not on the card
+    cell_of = np.full((num_games, num_balls + 1), -1, dtype=np.int8)
+    cell_of[np.arange(num_games)[:, np.newaxis], cards] = np.arange(geometry.num_cells, dtype=np.int8)
+    cell_of[:, 0] = -1
+
+    marks = cards == 0
+    num_bingo_balls = np.zeros(num_games, dtype=np.int8)
+    win_pattern = np.full(num_games, -1, dtype=np.int8)
+    active = np.arange(num_games)
+
+    for ball_index in range(0, num_balls):
+        if active.size == 0:
+            break
+
+        cells = cell_of[active, draws[active, ball_index]]
+        hit = cells >= 0
+        games = active[hit]
+        marks[games, cells[hit]] = True
+        timer.lap('marking')
+
+        # Only cards with a newly marked cell can have a new BINGO
+        complete = (marks[games].astype(np.int8) @ pattern_matrix) == pattern_sizes
+        won = complete.any(axis=1)
+        winners = games[won]
+
+        num_bingo_balls[winners] = ball_index + 1
+        win_pattern[winners] = complete[won].argmax(axis=1)
+        active = active[win_pattern[active] < 0]
+        timer.lap('win_check')
+
+    if return_completion:
+        completion = get_completion_ranks(cards, get_draw_ranks(draws), geometry)
+        timer.lap('win_check')
+        return num_bingo_balls, win_pattern, completion
+
+    return num_bingo_balls, win_pattern
+
+
+# ------------------------------------------------------------------------
+
+def get_draw_ranks(draws):
+    """Inverts draw orders into the ball on which each number is drawn.
+    :param: draws (np.ndarray) int array of shape (N, num_balls)
+    :return: (np.ndarray) int8 array of shape (N, num_balls + 1), [n, ball] being the number of bingo balls called
+    when ball is drawn in draw n.  [n, 0] is 0, so a free cell (number 0) counts as marked before the first ball."""
+
+    num_balls = draws.shape[1]
+    ranks = np.zeros((draws.shape[0], num_balls + 1), dtype=np.int8)
+    ranks[np.arange(draws.shape[0])[:, np.newaxis], draws] = np.arange(1, num_balls + 1, dtype=np.int8)
+
+    return ranks
+
+
+# ------------------------------------------------------------------------
+
+def get_completion_ranks(cards, ranks, geometry=None):
+    """Finds the bingo ball on which each win pattern of each card completes: the largest rank of its cells.
+    :param: cards (np.ndarray) int array of shape (..., num_cells), the numbers of each card, row by row
+    :param: ranks (np.ndarray) int8 array of shape (..., num_balls + 1) from get_draw_ranks(), broadcasting against
+    the leading dimensions of cards, e.g. (N, 1, num_balls + 1) to play N draws against (N, K) cards
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (..., num_patterns), in geometry.win_patterns order"""
+
+    # Rank of each card cell, plus an always-marked padding cell for patterns smaller than a line
+    cell_ranks = np.take_along_axis(ranks, cards.astype(np.intp), axis=-1)
+    cell_ranks = np.concatenate([cell_ranks, np.zeros(cell_ranks.shape[:-1] + (1,), dtype=np.int8)], axis=-1)
+
+    return cell_ranks[..., get_pattern_cells(geometry)].max(axis=-1)
+
+
+# ------------------------------------------------------------------------
+
+def find_bingo_ranks(cards, draws, timer=NULL_TIMER, geometry=None, return_completion=False):
+    """Finds the first BINGO of each game from the draw order alone, without marking the cards ball by ball.  A cell
+    is marked on the ball its number is drawn (its rank in the draw), a pattern completes on the largest rank of its
+    cells, and the game ends on the smallest completion rank over all patterns.
+    :param: cards (np.ndarray) int array of shape (N, card_length, card_length), 0 for a free (marked) cell
+    :param: draws (np.ndarray) int array of shape (N, num_balls)
+    :param: timer (PhaseTimer) Times the marking (draw ranks) and win_check phases (default: no timing)
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :param: return_completion (bool) Also return the ball each pattern completes on, computed anyway (default:
+    False)
+    :return: (np.ndarray, np.ndarray) the same as find_bingo()"""
+
+    geometry = bc.as_geometry(geometry)
+    ranks = get_draw_ranks(draws)
+    timer.lap('marking')
+
+    completion = get_completion_ranks(cards.reshape(cards.shape[0], geometry.num_cells), ranks, geometry)
+    num_bingo_balls = completion.min(axis=1)
+    win_pattern = (completion == num_bingo_balls[:, np.newaxis]).argmax(axis=1).astype(np.int8)
+    timer.lap('win_check')
+
+    if return_completion:
+        return num_bingo_balls, win_pattern, completion
+
+    return num_bingo_balls, win_pattern
+
+
+# ------------------------------------------------------------------------
+
+def count_tries(num_bingo_balls, win_pattern, geometry=None):
+    """Builds the tries histogram of a block of games.
+    :param: num_bingo_balls (np.ndarray) The number of bingo balls each game took to get BINGO
+    :param: win_pattern (np.ndarray) The index into geometry.win_patterns of each game's winning pattern
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int64 matrix of shape (len(win_patterns), num_tries), see BingoStats.add_tries()"""
+
+    geometry = bc.as_geometry(geometry)
+    num_patterns, num_tries = len(geometry.win_patterns), geometry.num_tries
+
+    flat_index = win_pattern.astype(np.int64) * num_tries + num_bingo_balls
+    tries = np.bincount(flat_index, minlength=num_patterns * num_tries)
+
+    return tries.reshape(num_patterns, num_tries)
+
+
+# ------------------------------------------------------------------------
+
+def play_bingo_batch(stats, free_cell, num_games, batch_size=DEFAULT_BATCH_SIZE, seed_key=None, first_game=0,
+                     detect=find_bingo, timer=NULL_TIMER):
+    """Plays BINGO num_games times in blocks of batch_size games and adds the results to stats.  Game g plays card
+    and draw g of the seed key (see bingo_rng.py), so the results do not depend on batch_size or on how a run is
+    split in calls.
+    :param: stats (BingoStats) class, whose geometry is the card layout played
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: num_games (int) The number of games to play
+    :param: batch_size (int) The number of games to play per block (bounds memory use)
+    :param: seed_key (int) The seed key of the run, see bingo_rng.get_seed_key() (default: a fresh random one)
+    :param: first_game (int) The index of the first game to play (default: 0)
+    :param: detect (function) Finds the BINGO of each game of a block: find_bingo (default, ball by ball marking) or
+    find_bingo_ranks (completion ranks).  Both give the same results for the same cards and draws.  Besides the first
+    BINGO, the ball every pattern completes on is recorded, see BingoStats.add_completions().
+    :param: timer (PhaseTimer) Times the phases of each block (default: no timing)
+    :return: None"""
+
+    if seed_key is None:
+        seed_key = bingo_rng.get_seed_key()
+
+    geometry = stats.geometry
+
+    for block_start in range(first_game, first_game + num_games, batch_size):
+        games = np.arange(block_start, min(block_start + batch_size, first_game + num_games))
+        timer.lap()
+
+        cards = bingo_rng.generate_cards(seed_key, games, free_cell, geometry)
+        timer.lap('cards')
+        draws = bingo_rng.generate_draws(seed_key, games, geometry)
+        timer.lap('draws')
+
+        num_bingo_balls, win_pattern, completion = detect(cards, draws, timer, geometry, return_completion=True)
+
+        stats.add_tries(count_tries(num_bingo_balls, win_pattern, geometry))
+        stats.add_completions(completion, num_bingo_balls)
+        timer.lap('stats')
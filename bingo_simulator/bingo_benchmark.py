@@ -0,0 +1,265 @@
+"""Benchmarks of BINGO card generation, win checks and full simulation runs, to catch performance regressions.
+
+Run the suite and save its results as JSON, then compare a later run against that baseline:
+    python -m bingo_simulator.bingo_benchmark run --output baseline.json
+    python -m bingo_simulator.bingo_benchmark run --output current.json
+    python -m bingo_simulator.bingo_benchmark compare baseline.json current.json
+compare exits with status 1 if any benchmark got slower (or used more memory) than the tolerance allows."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator.bingo_simulator_main import BingoSimulator, BingoStats, ENGINES
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.10  # Relative slowdown (or memory growth) flagged as a regression
+
+# Seed of the benchmark runs, so every run plays the same games
+BENCHMARK_SEED = 2022
+
+
+# ------------------------------------------------------------------------
+
+def time_call(func, repeat=DEFAULT_REPEAT):
+    """Times a function, calling it enough times per measurement (at least 0.2 s) to be above the timer resolution.
+    :param: func (function) Called with no arguments
+    :param: repeat (int) The number of measurements, the best one is kept
+    :return: (float) the best number of seconds per call"""
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat, number)) / number
+
+
+# ------------------------------------------------------------------------
+
+def get_peak_memory(func):
+    """Measures the peak memory allocated while calling a function, NumPy arrays included.
+    :param: func (function) Called once with no arguments
+    :return: (int) the peak number of bytes allocated above the memory in use before the call"""
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak - baseline
+
+
+# ------------------------------------------------------------------------
+
+def get_check_card():
+    """Returns a card for the win check benchmarks: half its cells marked but no pattern complete, so every check
+    goes through all of its patterns.
+    :param: None
+    :return: (BingoCard) class"""
+
+    card = bc.BingoCard(False, bc.random.Random(BENCHMARK_SEED))
+    for row in range(0, bc.CARD_LENGTH):
+        for col in range(0, bc.CARD_LENGTH):
+            if (row + col) % 2 == 1:
+                card.bingo_card[row][col][True] = True
+
+    return card
+
+
+# ------------------------------------------------------------------------
+
+def get_card_benchmarks():
+    """Returns the micro benchmarks of a single card: construction and each win check.
+    :param: None
+    :return: (dict) of benchmark name to function"""
+
+    card = get_check_card()
+    stats = BingoStats(1)
+    card_rng = bc.random.Random(BENCHMARK_SEED)
+
+    benchmarks = {
+        'card_construction': lambda: bc.BingoCard(False, card_rng),
+        'card_construction_free_cell': lambda: bc.BingoCard(True, card_rng),
+        'check_diagonal_bingo': lambda: card._check_diagonal_bingo(1, stats),
+        'check_corners_bingo': lambda: card._check_corners_bingo(stats),
+        'check_traditional_bingo': lambda: card.check_traditional_bingo(stats, 1),
+    }
+
+    for axis, name in [(0, 'row'), (1, 'col')]:
+        benchmarks[f'check_line_bingo_{name}'] = lambda axis=axis: card._check_line_bingo(axis, 0, stats)
+
+    return benchmarks
+
+
+# ------------------------------------------------------------------------
+
+def run_benchmarks(sizes=None, engines=None, repeat=DEFAULT_REPEAT, memory=True):
+    """Runs the benchmark suite.
+    :param: sizes (list) The numbers of games of the play_bingo benchmarks (default: DEFAULT_SIZES)
+    :param: engines (list) The engines of the play_bingo benchmarks (default: all bingo_simulator_main.ENGINES)
+    :param: repeat (int) The number of measurements of each benchmark, the best one is kept
+    :param: memory (bool) Measure the peak memory of the play_bingo benchmarks (one more run each)
+    :return: (dict) with keys 'meta' (run environment) and 'results', a dict of benchmark name to a dict of
+    'seconds' (per call), 'ops_per_sec' (calls, or games for play_bingo, per second) and 'peak_memory' (bytes, None
+    if not measured)"""
+
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+    if engines is None:
+        engines = ENGINES
+
+    results = {}
+
+    for name, func in get_card_benchmarks().items():
+        seconds = time_call(func, repeat)
+        results[name] = {'seconds': seconds, 'ops_per_sec': 1.0 / seconds, 'peak_memory': None}
+
+    for engine in engines:
+        for num_games in sizes:
+
+            def play_bingo():
+                BingoSimulator(num_games, BENCHMARK_SEED).play_bingo(False, engine)
+
+            seconds = min(timeit.repeat(play_bingo, repeat=repeat, number=1))
+            results[f'play_bingo_{engine}_{num_games}'] = {
+                'seconds': seconds, 'ops_per_sec': num_games / seconds,
+                'peak_memory': get_peak_memory(play_bingo) if memory else None}
+
+    meta = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(), 'processor': platform.processor()}
+
+    return {'meta': meta, 'results': results}
+
+
+# ------------------------------------------------------------------------
+
+def save_results(results, path):
+    """Saves benchmark results as JSON.
+    :param: results (dict) as returned by run_benchmarks()
+    :param: path (str) The JSON file path
+    :return: None"""
+
+    with open(path, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+# ------------------------------------------------------------------------
+
+def load_results(path):
+    """Loads benchmark results saved by save_results().
+    :param: path (str) The JSON file path
+    :return: (dict) as returned by run_benchmarks()"""
+
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+# ------------------------------------------------------------------------
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Compares benchmark results against a baseline.  Only benchmarks in both are compared.
+    :param: baseline (dict) as returned by run_benchmarks() or load_results()
+    :param: current (dict) as returned by run_benchmarks() or load_results()
+    :param: tolerance (float) The relative slowdown or memory growth allowed, e.g. 0.1 for 10%
+    :return: (list) of tuples (benchmark name, metric, baseline value, current value, relative change, regression),
+    one per metric of each benchmark, the relative change being positive when worse and regression True when it is
+    worse than the tolerance"""
+
+    comparisons = []
+
+    for name, base in baseline['results'].items():
+        if name not in current['results']:
+            continue
+        cur = current['results'][name]
+
+        change = base['ops_per_sec'] / cur['ops_per_sec'] - 1.0
+        comparisons.append((name, 'ops_per_sec', base['ops_per_sec'], cur['ops_per_sec'], change, change > tolerance))
+
+        if base.get('peak_memory') and cur.get('peak_memory') is not None:
+            change = cur['peak_memory'] / base['peak_memory'] - 1.0
+            comparisons.append((name, 'peak_memory', base['peak_memory'], cur['peak_memory'], change,
+                                change > tolerance))
+
+    return comparisons
+
+
+# ------------------------------------------------------------------------
+
+def print_results(results):
+    """Prints benchmark results to the console.
+    :param: results (dict) as returned by run_benchmarks() or load_results()
+    :return: None"""
+
+    for name, result in results['results'].items():
+        memory = '' if result['peak_memory'] is None else f", peak memory {result['peak_memory'] / 2**20:,.1f} MiB"
+        print(f"{name}: {result['ops_per_sec']:,.0f}/s ({result['seconds'] * 1e6:,.2f} us){memory}")
+
+
+# ------------------------------------------------------------------------
+
+def print_comparison(comparisons, tolerance=DEFAULT_TOLERANCE):
+    """Prints a comparison against a baseline to the console, flagging the regressions.
+    :param: comparisons (list) as returned by compare_results()
+    :param: tolerance (float) The relative slowdown or memory growth allowed, for the summary line
+    :return: (int) the number of regressions"""
+
+    num_regressions = 0
+
+    for name, metric, base, cur, change, regression in comparisons:
+        num_regressions += regression
+        flag = 'REGRESSION ' if regression else ''
+
+        print(f"{flag}{name} {metric}: {base:,.0f} -> {cur:,.0f} ({100.0 * change:+.1f}% worse)")
+
+    print(f"\n{num_regressions} regression(s) above {100.0 * tolerance:.0f}%")
+
+    return num_regressions
+
+
+# ------------------------------------------------------------------------
+
+def main(argv=None):
+    """Runs the benchmark command line.
+    :param: argv (list) The command line arguments (default: sys.argv[1:])
+    :return: (int) the exit status, 1 if compare found regressions"""
+
+    parser = argparse.ArgumentParser(description='Benchmarks of the BINGO simulator.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--output', help='Save the results to this JSON file')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Numbers of games')
+    run_parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES, help='Engines to run')
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Measurements per benchmark')
+    run_parser.add_argument('--no-memory', action='store_true', help='Do not measure peak memory')
+
+    compare_parser = commands.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline', help='Baseline results JSON file')
+    compare_parser.add_argument('current', help='Current results JSON file')
+    compare_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                                help='Relative slowdown or memory growth allowed (default: 0.1)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.sizes, args.engines, args.repeat, not args.no_memory)
+        print_results(results)
+        if args.output:
+            save_results(results, args.output)
+        return 0
+
+    comparisons = compare_results(load_results(args.baseline), load_results(args.current), args.tolerance)
+    return 1 if print_comparison(comparisons, args.tolerance) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,52 +1,450 @@
 """Contains a class to host a bingo card, plus checking for each type of bingo win."""
 
-import math
 import random
-import copy
+from array import array
 
 # Typical BINGO card layout
 CARD_LENGTH = 5  # 5x5 square card
 COLUMN_RANGE = 15  # 15 numbers per column to choose from
 
+# Card numbers are held as signed bytes
+MAX_NUM_BALLS = 127
 
-class BingoCard:
-    """A bingo card class, defined by the constants CARD_LENGTH and COLUMN_RANGE.  Contains a bingo card, plus
-    all the available BINGO numbers to select from.  Each cell in a 2D bingo card is a list[int, bool], where
-    the int is the random number for the bingo cell and the bool is if this cell is marked (dabbed, True) or not
-    (False)"""
 
-    def __init__(self, free_cell):
+def get_win_patterns(card_length=CARD_LENGTH):
+    """Returns the traditional BINGO win patterns in the order check_traditional_bingo() credits them.
+    :param: card_length (int) The number of rows and columns of the card (default: CARD_LENGTH)
+    :return: (list) of tuples (kind, line_num, cells), where kind is 'corners', 'row', 'col' or 'diag', line_num is
+    the row/col/diagonal number (None for corners) and cells is a tuple of flattened cell indices (row * card_length +
+    col) making up the pattern."""
+
+    corner_index = card_length - 1
+    patterns = [('corners', None, (0, corner_index, corner_index * card_length, corner_index * card_length +
+                                   corner_index))]
+
+    for i in range(0, card_length):
+        if i == 1:
+            patterns.append(('diag', i, tuple(j * card_length + j for j in range(0, card_length))))
+        elif i == 2:
+            patterns.append(('diag', i, tuple(j * card_length + card_length - 1 - j for j in range(0, card_length))))
+
+        patterns.append(('row', i, tuple(i * card_length + j for j in range(0, card_length))))
+        patterns.append(('col', i, tuple(j * card_length + i for j in range(0, card_length))))
+
+    return patterns
+
+
+def get_cells_mask(cells):
+    """Returns the bitmask of a set of cells, bit (row * CARD_LENGTH + col) being set for each cell.
+    :param: cells (iterable) of flattened cell indices
+    :return: (int) bitmask"""
+
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+
+    return mask
+
+
+def get_column_labels(card_length=CARD_LENGTH):
+    """Returns the column headers of a card: the letters of BINGO for 5 columns, the column numbers otherwise.
+    :param: card_length (int) The number of columns of the card (default: CARD_LENGTH)
+    :return: (list) of str, one per column"""
+
+    if card_length == len('BINGO'):
+        return list('BINGO')
+
+    return [str(i + 1) for i in range(0, card_length)]
+
+
+def get_square_patterns(card_length):
+    """Returns the postage stamp win patterns: a 2x2 square in any corner of the card.
+    :param: card_length (int) The number of rows and columns of the card
+    :return: (list) of tuples (kind, line_num, cells), see get_win_patterns().  line_num numbers the corners in
+    reading order: top left, top right, bottom left, bottom right."""
+
+    far = card_length - 2
+    corners = [(0, 0), (0, far), (far, 0), (far, far)]
+
+    return [('postage_stamp', i, tuple((row + r) * card_length + col + c for r in [0, 1] for c in [0, 1]))
+            for i, (row, col) in enumerate(corners)]
+
+
+def get_diamond_cells(card_length, radius):
+    """Returns the cells of a diamond around the center of the card, for cards of odd dimensions only.
+    :param: card_length (int) The number of rows and columns of the card
+    :param: radius (int) The distance (in rows plus columns) of the diamond cells from the center
+    :return: (tuple) of flattened cell indices, empty for cards of even dimensions"""
+
+    if card_length % 2 == 0:
+        return ()
+
+    mid = card_length // 2
+    return tuple(row * card_length + col for row in range(0, card_length) for col in range(0, card_length)
+                 if abs(row - mid) + abs(col - mid) == radius)
+
+
+def get_registry_patterns(name, cells):
+    """Returns the single win pattern of a registered pattern, or none if it does not fit the card.
+    :param: name (str) The pattern name, also its kind
+    :param: cells (iterable) of flattened cell indices
+    :return: (list) of tuples (kind, line_num, cells), see get_win_patterns()"""
+
+    cells = tuple(sorted(set(cells)))
+    return [(name, None, cells)] if cells else []
+
+
+# Win patterns by name, each a function of card_length returning its patterns in priority order, as tuples (kind,
+# line_num, cells), see get_win_patterns().  Patterns are compiled to masks once per CardGeometry.
+WIN_PATTERN_REGISTRY = {
+    'traditional': get_win_patterns,
+    'blackout': lambda card_length: get_registry_patterns('blackout', range(0, card_length * card_length)),
+    'x': lambda card_length: get_registry_patterns('x', [i * card_length + j for i in range(0, card_length)
+                                                         for j in [i, card_length - 1 - i]]),
+    'postage_stamp': get_square_patterns,
+    'small_diamond': lambda card_length: get_registry_patterns('small_diamond', get_diamond_cells(card_length, 1)),
+    'large_diamond': lambda card_length: get_registry_patterns('large_diamond',
+                                                               get_diamond_cells(card_length, card_length // 2)),
+    'frame': lambda card_length: get_registry_patterns('frame', [i * card_length + j for i in range(0, card_length)
+                                                                 for j in range(0, card_length)
+                                                                 if i in [0, card_length - 1]
+                                                                 or j in [0, card_length - 1]]),
+}
+
+# The win patterns played by default: rows, columns, diagonals and corners
+DEFAULT_PATTERNS = ('traditional',)
+
+# Kinds of the traditional win patterns, which have their own BingoStats columns
+TRADITIONAL_KINDS = ('corners', 'row', 'col', 'diag')
+
+
+def register_win_pattern(name, get_patterns):
+    """Registers a new kind of win pattern, for card geometries to play it with get_geometry(patterns=...).
+    :param: name (str) The pattern name, not registered yet
+    :param: get_patterns (function) Called with card_length, returns the patterns (one per placement on the card)
+    in priority order, as tuples (name, line_num, cells) where cells is a tuple of flattened cell indices (row *
+    card_length + col) and line_num numbers the placements (None if there is only one), or [] if the pattern does
+    not fit cards of that size
+    :return: None"""
+
+    if name in WIN_PATTERN_REGISTRY:
+        raise ValueError(f'Win pattern {name} is already registered in register_win_pattern().')
+
+    WIN_PATTERN_REGISTRY[name] = get_patterns
+
+
+class CardGeometry:
+    """The layout of a BINGO card, card_length x card_length cells with column_range numbers to choose from per
+    column, the win patterns played on it, plus the tables precomputed from them.  Get geometries from get_geometry(),
+    which builds each one once per process and caches it by its key, (card_length, column_range, patterns).
+    Geometries compare and hash by key, so they can key caches of further tables (e.g. functools.lru_cache)."""
+
+    def __init__(self, card_length, column_range, patterns=DEFAULT_PATTERNS):
+        """:param: card_length (int) The number of rows and columns, at least 3 (for the diagonals and corners)
+        :param: column_range (int) The number of numbers per column, at least card_length
+        :param: patterns (tuple) The names of the WIN_PATTERN_REGISTRY patterns played, in priority order: when
+        several patterns complete on the same ball, the first one is credited (default: DEFAULT_PATTERNS)"""
+
+        if card_length < 3:
+            raise ValueError(f'Card length must be at least 3 in CardGeometry(): {card_length}.')
+        if column_range < card_length or card_length * column_range > MAX_NUM_BALLS:
+            raise ValueError(f'Column range must be between {card_length} and {MAX_NUM_BALLS // card_length} for '
+                             f'{card_length} columns in CardGeometry(): {column_range}.')
+
+        patterns = tuple(patterns)
+        for name in patterns:
+            if name not in WIN_PATTERN_REGISTRY:
+                raise ValueError(f'Win pattern must be one of {list(WIN_PATTERN_REGISTRY)} in CardGeometry(): {name}.')
+        if not patterns or len(set(patterns)) < len(patterns):
+            raise ValueError(f'Win patterns must be distinct and at least one in CardGeometry(): {patterns}.')
+
+        self.key = (card_length, column_range, patterns)
+        self.card_length = card_length
+        self.column_range = column_range
+        self.patterns = patterns
+        self.num_cells = card_length * card_length
+        self.num_balls = card_length * column_range
+
+        # The center cell, that can be free, only for cards of odd dimensions
+        self.mid_cell = (card_length // 2) * (card_length + 1) if card_length % 2 == 1 else None
+
+        self.column_ranges = [range(column_range * i + 1, column_range * (i + 1) + 1) for i in range(0, card_length)]
+        self.column_labels = get_column_labels(card_length)
+
+        # Win patterns in the order of priority used by check_traditional_bingo(), and their index by (kind, line_num)
+        self.win_patterns = []
+        for name in patterns:
+            name_patterns = WIN_PATTERN_REGISTRY[name](card_length)
+            if not name_patterns:
+                raise ValueError(f'Win pattern {name} does not fit {card_length}x{card_length} cards in '
+                                 f'CardGeometry().')
+            self.win_patterns.extend(name_patterns)
+        self.pattern_index = {(kind, line_num): p for p, (kind, line_num, _) in enumerate(self.win_patterns)}
+        self.pattern_names = [kind if line_num is None else f'{kind}{line_num}'
+                              for kind, line_num, _ in self.win_patterns]
+
+        # Indices of the win patterns of each kind, kinds in order of first appearance
+        self.pattern_kinds = {}
+        for p, (kind, _, _) in enumerate(self.win_patterns):
+            self.pattern_kinds.setdefault(kind, []).append(p)
+
+        # Win patterns precompiled as bitmasks of the marked cells they need
+        self.pattern_masks = [get_cells_mask(cells) for _, _, cells in self.win_patterns]
+        self.row_masks = [get_cells_mask(cells) for kind, _, cells in self.win_patterns if kind == 'row']
+        self.col_masks = [get_cells_mask(cells) for kind, _, cells in self.win_patterns if kind == 'col']
+        self.diag_masks = {line_num: get_cells_mask(cells) for kind, line_num, cells in self.win_patterns
+                           if kind == 'diag'}
+        self.corners_mask = self.pattern_masks[self.pattern_index['corners', None]] \
+            if ('corners', None) in self.pattern_index else None
+
+        # Number of cells in each win pattern, and the win patterns going through each cell (in win_patterns order)
+        self.pattern_sizes = [len(cells) for _, _, cells in self.win_patterns]
+        self.cell_patterns = [tuple(p for p, (_, _, cells) in enumerate(self.win_patterns) if cell in cells)
+                              for cell in range(0, self.num_cells)]
+
+        # Length of the tries histograms, indexed by the number of bingo balls to win.  A game can only be won on the
+        # last ball if a cell is in every win pattern (e.g. blackout), else the histograms stop short of it.
+        all_patterns = tuple(range(0, len(self.win_patterns)))
+        self.num_tries = self.num_balls + (1 if all_patterns in self.cell_patterns else 0)
+
+    def __eq__(self, other):
+        return isinstance(other, CardGeometry) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __reduce__(self):
+        # Unpickles (e.g. in a worker process) to the cached geometry of that process
+        return get_geometry, self.key
+
+    def __repr__(self):
+        return f'CardGeometry(card_length={self.card_length}, column_range={self.column_range}, ' \
+               f'patterns={self.patterns})'
+
+
+# Geometries built so far, by key
+GEOMETRY_CACHE = {}
+
+
+def get_geometry(card_length=CARD_LENGTH, column_range=COLUMN_RANGE, patterns=DEFAULT_PATTERNS):
+    """Returns the geometry of a card layout, building its tables on first use only.
+    :param: card_length (int) The number of rows and columns (default: CARD_LENGTH)
+    :param: column_range (int) The number of numbers per column (default: COLUMN_RANGE)
+    :param: patterns (tuple) The names of the win patterns played, see CardGeometry (default: DEFAULT_PATTERNS)
+    :return: (CardGeometry) class"""
+
+    key = (card_length, column_range, tuple(patterns))
+    if key not in GEOMETRY_CACHE:
+        GEOMETRY_CACHE[key] = CardGeometry(*key)
+
+    return GEOMETRY_CACHE[key]
+
+
+DEFAULT_GEOMETRY = get_geometry()
+
+
+def as_geometry(geometry):
+    """Returns a geometry, or the default one for None.
+    :param: geometry (CardGeometry or None) class
+    :return: (CardGeometry) class"""
+
+    return DEFAULT_GEOMETRY if geometry is None else geometry
+
+
+class BingoCellView:
+    """A [number, marked] view of a single cell of a BingoCard, so cells read and write like the list[int, bool]
+    cells cards used to hold: cell[False] is the number and cell[True] is if the cell is marked."""
+
+    __slots__ = ('card', 'cell')
+
+    def __init__(self, card, cell):
+        self.card = card
+        self.cell = cell
+
+    def __getitem__(self, key):
+        if key:
+            return bool(self.card.marks >> self.cell & 1)
+        return self.card.numbers[self.cell]
+
+    def __setitem__(self, key, value):
+        if key:
+            self.card.set_mark(self.cell, value)
+        else:
+            self.card.set_number(self.cell, value)
+
+    def __iter__(self):
+        return iter((self[False], self[True]))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class BingoRowView:
+    """A view of a single row of a BingoCard, indexed by column."""
+
+    __slots__ = ('card', 'row')
+
+    def __init__(self, card, row):
+        self.card = card
+        self.row = row
 
-        bingo_cell = [0, False]
+    def __getitem__(self, col):
+        return BingoCellView(self.card, self.row * self.card.geometry.card_length + col)
 
-        self.bingo_card = []
-        bingo_row = []
+    def __setitem__(self, col, value):
+        number, marked = value
+        cell = self.row * self.card.geometry.card_length + col
+        self.card.set_number(cell, number)
+        self.card.set_mark(cell, marked)
 
-        column_ranges = []
-        column_random = []
+    def __len__(self):
+        return self.card.geometry.card_length
 
-        for i in range(0, CARD_LENGTH):
-            self.bingo_card.append([])
-            column_ranges.append([])
-            column_random.append([])
-            bingo_row.append(copy.deepcopy(bingo_cell))
+    def __iter__(self):
+        return (self[col] for col in range(0, len(self)))
 
-        for i in range(0, CARD_LENGTH):
-            self.bingo_card[i] = copy.deepcopy(bingo_row)
-            column_ranges[i] = range(COLUMN_RANGE*i + 1, COLUMN_RANGE*(i+1) + 1)
-            column_random[i] = random.sample(column_ranges[i], CARD_LENGTH)
 
-        self.under_all = range(1, COLUMN_RANGE * CARD_LENGTH + 1)
+class BingoCardView:
+    """A 2D view of a BingoCard, bingo_card[row][col] being a BingoCellView."""
 
-        # Create random bingo card:
-        for i in range(0, CARD_LENGTH):
-            for j in range(0, CARD_LENGTH):
-                self.bingo_card[j][i] = [column_random[i][j], False]
+    __slots__ = ('card',)
+
+    def __init__(self, card):
+        self.card = card
+
+    def __getitem__(self, row):
+        return BingoRowView(self.card, row)
+
+    def __len__(self):
+        return self.card.geometry.card_length
+
+    def __iter__(self):
+        return (self[row] for row in range(0, len(self)))
+
+
+class BingoCard:
+    """A bingo card class, defined by its CardGeometry (by default CARD_LENGTH and COLUMN_RANGE).  Contains a bingo
+    card, plus all the available BINGO numbers to select from.  The card numbers are held row by row in a fixed-size
+    array of num_cells numbers and the marked (dabbed) cells as a num_cells-bit integer, bit (row * card_length + col)
+    being set if that cell is marked.  bingo_card gives the 2D view of the card, where each cell reads as [int, bool],
+    the int being the random number for the bingo cell and the bool if this cell is marked (True) or not (False)
+
+    For playing ball by ball, the card also keeps an inverse index of which cell holds each bingo number (cell_of)
+    and how many cells of each win pattern are marked (pattern_hits), so call_ball() only touches the cell called and
+    the patterns going through it.  Change numbers and marks through set_number()/set_mark()/call_ball() (or the
+    bingo_card view) to keep those in step."""
+
+    def __init__(self, free_cell, rng=random, numbers=None, geometry=None):
+        """:param: free_cell (bool) Is the center cell considered free (already marked)?
+        :param: rng (random.Random) The random number generator to draw the card numbers with (default: the global
+        random module)
+        :param: numbers (bytes or iterable) The num_cells card numbers row by row instead of drawing them with rng,
+        see from_numbers() (default: None)
+        :param: geometry (CardGeometry) The card layout, see get_geometry() (default: DEFAULT_GEOMETRY)"""
+
+        self.geometry = geometry = as_geometry(geometry)
+        self.marks = 0
+
+        if numbers is not None:
+            self.numbers = array('b', numbers)
+        else:
+            card_length = geometry.card_length
+            self.numbers = array('b', bytes(geometry.num_cells))
+            for i in range(0, card_length):
+                column_random = rng.sample(geometry.column_ranges[i], card_length)
+                self.numbers[i::card_length] = array('b', column_random)
+
+        self.under_all = range(1, geometry.num_balls + 1)
+
+        self.cell_of = array('b', [-1]) * (geometry.num_balls + 1)
+        for cell, number in enumerate(self.numbers):
+            self.cell_of[number] = cell
+        self.cell_of[0] = -1
+
+        self.pattern_hits = array('b', bytes(len(geometry.win_patterns)))
 
         # Is the middle cell FREE?  Only applicable to bingo cards that have odd dimensions
-        mid_index = math.floor(CARD_LENGTH)
-        if free_cell and CARD_LENGTH % 2 == 1:
-            self.bingo_card[mid_index][mid_index] = [0, True]
+        if free_cell and geometry.mid_cell is not None:
+            self.set_number(geometry.mid_cell, 0)
+            self.set_mark(geometry.mid_cell, True)
+
+    # ------------------------------------------------------------------------
+
+    @classmethod
+    def from_numbers(cls, numbers, free_cell, geometry=None):
+        """Builds a card from given numbers, e.g. one card of a bingo_factory block of cards.
+        :param: numbers (bytes or iterable) The num_cells card numbers row by row
+        :param: free_cell (bool) Is the center cell considered free (already marked)?
+        :param: geometry (CardGeometry) The card layout (default: DEFAULT_GEOMETRY)
+        :return: (BingoCard) class, unmarked except for the free cell"""
+
+        return cls(free_cell, numbers=numbers, geometry=geometry)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def bingo_card(self):
+        """(BingoCardView) The 2D [row][col] view of the card, each cell as [number, marked]."""
+        return BingoCardView(self)
+
+    # ------------------------------------------------------------------------
+
+    def set_mark(self, cell, marked):
+        """Marks (dabs) or unmarks a cell of the card.
+        :param: cell (int) The flattened cell index, row * card_length + col
+        :param: marked (bool) True to mark the cell, False to unmark it
+        :return: None"""
+
+        if bool(self.marks >> cell & 1) == bool(marked):
+            return
+
+        self.marks ^= 1 << cell
+        step = 1 if marked else -1
+        for pattern_index in self.geometry.cell_patterns[cell]:
+            self.pattern_hits[pattern_index] += step
+
+    # ------------------------------------------------------------------------
+
+    def set_number(self, cell, number):
+        """Sets the bingo number of a cell of the card.
+        :param: cell (int) The flattened cell index, row * card_length + col
+        :param: number (int) The bingo number, 0 for a free cell
+        :return: None"""
+
+        if self.cell_of[self.numbers[cell]] == cell:
+            self.cell_of[self.numbers[cell]] = -1
+
+        self.numbers[cell] = number
+        if number > 0:
+            self.cell_of[number] = cell
+
+    # ------------------------------------------------------------------------
+
+    def call_ball(self, bingo_ball):
+        """Marks the cell holding a called bingo ball, if any, and checks the win patterns going through that cell.
+        :param: bingo_ball (int) The number of the bingo ball called
+        :return: (int) The index into geometry.win_patterns of the pattern this ball completed, or -1 if there is no
+        BINGO.  When several patterns complete at once, the first in win_patterns order is returned, the same as
+        check_traditional_bingo()."""
+
+        cell = self.cell_of[bingo_ball]
+        if cell < 0 or self.marks >> cell & 1:
+            return -1
+
+        self.marks |= 1 << cell
+
+        win_pattern = -1
+        pattern_hits = self.pattern_hits
+        pattern_sizes = self.geometry.pattern_sizes
+        for pattern_index in self.geometry.cell_patterns[cell]:
+            pattern_hits[pattern_index] += 1
+            if pattern_hits[pattern_index] == pattern_sizes[pattern_index] and win_pattern < 0:
+                win_pattern = pattern_index
+
+        return win_pattern
 
     # ------------------------------------------------------------------------
 
@@ -55,18 +453,21 @@ class BingoCard:
         :param: None
         :return: None"""
 
-        print('------------------------')
-        print('|B | |I | |N | |G | |O |')
-        print('------------------------')
+        card_length = self.geometry.card_length
+        line = '-' * (5 * card_length - 1)
+
+        print(line)
+        print(' '.join(f'|{label:2}|' for label in self.geometry.column_labels))
+        print(line)
 
-        for i in range(0, CARD_LENGTH):
+        for i in range(0, card_length):
 
             if i > 0:
-                print('\n------------------------')
-            for j in range(0, CARD_LENGTH):
+                print('\n' + line)
+            for j in range(0, card_length):
                 print('|{:2}|'.format(self.bingo_card[i][j][True]), end=" ")
 
-        print('\n------------------------\n\n')
+        print('\n' + line + '\n\n')
 
     # ------------------------------------------------------------------------
 
@@ -103,21 +504,12 @@ class BingoCard:
         if diag_num not in [1, 2]:
             raise ValueError(f'Diagonal Number must be 1 or 2 in check_diagonal_bingo(): {diag_num}.')
 
-        # Check Diag 1
-        if diag_num == 1:
-            for i in range(0, CARD_LENGTH):
-                if not self.bingo_card[i][i][True]:
-                    return False
-
-        # Check Diag 2
-        else:
-            for i in range(0, CARD_LENGTH):
-                if not self.bingo_card[i][CARD_LENGTH - 1 - i][True]:
-                    return False
+        diag_mask = self.geometry.diag_masks[diag_num]
+        if self.marks & diag_mask != diag_mask:
+            return False
 
-        # Apply stats to specific diagonal and total diagonal
-        stats.df_num_bingo[f'num_diag{diag_num}_bingo'] += 1
-        stats.df_num_bingo['num_diag_bingo'] += 1
+        # Apply stats to specific diagonal (total diagonal is summed from it)
+        stats.bingo_counts[self.geometry.pattern_index['diag', diag_num]] += 1
         return True
 
     # ------------------------------------------------------------------------
@@ -125,7 +517,7 @@ class BingoCard:
     def _check_line_bingo(self, axis, line_num, stats):
         """Checks if the card has a row/column BINGO. Increments the stats counter for the specific row/col if so.
         :param: axis (int) as 0 (row) or 1 (col)
-        :param: line_num (int) a number between 0 and CARD_LENGTH, e.g. as row0, row1, column0, column1, etc.
+        :param: line_num (int) a number between 0 and card_length - 1, e.g. as row0, row1, column0, column1, etc.
         :param: stats (BingoStats) class
         :return: True if any row or column have BINGO, False otherwise.
 
@@ -154,25 +546,19 @@ class BingoCard:
         # Check inputs
         if axis not in [0, 1]:
             raise ValueError(f'Axis is not 0 (row) or 1 (column): {axis}.')
-        if line_num not in list(range(0, CARD_LENGTH)):
-            raise ValueError(f'Line number for axis {axis} must be 0-{CARD_LENGTH-1} in check_line_bingo(): {line_num}')
+        card_length = self.geometry.card_length
+        if line_num not in range(0, card_length):
+            raise ValueError(f'Line number for axis {axis} must be 0-{card_length-1} in check_line_bingo(): {line_num}')
 
         # Check row/col for BINGO
-        if axis == 0:
-            for j in range(0, CARD_LENGTH):
-                if not self.bingo_card[line_num][j][True]:
-                    return False
-        else:
-            for i in range(0, CARD_LENGTH):
-                if not self.bingo_card[i][line_num][True]:
-                    return False
+        line_mask = self.geometry.row_masks[line_num] if axis == 0 else self.geometry.col_masks[line_num]
+        if self.marks & line_mask != line_mask:
+            return False
 
         axis_enum = {0: "row", 1: "col"}
 
-        # Increment stats
-        stats.df_num_bingo[f'num_bingo_{axis_enum[axis]}{line_num}'] += 1
-        stats.df_num_bingo[f'num_{axis_enum[axis]}_bingo'] += 1
-        stats.df_num_bingo['num_line_bingo'] += 1
+        # Increment stats (row/col and line totals are summed from it)
+        stats.bingo_counts[self.geometry.pattern_index[axis_enum[axis], line_num]] += 1
         return True
 
     # ------------------------------------------------------------------------
@@ -193,11 +579,9 @@ class BingoCard:
         |X | |  | |  | |  | |X |
         ------------------------"""
 
-        if self.bingo_card[0][0][True] and \
-                self.bingo_card[CARD_LENGTH - 1][0][True] and \
-                self.bingo_card[0][CARD_LENGTH - 1][True] and \
-                self.bingo_card[CARD_LENGTH - 1][CARD_LENGTH - 1][True]:
-            stats.df_num_bingo['num_corners_bingo'] += 1
+        corners_mask = self.geometry.corners_mask
+        if self.marks & corners_mask == corners_mask:
+            stats.bingo_counts[self.geometry.pattern_index['corners', None]] += 1
             return True
 
         return False
@@ -210,25 +594,11 @@ class BingoCard:
         :param: num_bingo_balls (int), the current number of bingo balls called so far
         :return: True if any BINGO was found, False otherwise."""
 
-        if self._check_corners_bingo(stats):
-            stats.df_tries['num_tries_corners'][num_bingo_balls] += 1
-            return True
-
-        for i in range(0, CARD_LENGTH):
-
-            if i in [1, 2] and self._check_diagonal_bingo(i, stats):
-                stats.df_tries[f'num_tries_diag{i}'][num_bingo_balls] += 1
-                stats.df_tries[f'num_tries_diag'][num_bingo_balls] += 1
-                return True
-
-            if self._check_line_bingo(0, i, stats):
-                stats.df_tries[f'num_tries_row{i}'][num_bingo_balls] += 1
-                stats.df_tries[f'num_tries_rows'][num_bingo_balls] += 1
-                return True
-
-            if self._check_line_bingo(1, i, stats):
-                stats.df_tries[f'num_tries_col{i}'][num_bingo_balls] += 1
-                stats.df_tries[f'num_tries_cols'][num_bingo_balls] += 1
+        # Patterns are checked in win_patterns order, the first complete one is credited with the BINGO
+        marks = self.marks
+        for pattern_index, pattern_mask in enumerate(self.geometry.pattern_masks):
+            if marks & pattern_mask == pattern_mask:
+                stats.record_bingo(pattern_index, num_bingo_balls)
                 return True
 
         return False
@@ -0,0 +1,113 @@
+"""Periodic checkpoints of long BINGO simulation runs, so a crashed or preempted run can resume where it stopped.
+
+A checkpoint holds the BingoStats counters, the number of games played, the seed key and the run parameters.  Games
+are keyed by their index (see bingo_rng.py), so the seed key and the number of games played are all it takes to play
+the rest of the run.  It is written to a temporary file next to the checkpoint and moved over it, so a crash while
+writing never leaves a broken checkpoint behind.  Once the run is over, its checkpoint is deleted: rerunning starts a
+new run rather than reporting the finished one again."""
+
+import json
+import os
+import time
+import numpy as np
+from bingo_simulator import bingo_batch
+from bingo_simulator.bingo_simulator_main import ENGINE_RANK
+
+CHECKPOINT_FILENAME = "bingo_checkpoint.npz"
+
+
+# ------------------------------------------------------------------------
+
+def save_checkpoint(sim, path, run_params):
+    """Atomically writes a checkpoint of a simulation.
+    :param: sim (BingoSimulator) class
+    :param: path (str) The checkpoint file path
+    :param: run_params (dict) The parameters of the run (free_cell, card geometry, seed key), checked on resume
+    :return: None"""
+
+    header = {'num_simulations': sim.stats.num_simulations, 'games_played': sim.games_played,
+              'run_params': run_params, 'seed_key': sim.seed_key}
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as checkpoint_file:
+        np.savez(checkpoint_file, header=np.array(json.dumps(header)),
+                 **{name: getattr(sim.stats, name) for name in sim.stats.COUNTERS})
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+
+    os.replace(temp_path, path)
+
+
+# ------------------------------------------------------------------------
+
+def load_checkpoint(sim, path, run_params):
+    """Restores a simulation from a checkpoint.
+    :param: sim (BingoSimulator) class, for the same number of games and seed as the checkpointed run
+    :param: path (str) The checkpoint file path
+    :param: run_params (dict) The parameters of the run being resumed, must match the checkpointed ones
+    :return: None"""
+
+    with np.load(path, allow_pickle=False) as checkpoint:
+        header = json.loads(str(checkpoint['header']))
+
+        if header['num_simulations'] != sim.stats.num_simulations or header['run_params'] != run_params:
+            raise ValueError(f'Checkpoint {path} is for a different run: {header["num_simulations"]} games with '
+                             f'{header["run_params"]}, not {sim.stats.num_simulations} games with {run_params}.')
+
+        # Counters added since the checkpoint was written stay at zero
+        for name in sim.stats.COUNTERS:
+            if name in checkpoint.files:
+                getattr(sim.stats, name)[...] = checkpoint[name]
+
+    sim.games_played = header['games_played']
+
+
+# ------------------------------------------------------------------------
+
+def play_bingo_checkpointed(sim, free_cell, path=CHECKPOINT_FILENAME, engine=ENGINE_RANK,
+                            batch_size=bingo_batch.DEFAULT_BATCH_SIZE, every_games=None, every_seconds=600.0,
+                            resume=True, monitor=None):
+    """Plays BINGO num_simulations times in chunks of batch_size games, checkpointing the run every every_games
+    games or every_seconds seconds, whichever comes first, and deleting the checkpoint once the run is over.  A
+    resumed run plays the same games as an uninterrupted run from the same seed, even with another engine or
+    batch_size.
+    :param: sim (BingoSimulator) class, of the same seed as the checkpointed run to resume it
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: path (str) The checkpoint file path (default: CHECKPOINT_FILENAME)
+    :param: engine (str) One of bingo_simulator_main.ENGINES (default: ENGINE_RANK)
+    :param: batch_size (int) The number of games per chunk (and per block for vectorized engines)
+    :param: every_games (int) Checkpoint after at least this many games since the last checkpoint (None: never)
+    :param: every_seconds (float) Checkpoint after at least this many seconds since the last checkpoint (None: never)
+    :param: resume (bool) If the checkpoint file exists, continue the run from it (default: True)
+    :param: monitor (RunMonitor) Instruments the run, see BingoSimulator.play_bingo() (default: None)
+    :return: None"""
+
+    geometry = sim.stats.geometry
+    run_params = {'free_cell': bool(free_cell),
+                  'geometry': [geometry.card_length, geometry.column_range, list(geometry.patterns)],
+                  'seed_key': sim.seed_key, 'first_game': sim.first_game}
+
+    if resume and os.path.exists(path):
+        load_checkpoint(sim, path, run_params)
+
+    last_games = sim.games_played
+    last_time = time.monotonic()
+
+    if monitor is not None:
+        monitor.start(sim.stats.num_simulations, sim.games_played, engine)
+
+    while sim.games_played < sim.stats.num_simulations:
+        sim.play_games(free_cell, min(batch_size, sim.stats.num_simulations - sim.games_played), engine, batch_size,
+                       monitor)
+
+        if (every_games is not None and sim.games_played - last_games >= every_games) or \
+                (every_seconds is not None and time.monotonic() - last_time >= every_seconds):
+            save_checkpoint(sim, path, run_params)
+            last_games = sim.games_played
+            last_time = time.monotonic()
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    if monitor is not None:
+        monitor.finish()
@@ -0,0 +1,195 @@
+"""Command line to run BINGO simulations, e.g. as a scheduled job on a batch node.
+
+Installed as the bingo-simulator console command (see setup.py), or run as python -m bingo_simulator.bingo_cli:
+    bingo-simulator --games 10000000 --engine rank --workers 8 --seed 42 --output results/
+The results are saved in the output folder as a binary results file (see bingo_results.py) and/or csv files, and can be
+recorded in a run registry (see bingo_registry.py) to combine with other runs.  When the run is over, its metadata
+(parameters, seed, games/sec, wall time, output files) is printed to stdout as a single JSON object; progress and
+summaries go to stderr."""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import numpy as np
+from bingo_simulator import bingo_batch
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_simulator_main import BingoSimulator, ENGINE_RANK, ENGINES
+from bingo_simulator.bingo_simulator_main import BINGO_STATS_FILENAME, STATS_TRIES_FILENAME
+from bingo_simulator.version import __version__
+
+DEFAULT_GAMES = 10000000
+
+# Output formats: the binary results file, the df_tries and df_num_bingo csv files, both or none
+FORMAT_BINARY = "binary"
+FORMAT_CSV = "csv"
+FORMAT_ALL = "all"
+FORMAT_NONE = "none"
+FORMATS = [FORMAT_BINARY, FORMAT_CSV, FORMAT_ALL, FORMAT_NONE]
+
+
+# ------------------------------------------------------------------------
+
+def play_run(args, geometry, seed):
+    """Plays the games of a run, in this process or on a pool of worker processes.
+    :param: args (argparse.Namespace) The parsed command line, see main()
+    :param: geometry (CardGeometry) The card layout
+    :param: seed (int) The master seed
+    :return: (BingoStats) the statistics of the run"""
+
+    from bingo_simulator.bingo_monitor import RunMonitor
+
+    if args.workers != 1:
+        from bingo_simulator import bingo_parallel
+        return bingo_parallel.play_bingo_parallel(args.games, args.free_cell, args.engine, args.workers, seed,
+                                                  batch_size=args.batch_size, geometry=geometry)
+
+    sim = BingoSimulator(args.games, seed, geometry=geometry)
+    monitor = RunMonitor(progress=args.progress)
+
+    if args.checkpoint:
+        from bingo_simulator import bingo_checkpoint
+        bingo_checkpoint.play_bingo_checkpointed(sim, args.free_cell, args.checkpoint, args.engine, args.batch_size,
+                                                 monitor=monitor)
+    else:
+        sim.play_bingo(args.free_cell, args.engine, args.batch_size, monitor)
+
+    return sim.stats
+
+
+# ------------------------------------------------------------------------
+
+def save_outputs(stats, args, seed_key, run_params):
+    """Saves the results of a run in the output folder.
+    :param: stats (BingoStats) class
+    :param: args (argparse.Namespace) The parsed command line, see main()
+    :param: seed_key (int) The seed key of the run
+    :param: run_params (dict) The parameters of the run, saved in the binary results file
+    :return: (dict) of output kind to file path"""
+
+    from bingo_simulator import bingo_results
+
+    outputs = {}
+    if args.format == FORMAT_NONE:
+        return outputs
+
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.format in (FORMAT_BINARY, FORMAT_ALL):
+        outputs['results'] = os.path.join(args.output, bingo_results.RESULTS_FILENAME)
+        bingo_results.save_results(stats, outputs['results'], seed_key, args.engine, run_params)
+
+    if args.format in (FORMAT_CSV, FORMAT_ALL):
+        outputs['tries_csv'] = os.path.join(args.output, STATS_TRIES_FILENAME)
+        outputs['num_bingo_csv'] = os.path.join(args.output, BINGO_STATS_FILENAME)
+        bingo_results.export_csv(stats, outputs['tries_csv'], outputs['num_bingo_csv'])
+
+    return outputs
+
+
+# ------------------------------------------------------------------------
+
+def get_parser():
+    """Returns the parser of the command line.
+    :return: (argparse.ArgumentParser) the parser"""
+
+    parser = argparse.ArgumentParser(prog='bingo-simulator', description='Runs BINGO simulations.')
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES, help='Number of games to play (default: 10M)')
+    parser.add_argument('--free-cell', action='store_true', help='The center cell is free (already marked)')
+    parser.add_argument('--seed', type=int, help='Master seed (default: a fresh random one, printed in the metadata)')
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE_RANK, help='Engine to play with (default: rank)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes, 0 for the number of CPUs (default: 1, in this process)')
+    parser.add_argument('--batch-size', type=int, default=bingo_batch.DEFAULT_BATCH_SIZE, help='Games per block')
+    parser.add_argument('--card-length', type=int, default=bc.CARD_LENGTH, help='Rows and columns of the card')
+    parser.add_argument('--column-range', type=int, default=bc.COLUMN_RANGE, help='Numbers per card column')
+    parser.add_argument('--patterns', nargs='+', default=list(bc.DEFAULT_PATTERNS),
+                        choices=sorted(bc.WIN_PATTERN_REGISTRY), help='Win patterns played (default: traditional)')
+    parser.add_argument('--format', choices=FORMATS, default=FORMAT_ALL,
+                        help='Output files: binary results, csv, all (default) or none')
+    parser.add_argument('--output', default='.', help='Output folder (default: the current folder)')
+    parser.add_argument('--metadata', help='Also save the run metadata JSON to this file')
+    parser.add_argument('--registry', help='Also record the run in this registry database, see bingo_registry.py')
+    parser.add_argument('--checkpoint',
+                        help='Checkpoint file, to resume an interrupted run (single worker and --seed only)')
+    parser.add_argument('--progress', action='store_true', help='Print a live progress line to stderr')
+    parser.add_argument('--summary', action='store_true', help='Print the statistics summary to stderr')
+    parser.add_argument('--plot', action='store_true', help='Plot the histogram and pie chart (opens a browser)')
+
+    return parser
+
+
+# ------------------------------------------------------------------------
+
+def main(argv=None):
+    """Runs the simulator command line.
+    :param: argv (list) The command line arguments (default: sys.argv[1:])
+    :return: (int) the exit status"""
+
+    parser = get_parser()
+    args = parser.parse_args(argv)
+
+    if args.games < 1:
+        parser.error(f'--games must be at least 1: {args.games}')
+    if args.workers < 0:
+        parser.error(f'--workers must be at least 0: {args.workers}')
+    if args.checkpoint and args.workers != 1:
+        parser.error('--checkpoint needs a single worker (--workers 1)')
+    if args.checkpoint and args.seed is None:
+        parser.error('--checkpoint needs a --seed, for the resumed run to play the same games')
+
+    try:
+        geometry = bc.get_geometry(args.card_length, args.column_range, tuple(args.patterns))
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+
+    # A random seed is drawn here rather than by the run, so that the metadata can replay it
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy)
+    seed_key = bingo_rng.get_seed_key(seed)
+    run_params = {'free_cell': bool(args.free_cell),
+                  'geometry': [geometry.card_length, geometry.column_range, list(geometry.patterns)]}
+
+    start_time = time.perf_counter()
+    stats = play_run(args, geometry, seed)
+    wall_time = time.perf_counter() - start_time
+
+    outputs = save_outputs(stats, args, seed_key, run_params)
+
+    metadata = {'version': __version__, 'games': int(stats.num_simulations), 'seed': seed, 'seed_key': seed_key,
+                'engine': args.engine, 'workers': args.workers, 'batch_size': args.batch_size, **run_params,
+                'wall_time': wall_time, 'games_per_sec': stats.num_simulations / wall_time if wall_time > 0 else 0.0,
+                'outputs': outputs}
+
+    if args.registry:
+        from bingo_simulator.bingo_registry import BingoRegistry
+        with BingoRegistry(args.registry) as registry:
+            metadata['run_id'] = registry.add_run(stats, args.free_cell, seed, seed_key, args.engine,
+                                                  {'batch_size': args.batch_size, 'workers': args.workers},
+                                                  outputs.get('results'))
+
+    if args.metadata:
+        with open(args.metadata, 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+
+    if args.summary:
+        with contextlib.redirect_stdout(sys.stderr):
+            stats.print_summary()
+
+    print(json.dumps(metadata))
+
+    if args.plot:
+        from bingo_simulator import plot_bingo as pb
+        pb.plot_bingo_histo(stats.df_tries, dark_mode=True, geometry=stats.geometry)
+        pb.plot_bingo_pie(stats.df_num_bingo, detail="subplot_cols", dark_mode=True, geometry=stats.geometry)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Runs BINGO simulations until their results reach target precisions, instead of for a fixed number of games.
+
+Games are played in chunks, and after each chunk confidence intervals are updated from the BingoStats counters:
+- the share of each BingoStats.df_num_bingo column (the percentages of print_summary()), as Wilson score intervals;
+- quantiles of the number of bingo balls to get BINGO (the CDF of df_tries), as distribution-free order statistic
+  intervals: the q quantile lies between the quantiles at q -/+ z * sqrt(q * (1 - q) / n).
+The run stops as soon as every target is met, or after the num_simulations games of the simulator."""
+
+from statistics import NormalDist
+import numpy as np
+from bingo_simulator import bingo_batch
+from bingo_simulator.bingo_simulator_main import ENGINE_RANK, get_column_tables
+
+DEFAULT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+
+# ------------------------------------------------------------------------
+
+def get_z_score(confidence):
+    """Returns the two-sided standard normal score of a confidence level.
+    :param: confidence (float) The confidence level, e.g. 0.95
+    :return: (float) z, e.g. 1.96 for 0.95"""
+
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f'Confidence must be between 0 and 1 in get_z_score(): {confidence}.')
+
+    return NormalDist().inv_cdf(0.5 + confidence / 2.0)
+
+
+# ------------------------------------------------------------------------
+
+def get_share_intervals(stats, num_games, confidence=0.95):
+    """Computes the confidence interval of the share of games of each BingoStats.df_num_bingo column.
+    :param: stats (BingoStats) class
+    :param: num_games (int) The number of games played into stats
+    :param: confidence (float) The confidence level (default: 0.95)
+    :return: (pd.DataFrame) indexed by the df_num_bingo column names, with columns 'share', 'lower', 'upper' and
+    'width' (upper - lower)"""
+
+    import pandas as pd
+
+    z = get_z_score(confidence)
+    num_bingo_columns, num_bingo_matrix, _, _ = get_column_tables(stats.geometry)
+    counts = num_bingo_matrix @ stats.bingo_counts
+    share = counts / num_games if num_games > 0 else np.zeros(counts.shape)
+
+    # Wilson score interval, which stays sound for shares close to 0 or 1
+    n = max(num_games, 1)
+    z2_n = z * z / n
+    center = (share + z2_n / 2.0) / (1.0 + z2_n)
+    half_width = z / (1.0 + z2_n) * np.sqrt(share * (1.0 - share) / n + z2_n / (4.0 * n))
+
+    return pd.DataFrame({'share': share, 'lower': center - half_width, 'upper': center + half_width,
+                         'width': 2.0 * half_width}, index=[name for name, _ in num_bingo_columns])
+
+
+# ------------------------------------------------------------------------
+
+def get_quantile_intervals(stats, quantiles=None, confidence=0.95):
+    """Computes the confidence interval of quantiles of the number of bingo balls to get BINGO.
+    :param: stats (BingoStats) class
+    :param: quantiles (list) The CDF levels, each between 0 and 1 (default: DEFAULT_QUANTILES)
+    :param: confidence (float) The confidence level (default: 0.95)
+    :return: (pd.DataFrame) indexed by quantile level, with columns 'balls' (the estimated quantile), 'lower',
+    'upper' and 'rel_error' (the largest distance from the estimate to a bound, relative to the estimate)"""
+
+    import pandas as pd
+
+    if quantiles is None:
+        quantiles = DEFAULT_QUANTILES
+
+    z = get_z_score(confidence)
+    counts = stats.tries.sum(axis=0)
+    num_games = counts.sum()
+    cdf = np.cumsum(counts) / max(num_games, 1)
+
+    def get_quantile(level):
+        # The smallest number of balls whose CDF reaches level
+        return int(min(np.searchsorted(cdf, level), cdf.size - 1)) if num_games > 0 else 0
+
+    rows = []
+    for q in quantiles:
+        margin = z * np.sqrt(q * (1.0 - q) / max(num_games, 1))
+        balls, lower, upper = get_quantile(q), get_quantile(q - margin), get_quantile(q + margin)
+        rel_error = max(balls - lower, upper - balls) / balls if balls > 0 else np.inf
+        rows.append((balls, lower, upper, rel_error))
+
+    return pd.DataFrame(rows, columns=['balls', 'lower', 'upper', 'rel_error'], index=pd.Index(quantiles,
+                                                                                                   name='quantile'))
+
+
+# ------------------------------------------------------------------------
+
+def play_bingo_until_converged(sim, free_cell, share_width=None, quantile_error=None, quantiles=None,
+                               confidence=0.95, engine=ENGINE_RANK, batch_size=bingo_batch.DEFAULT_BATCH_SIZE,
+                               min_games=None, monitor=None):
+    """Plays BINGO in chunks of batch_size games until every target precision is met, at most num_simulations games
+    in all.  Afterwards sim.stats.num_simulations is the number of games actually played, so its percentages are
+    right.
+    :param: sim (BingoSimulator) class, its num_simulations being the budget of games
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: share_width (float) Target width of the confidence interval of every df_num_bingo share, e.g. 0.001 for
+    +/-0.05% (default: None, no target)
+    :param: quantile_error (float) Target relative error of every quantile of the number of bingo balls, e.g. 0.02
+    (default: None, no target)
+    :param: quantiles (list) The CDF levels for quantile_error (default: DEFAULT_QUANTILES)
+    :param: confidence (float) The confidence level of the intervals (default: 0.95)
+    :param: engine (str) One of bingo_simulator_main.ENGINES (default: ENGINE_RANK)
+    :param: batch_size (int) The number of games played between two checks
+    :param: min_games (int) The number of games to play before the first check (default: batch_size)
+    :param: monitor (RunMonitor) Instruments the run, see BingoSimulator.play_bingo() (default: None)
+    :return: (dict) with keys 'converged' (bool, were the targets met), 'games_played' (int), 'share_intervals'
+    (see get_share_intervals()) and 'quantile_intervals' (see get_quantile_intervals())"""
+
+    if share_width is None and quantile_error is None:
+        raise ValueError('At least one of share_width and quantile_error is needed in play_bingo_until_converged().')
+
+    if min_games is None:
+        min_games = batch_size
+
+    max_games = sim.stats.num_simulations
+    converged = False
+
+    if monitor is not None:
+        monitor.start(max_games, sim.games_played, engine)
+
+    while not converged and sim.games_played < max_games:
+        num_games = max(batch_size, min_games - sim.games_played)
+        sim.play_games(free_cell, min(num_games, max_games - sim.games_played), engine, batch_size, monitor)
+
+        converged = True
+        if share_width is not None:
+            share_intervals = get_share_intervals(sim.stats, sim.games_played, confidence)
+            converged = bool((share_intervals['width'] <= share_width).all())
+        if quantile_error is not None:
+            quantile_intervals = get_quantile_intervals(sim.stats, quantiles, confidence)
+            converged = converged and bool((quantile_intervals['rel_error'] <= quantile_error).all())
+
+    if monitor is not None:
+        monitor.finish()
+
+    sim.stats.num_simulations = sim.games_played
+
+    return {'converged': converged, 'games_played': sim.games_played,
+            'share_intervals': get_share_intervals(sim.stats, sim.games_played, confidence),
+            'quantile_intervals': get_quantile_intervals(sim.stats, quantiles, confidence)}
+
+
+# ------------------------------------------------------------------------
+
+def print_convergence(report):
+    """Prints the results of play_bingo_until_converged() to the console.
+    :param: report (dict) as returned by play_bingo_until_converged()
+    :return: None"""
+
+    print(f"\nConvergence: {'targets met' if report['converged'] else 'targets NOT met'} after "
+          f"{report['games_played']:,} games\n")
+
+    for name, row in report['share_intervals'].iterrows():
+        print(f"{name}: {100.0 * row['share']:.3f}% [{100.0 * row['lower']:.3f}%, {100.0 * row['upper']:.3f}%]")
+
+    for q, row in report['quantile_intervals'].iterrows():
+        print(f"Quantile {q:g}: {row['balls']:.0f} balls [{row['lower']:.0f}, {row['upper']:.0f}], "
+              f"relative error {100.0 * row['rel_error']:.1f}%")
@@ -0,0 +1,178 @@
+"""Computes the exact distribution of the number of bingo balls to the first BINGO, instead of simulating it.
+
+The cells of a card are marked in a uniformly random order, and the j-th card cell is marked on the k-th bingo ball
+with a negative hypergeometric probability, independent of that order.  So it is enough to count, for every set B of
+marked cells, which win patterns B completes:
+- The card wins on its j-th marked cell x, with pattern p, when B (the first j marked cells) completes p (and no
+  pattern before p in win_patterns) but B without x completes nothing, i.e. x is in every pattern B completes.
+- Each (B, x) pair is equally likely, 1 / (j * C(m, j)) for m drawable cells.
+
+All 2^num_cells sets are enumerated in chunks and counted by (j, set of completed patterns), which reduces the
+problem to a few thousand terms.  That takes cards of at most MAX_EXACT_CELLS cells, e.g. up to 5x5."""
+
+from functools import lru_cache
+from math import comb
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator.bingo_simulator_main import get_column_tables
+
+CHUNK_BITS = 20  # Cell sets are enumerated 2^CHUNK_BITS at a time
+MAX_EXACT_CELLS = 25  # Cell sets are held as uint32 bitmasks, and enumerating them all takes O(2^num_cells)
+MAX_EXACT_PATTERNS = 20  # Sets are counted per set of completed patterns, O(2^num_patterns) counters
+
+# Number of set bits of each byte value
+POPCOUNT8 = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+# ------------------------------------------------------------------------
+
+def popcount(values):
+    """Counts the set bits of each value.
+    :param: values (np.ndarray) uint32 array
+    :return: (np.ndarray) uint8 array of the number of set bits of each value"""
+
+    counts = POPCOUNT8[values & 0xff]
+    for shift in [8, 16, 24]:
+        counts += POPCOUNT8[(values >> shift) & 0xff]
+
+    return counts
+
+
+# ------------------------------------------------------------------------
+
+def get_drawable_mask(free_cell, geometry):
+    """Returns the bitmask of the cells marked by drawing their number, i.e. all but a free center cell.
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: geometry (CardGeometry) The card layout
+    :return: (int) bitmask of cells"""
+
+    drawable = (1 << geometry.num_cells) - 1
+    if free_cell and geometry.mid_cell is not None:
+        drawable &= ~(1 << geometry.mid_cell)
+
+    return drawable
+
+
+# ------------------------------------------------------------------------
+
+def count_cell_sets(free_cell, geometry=None):
+    """Counts every set of marked cells by its number of drawn cells and the set of win patterns it completes.
+    :param: free_cell (bool) Is the center cell considered free?  If so, only sets including it are counted.
+    :param: geometry (CardGeometry) The card layout, of at most MAX_EXACT_CELLS cells and MAX_EXACT_PATTERNS win
+    patterns (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int64 matrix of shape (m + 1, 2^num_patterns), [j, S] being the number of sets of j drawn
+    cells that complete exactly the patterns in bitset S"""
+
+    geometry = bc.as_geometry(geometry)
+    if geometry.num_cells > MAX_EXACT_CELLS or len(geometry.win_patterns) > MAX_EXACT_PATTERNS:
+        raise ValueError(f'Exact distributions are limited to {MAX_EXACT_CELLS} cells and {MAX_EXACT_PATTERNS} win '
+                         f'patterns in count_cell_sets(): {geometry}.')
+
+    num_cells = geometry.num_cells
+    num_patterns = len(geometry.win_patterns)
+    has_free_cell = free_cell and geometry.mid_cell is not None
+    drawable = get_drawable_mask(free_cell, geometry)
+    chunk_bits = min(CHUNK_BITS, num_cells)
+
+    set_counts = np.zeros(((num_cells + 1) << num_patterns), dtype=np.int64)
+    chunk = np.arange(1 << chunk_bits, dtype=np.uint32)
+
+    for base in range(0, 1 << num_cells, 1 << chunk_bits):
+        cell_sets = chunk + np.uint32(base)
+        if has_free_cell:
+            cell_sets = cell_sets[(cell_sets >> geometry.mid_cell) & 1 == 1]
+
+        completed = np.zeros(cell_sets.shape, dtype=np.int64)
+        for p, pattern_mask in enumerate(geometry.pattern_masks):
+            completed |= ((cell_sets & np.uint32(pattern_mask)) == pattern_mask).astype(np.int64) << p
+
+        num_drawn = popcount(cell_sets & np.uint32(drawable)).astype(np.int64)
+        set_counts += np.bincount((num_drawn << num_patterns) | completed, minlength=set_counts.size)
+
+    return set_counts.reshape(num_cells + 1, 1 << num_patterns)
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def exact_tries_distribution(free_cell, geometry=None):
+    """Computes the exact joint distribution of the winning pattern and the number of bingo balls to get BINGO.
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: geometry (CardGeometry) The card layout, of at most MAX_EXACT_CELLS cells (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) float64 matrix of shape (len(win_patterns), num_tries), [p, n] being the probability that
+    a game is won by pattern win_patterns[p] on the n-th bingo ball, in the layout of BingoStats.tries.  The matrix
+    is cached, do not modify it."""
+
+    geometry = bc.as_geometry(geometry)
+    num_patterns = len(geometry.win_patterns)
+    num_balls = geometry.num_balls
+    num_tries = geometry.num_tries
+    drawable = get_drawable_mask(free_cell, geometry)
+    num_drawable = bin(drawable).count('1')
+
+    set_counts = count_cell_sets(free_cell, geometry)
+
+    # For each set S of completed patterns: the pattern credited (first in win_patterns order) and the number of
+    # drawable cells common to all of them, i.e. the cells that could have been the winning ball
+    credited = np.zeros(1 << num_patterns, dtype=np.intp)
+    num_winning_cells = np.zeros(1 << num_patterns, dtype=np.int64)
+    for completed in range(1, 1 << num_patterns):
+        patterns = [p for p in range(0, num_patterns) if completed >> p & 1]
+        common = drawable
+        for p in patterns:
+            common &= geometry.pattern_masks[p]
+        credited[completed] = patterns[0]
+        num_winning_cells[completed] = bin(common).count('1')
+
+    # P(win with pattern p on the j-th marked card cell)
+    win_by_cell = np.zeros((num_patterns, num_drawable + 1))
+    for j in range(1, num_drawable + 1):
+        pairs = np.bincount(credited, weights=set_counts[j] * num_winning_cells, minlength=num_patterns)
+        win_by_cell[:, j] = pairs / (j * comb(num_drawable, j))
+
+    # P(the j-th card number is drawn on the n-th bingo ball)
+    ball_of_cell = np.zeros((num_drawable + 1, num_tries))
+    for j in range(1, num_drawable + 1):
+        for n in range(j, num_balls - num_drawable + j + 1):
+            if n < num_tries:
+                ball_of_cell[j, n] = comb(n - 1, j - 1) * comb(num_balls - n, num_drawable - j) / \
+                    comb(num_balls, num_drawable)
+
+    return win_by_cell @ ball_of_cell
+
+
+# ------------------------------------------------------------------------
+
+def exact_tries(free_cell=False, num_simulations=None, geometry=None):
+    """Returns the exact tries distribution with the same columns as BingoStats.df_tries.
+    :param: free_cell (bool) Is the center cell considered free? (default: False)
+    :param: num_simulations (int) If given, the expected counts for that many games, otherwise probabilities
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (pd.DataFrame) indexed by the number of bingo balls"""
+
+    import pandas as pd
+
+    geometry = bc.as_geometry(geometry)
+    _, _, tries_columns, tries_matrix = get_column_tables(geometry)
+
+    tries = exact_tries_distribution(free_cell, geometry) * (1 if num_simulations is None else num_simulations)
+    return pd.DataFrame((tries_matrix @ tries).T, columns=[name for name, _ in tries_columns])
+
+
+# ------------------------------------------------------------------------
+
+def exact_num_bingo(free_cell=False, num_simulations=None, geometry=None):
+    """Returns the exact share of each type of BINGO win with the same columns as BingoStats.df_num_bingo.
+    :param: free_cell (bool) Is the center cell considered free? (default: False)
+    :param: num_simulations (int) If given, the expected counts for that many games, otherwise probabilities
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (pd.DataFrame) as a single row"""
+
+    import pandas as pd
+
+    geometry = bc.as_geometry(geometry)
+    num_bingo_columns, num_bingo_matrix, _, _ = get_column_tables(geometry)
+
+    bingo_counts = exact_tries_distribution(free_cell, geometry).sum(axis=1) * (1 if num_simulations is None else
+                                                                                  num_simulations)
+    return pd.DataFrame([num_bingo_matrix @ bingo_counts], columns=[name for name, _ in num_bingo_columns])
@@ -0,0 +1,133 @@
+"""Bulk factory of BINGO cards: many cards at once as a compact (N, card_length, card_length) int8 array.
+
+Each column of a card is an ordered sample of card_length of its column_range numbers, without replacement.  When
+there are few enough of them (get_num_column_samples(), 360,360 for 5 of 15), all the ordered samples are listed once in
+a table, so a column takes one uniform random integer and a table lookup, instead of sorting column_range random
+numbers.  Larger card geometries draw card_length uniform integers per column instead, the k-th one below
+column_range - k, and decode them as the Lehmer code of the sample (the k-th number is the d-th one not taken yet)."""
+
+from functools import lru_cache
+from itertools import chain, permutations
+from math import perm
+import numpy as np
+from bingo_simulator import bingo_card as bc
+
+# Largest number of ordered column samples listed in a table, above it columns are Lehmer decoded
+MAX_TABLE_SAMPLES = 2**22
+
+
+# ------------------------------------------------------------------------
+
+def get_num_column_samples(geometry=None):
+    """Returns the number of ordered samples of a column, card_length numbers out of column_range.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (int) column_range! / (column_range - card_length)!"""
+
+    geometry = bc.as_geometry(geometry)
+    return perm(geometry.column_range, geometry.card_length)
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_column_samples(geometry=None):
+    """Returns every ordered sample of card_length numbers out of a column, in lexicographic order.
+    :param: geometry (CardGeometry) The card layout, with at most MAX_TABLE_SAMPLES samples (default:
+    bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (num_column_samples, card_length) of offsets 0..column_range - 1 into
+    the column numbers.  The table is cached per geometry, do not modify it."""
+
+    geometry = bc.as_geometry(geometry)
+    num_samples = get_num_column_samples(geometry)
+
+    if num_samples > MAX_TABLE_SAMPLES:
+        raise ValueError(f'Too many column samples to list for {geometry} in get_column_samples(): {num_samples}.')
+
+    samples = np.fromiter(chain.from_iterable(permutations(range(0, geometry.column_range), geometry.card_length)),
+                          dtype=np.int8, count=num_samples * geometry.card_length)
+
+    return samples.reshape(num_samples, geometry.card_length)
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_sample_bounds(geometry=None):
+    """Returns the exclusive upper bounds of the uniform random integers that make up the columns of a card.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int64 array, of shape (card_length,) of num_column_samples each if the column samples fit
+    in a table (one table index per column), else of shape (card_length, card_length), [col, k] being
+    column_range - k (one Lehmer code digit per cell).  Cached per geometry, do not modify it."""
+
+    geometry = bc.as_geometry(geometry)
+    num_samples = get_num_column_samples(geometry)
+
+    if num_samples <= MAX_TABLE_SAMPLES:
+        return np.full(geometry.card_length, num_samples, dtype=np.int64)
+
+    digit_bounds = geometry.column_range - np.arange(0, geometry.card_length, dtype=np.int64)
+    return np.tile(digit_bounds, (geometry.card_length, 1))
+
+
+# ------------------------------------------------------------------------
+
+def decode_column_samples(digits, column_range):
+    """Decodes Lehmer codes into ordered column samples: the k-th offset is the digits[..., k]-th offset (from 0)
+    not taken by the previous ones.
+    :param: digits (np.ndarray) int array of shape (..., card_length), digits[..., k] below column_range - k
+    :param: column_range (int) The number of numbers per column
+    :return: (np.ndarray) int8 array of the same shape, of distinct offsets 0..column_range - 1 along the last axis"""
+
+    flat_digits = digits.reshape(-1, digits.shape[-1])
+    free = np.ones((flat_digits.shape[0], column_range), dtype=bool)
+    offsets = np.empty(flat_digits.shape, dtype=np.int8)
+    rows = np.arange(0, flat_digits.shape[0])
+
+    for k in range(0, flat_digits.shape[1]):
+        # The d-th free offset is the first one with d + 1 free offsets up to it
+        chosen = (np.cumsum(free, axis=1) > flat_digits[:, k, np.newaxis]).argmax(axis=1)
+        offsets[:, k] = chosen
+        free[rows, chosen] = False
+
+    return offsets.reshape(digits.shape)
+
+
+# ------------------------------------------------------------------------
+
+def build_cards(samples, free_cell, geometry=None):
+    """Builds cards from the sample drawn for each of their columns.
+    :param: samples (np.ndarray) int array of shape (N,) + get_sample_bounds(geometry).shape, uniform below those
+    bounds for random cards: [n, col] the index into get_column_samples() of column col of card n, or [n, col, k]
+    the Lehmer code digits of column col of card n
+    :param: free_cell (bool) Is the center cell considered free?  Free cells hold the number 0.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (N, card_length, card_length), the numbers of each card row by row"""
+
+    geometry = bc.as_geometry(geometry)
+    card_length = geometry.card_length
+
+    # [n, col, row] offsets, to [n, row, col] numbers
+    if samples.ndim == 2:
+        columns = get_column_samples(geometry)[samples]
+    else:
+        columns = decode_column_samples(samples, geometry.column_range)
+    cards = np.ascontiguousarray(columns.transpose(0, 2, 1))
+    cards += (geometry.column_range * np.arange(0, card_length, dtype=np.int8) + 1)
+
+    if free_cell and geometry.mid_cell is not None:
+        cards[:, card_length // 2, card_length // 2] = 0
+
+    return cards
+
+
+# ------------------------------------------------------------------------
+
+def get_card(cards, index, free_cell, geometry=None):
+    """Returns one card of a block of cards as a BingoCard, e.g. to print or replay it ball by ball.
+    :param: cards (np.ndarray) int8 array of shape (N, card_length, card_length), see build_cards()
+    :param: index (int) The card to get
+    :param: free_cell (bool) Is the center cell considered free (already marked)?
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (BingoCard) class, unmarked except for the free cell"""
+
+    return bc.BingoCard.from_numbers(cards[index].tobytes(), free_cell, geometry)
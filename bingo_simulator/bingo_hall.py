@@ -0,0 +1,161 @@
+"""Contains classes to run "bingo hall" games, where one draw of bingo balls is played against many cards at once."""
+
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_batch
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_simulator_main import BingoStats
+
+
+class BingoHallStats:
+    """A class holding statistics from bingo hall games, each game being one draw played against num_cards cards:
+    - card_stats (BingoStats): the BINGO of every card, as if it was played alone (num_cards per game)
+    - first_win_stats (BingoStats): the first BINGO of each game, i.e. the ball the hall got its first winner(s) on,
+      credited to the winning pattern of the first winning card in hall order.  Its pattern completion times are
+      those of the hall, the first ball on which any card completes the pattern.
+    - num_winners[c]: the number of games won by c cards together on the first winning ball"""
+
+    def __init__(self, num_games, num_cards, geometry=None):
+        """:param: num_games (int) The number of games the statistics are for
+        :param: num_cards (int) The number of cards in play in each game
+        :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)"""
+
+        self.num_games = num_games
+        self.num_cards = num_cards
+
+        self.card_stats = BingoStats(num_games * num_cards, geometry)
+        self.first_win_stats = BingoStats(num_games, geometry)
+        self.geometry = self.card_stats.geometry
+        self.num_winners = np.zeros(num_cards + 1, dtype=np.int64)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def df_num_winners(self):
+        """(pd.DataFrame) The number of games won by each number of cards together, indexed by the number of
+        winning cards."""
+
+        import pandas as pd
+
+        return pd.DataFrame({'num_games': self.num_winners})
+
+    # ------------------------------------------------------------------------
+
+    def merge(self, other):
+        """Merges the statistics of another run of the same hall size into these statistics.
+        :param: other (BingoHallStats) class
+        :return: (BingoHallStats) self, holding the statistics of both runs"""
+
+        if other.num_cards != self.num_cards:
+            raise ValueError(f'Cannot merge bingo halls of {other.num_cards} and {self.num_cards} cards.')
+
+        self.num_games += other.num_games
+        self.card_stats.merge(other.card_stats)
+        self.first_win_stats.merge(other.first_win_stats)
+        self.num_winners += other.num_winners
+
+        return self
+
+    # ------------------------------------------------------------------------
+
+    def __add__(self, other):
+        return BingoHallStats(0, self.num_cards, self.geometry).merge(self).merge(other)
+
+    # ------------------------------------------------------------------------
+
+    def print_summary(self):
+        """Prints a summary of the bingo hall results to the console.
+        :param: None
+        :return: None"""
+
+        balls = np.arange(0, self.geometry.num_tries)
+        first_win_tries = self.first_win_stats.tries.sum(axis=0)
+        card_tries = self.card_stats.tries.sum(axis=0)
+
+        print(f"\nBingo hall summary: {self.num_games:,} games of {self.num_cards:,} cards\n")
+        print("Mean bingo balls to first winner: {:.2f}".format((first_win_tries * balls).sum() / self.num_games))
+        print("Mean bingo balls to win per card: {:.2f}".format((card_tries * balls).sum() / (self.num_games *
+                                                                                                self.num_cards)))
+        print("Mean number of winners: {:.3f}".format((self.num_winners * np.arange(0, self.num_cards + 1)).sum() /
+                                                       self.num_games))
+
+        for num_winners in np.flatnonzero(self.num_winners):
+            print(f"{num_winners} winner(s): {self.num_winners[num_winners]} games, "
+                  f"{100.0 * self.num_winners[num_winners] / self.num_games}%")
+
+    # ------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------
+
+def play_bingo_hall(hall_stats, free_cell, num_games, batch_size=bingo_batch.DEFAULT_BATCH_SIZE, seed_key=None,
+                    first_game=0):
+    """Plays num_games bingo hall games, each one draw against hall_stats.num_cards fresh cards, and adds the results
+    to hall_stats.  A block of games is played at once: the draw ranks are computed once per game and broadcast over
+    its cards.  Game g plays draw g against cards g * num_cards to (g + 1) * num_cards - 1 of the seed key (see
+    bingo_rng.py), so a hall of one card plays the same games as BingoSimulator.
+    :param: hall_stats (BingoHallStats) class
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: num_games (int) The number of games to play
+    :param: batch_size (int) The number of cards to play per block (bounds memory use), at least one game per block
+    :param: seed_key (int) The seed key of the run, see bingo_rng.get_seed_key() (default: a fresh random one)
+    :param: first_game (int) The index of the first game to play (default: 0)
+    :return: None"""
+
+    if seed_key is None:
+        seed_key = bingo_rng.get_seed_key()
+
+    num_cards = hall_stats.num_cards
+    geometry = hall_stats.geometry
+    games_per_block = max(1, batch_size // num_cards)
+
+    for block_start in range(first_game, first_game + num_games, games_per_block):
+        block_size = min(games_per_block, first_game + num_games - block_start)
+        games = np.arange(block_size)
+
+        card_indices = np.arange(block_start * num_cards, (block_start + block_size) * num_cards)
+        cards = bingo_rng.generate_cards(seed_key, card_indices, free_cell, geometry)
+        draws = bingo_rng.generate_draws(seed_key, games + block_start, geometry)
+
+        completion = bingo_batch.get_completion_ranks(cards.reshape(block_size, num_cards, geometry.num_cells),
+                                                      bingo_batch.get_draw_ranks(draws)[:, np.newaxis, :], geometry)
+        card_balls = completion.min(axis=2)
+        card_pattern = (completion == card_balls[:, :, np.newaxis]).argmax(axis=2)
+        hall_stats.card_stats.add_tries(bingo_batch.count_tries(card_balls.ravel(), card_pattern.ravel(), geometry))
+        hall_stats.card_stats.add_completions(completion.reshape(block_size * num_cards, -1), card_balls.ravel())
+
+        first_ball = card_balls.min(axis=1)
+        is_winner = card_balls == first_ball[:, np.newaxis]
+        first_card = is_winner.argmax(axis=1)
+        hall_stats.first_win_stats.add_tries(bingo_batch.count_tries(first_ball, card_pattern[games, first_card],
+                                                                     geometry))
+        hall_stats.num_winners += np.bincount(is_winner.sum(axis=1), minlength=num_cards + 1)
+
+        # The hall completes a pattern on the first ball any of its cards does
+        hall_stats.first_win_stats.add_completions(completion.min(axis=1), first_ball)
+
+
+class BingoHall:
+    """A class that runs bingo hall games multiple times and keeps track of statistics of the winners."""
+
+    def __init__(self, num_games, num_cards, seed=None, geometry=None):
+        """:param: num_games (int) The number of games to play
+        :param: num_cards (int) The number of cards in play in each game
+        :param: seed (int, np.random.SeedSequence or None) The master seed, None for a fresh random one
+        :param: geometry (CardGeometry) The card layout, see bc.get_geometry() (default: bc.DEFAULT_GEOMETRY)"""
+
+        self.stats = BingoHallStats(num_games, num_cards, geometry)
+
+        self.seed_key = bingo_rng.get_seed_key(seed)
+
+    # ------------------------------------------------------------------------
+
+    def play_bingo(self, free_cell, batch_size=bingo_batch.DEFAULT_BATCH_SIZE):
+        """Plays num_games bingo hall games!
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: batch_size (int) The number of cards to play per block
+        :return: None"""
+
+        play_bingo_hall(self.stats, free_cell, self.stats.num_games, batch_size, self.seed_key)
+
+    # ------------------------------------------------------------------------
@@ -0,0 +1,329 @@
+"""Background BINGO simulation jobs, for servers that cannot block on a run (e.g. the dash app).
+
+A job is a run split in chunks of games, each chunk played as a shard (see bingo_parallel.play_shard()) on a pool
+of workers.  Submitting returns a job id at once; the chunk statistics are merged into the job's statistics as they
+arrive, so partial results can be shown while the run goes on.  Chunks play their own range of game indices of the
+run, so the final statistics are the same as a single BingoSimulator run of the same seed.
+
+Identical requests are coalesced: submitting the parameters of a queued or running job returns that job.  Finished
+jobs of an explicit seed are reused too, their results being the same.  Only the latest max_finished_jobs finished
+jobs are kept: the ids of older ones become unknown.  At most max_active_jobs jobs are queued or running at a time:
+submitting another one raises JobLimitError until one of them finishes."""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from bingo_simulator import bingo_batch
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_parallel import play_shard
+from bingo_simulator.bingo_simulator_main import BingoStats, ENGINE_RANK, ENGINES
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+DEFAULT_CHUNK_GAMES = 100000
+DEFAULT_MAX_FINISHED_JOBS = 32
+DEFAULT_MAX_ACTIVE_JOBS = 4
+
+
+class JobLimitError(RuntimeError):
+    """Raised when submitting a job while max_active_jobs jobs are queued or running."""
+
+
+class BingoJob:
+    """A background simulation run and its partial statistics.  Chunks are merged in from the worker pool threads,
+    so reads go through snapshot() and get_stats()."""
+
+    def __init__(self, job_id, num_simulations, free_cell, engine, seed, batch_size, geometry):
+        """:param: job_id (str) The job id
+        :param: num_simulations (int) The number of BINGO games to play
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: engine (str) One of bingo_simulator_main.ENGINES
+        :param: seed (int or None) The master seed, None for a fresh random one
+        :param: batch_size (int) The number of games per block
+        :param: geometry (CardGeometry) The card layout"""
+
+        self.job_id = job_id
+        self.num_simulations = num_simulations
+        self.free_cell = free_cell
+        self.engine = engine
+        self.seed = seed
+        self.batch_size = batch_size
+        self.geometry = geometry
+
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.seed_key = bingo_rng.get_seed_key(self.seed_seq)
+        self.stats = BingoStats(0, geometry)
+        self.status = JOB_QUEUED
+        self.error = None
+        self.futures = []
+        self.num_chunks = 0
+        self.chunks_done = 0
+        self.submit_time = time.time()
+        self.end_time = None
+        self.finished_event = threading.Event()
+        # Reentrant: cancelling a future under the lock runs its done callback, add_chunk(), in the same thread
+        self.lock = threading.RLock()
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def key(self):
+        """The parameters identifying the run, to coalesce identical requests"""
+
+        return get_job_key(self.num_simulations, self.free_cell, self.engine, self.seed, self.batch_size,
+                           self.geometry)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def finished(self):
+        """Is the job over (done, failed or cancelled)?"""
+
+        return self.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    # ------------------------------------------------------------------------
+
+    def add_chunk(self, future):
+        """Merges the statistics of a finished chunk.  Called by the worker pool as a future done callback.
+        :param: future (concurrent.futures.Future) The future of a play_shard() call
+        :return: None"""
+
+        with self.lock:
+            if self.finished:
+                return
+
+            if future.cancelled():
+                self.status = JOB_CANCELLED
+            elif future.exception() is not None:
+                self.status = JOB_FAILED
+                self.error = repr(future.exception())
+            else:
+                self.status = JOB_RUNNING
+                self.stats.merge(future.result())
+                self.chunks_done += 1
+                if self.chunks_done == self.num_chunks:
+                    self.status = JOB_DONE
+
+            if self.finished:
+                self.finish()
+
+    # ------------------------------------------------------------------------
+
+    def finish(self):
+        """Ends the job, once its status is done, failed or cancelled: cancels the chunks that have not started.
+        :return: None"""
+
+        with self.lock:
+            self.end_time = time.time()
+            self.finished_event.set()
+            for future in self.futures:
+                future.cancel()
+
+    # ------------------------------------------------------------------------
+
+    def snapshot(self):
+        """Returns the progress of the job.
+        :return: (dict) JSON-serializable progress of the job"""
+
+        with self.lock:
+            games_played = int(self.stats.num_simulations)
+            end_time = self.end_time if self.end_time is not None else time.time()
+            elapsed = end_time - self.submit_time
+
+            return {'job_id': self.job_id, 'status': self.status, 'error': self.error,
+                    'games_played': games_played, 'total_games': self.num_simulations,
+                    'fraction_done': games_played / self.num_simulations if self.num_simulations else 1.0,
+                    'games_per_sec': games_played / elapsed if elapsed > 0 else 0.0,
+                    'chunks_done': self.chunks_done, 'num_chunks': self.num_chunks,
+                    'free_cell': self.free_cell, 'engine': self.engine, 'seed_key': self.seed_key,
+                    'geometry': [self.geometry.card_length, self.geometry.column_range, list(self.geometry.patterns)]}
+
+    # ------------------------------------------------------------------------
+
+    def get_stats(self):
+        """Returns a copy of the statistics merged so far.
+        :return: (BingoStats) class, num_simulations being the number of games played so far"""
+
+        with self.lock:
+            return BingoStats(0, self.geometry).merge(self.stats)
+
+    # ------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------
+
+def get_job_key(num_simulations, free_cell, engine, seed, batch_size, geometry):
+    """Returns the parameters identifying a run, to coalesce identical requests.
+    :return: (tuple) hashable key, see BingoJob.__init__() for the parameters"""
+
+    return num_simulations, bool(free_cell), engine, seed, batch_size, bc.as_geometry(geometry).key
+
+
+class BingoJobManager:
+    """Submits simulation jobs to a pool of workers and keeps track of them by job id."""
+
+    def __init__(self, workers=None, chunk_games=DEFAULT_CHUNK_GAMES, executor=None,
+                 max_finished_jobs=DEFAULT_MAX_FINISHED_JOBS, max_active_jobs=DEFAULT_MAX_ACTIVE_JOBS):
+        """:param: workers (int) The number of worker processes (default: the number of CPUs)
+        :param: chunk_games (int) The number of games per chunk, the granularity of partial results
+        :param: executor (concurrent.futures.Executor) The pool to play chunks on (default: a ProcessPoolExecutor
+        of workers, created on the first submit)
+        :param: max_finished_jobs (int) The number of finished jobs kept, the oldest being dropped on submit
+        :param: max_active_jobs (int) The number of jobs queued or running at a time, see submit()"""
+
+        self.workers = workers
+        self.chunk_games = chunk_games
+        self.executor = executor
+        self.max_finished_jobs = max_finished_jobs
+        self.max_active_jobs = max_active_jobs
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    # ------------------------------------------------------------------------
+
+    def get_executor(self):
+        """Returns the worker pool, creating it if needed.  Called with the manager lock held, so that concurrent
+        submits share a single pool.
+        :return: (concurrent.futures.Executor) the pool"""
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        return self.executor
+
+    # ------------------------------------------------------------------------
+
+    def find_job(self, key):
+        """Finds a job to coalesce a request with.
+        :param: key (tuple) The request parameters, see get_job_key()
+        :return: (BingoJob) the job, None if there is none"""
+
+        for job in self.jobs.values():
+            if job.key != key or job.status in (JOB_FAILED, JOB_CANCELLED):
+                continue
+            # A finished run of a random seed is not what a new request for a fresh random run asks for
+            if not job.finished or job.seed is not None:
+                return job
+
+        return None
+
+    # ------------------------------------------------------------------------
+
+    def evict_finished_jobs(self):
+        """Drops the oldest finished jobs beyond max_finished_jobs, so that the jobs of a long-lived server do not grow
+        without bound.  Called with the manager lock held.
+        :return: None"""
+
+        finished_ids = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished_ids[:max(0, len(finished_ids) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    # ------------------------------------------------------------------------
+
+    def submit(self, num_simulations, free_cell, engine=ENGINE_RANK, seed=None,
+               batch_size=bingo_batch.DEFAULT_BATCH_SIZE, geometry=None):
+        """Submits a run, or finds the identical job already submitted.  Returns at once.
+        :param: num_simulations (int) The number of BINGO games to play
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: engine (str) One of bingo_simulator_main.ENGINES (default: ENGINE_RANK)
+        :param: seed (int or None) The master seed, None for a fresh random one
+        :param: batch_size (int) The number of games per block
+        :param: geometry (CardGeometry) The card layout, see bc.get_geometry() (default: bc.DEFAULT_GEOMETRY)
+        :return: (str) the job id, JobLimitError being raised if max_active_jobs other jobs are queued or running"""
+
+        if engine not in ENGINES:
+            raise ValueError(f'Invalid engine "{engine}" in submit(), expected one of: {", ".join(ENGINES)}.')
+        if num_simulations < 1:
+            raise ValueError(f'Number of games must be at least 1 in submit(): {num_simulations}.')
+
+        geometry = bc.as_geometry(geometry)
+
+        with self.lock:
+            self.evict_finished_jobs()
+            job = self.find_job(get_job_key(num_simulations, free_cell, engine, seed, batch_size, geometry))
+            if job is not None:
+                return job.job_id
+
+            num_active = sum(1 for job in self.jobs.values() if not job.finished)
+            if num_active >= self.max_active_jobs:
+                raise JobLimitError(f'{num_active} jobs are already queued or running in submit(), the most there can '
+                                    f'be at a time.')
+
+            job = BingoJob(uuid.uuid4().hex[:12], num_simulations, bool(free_cell), engine, seed, batch_size,
+                           geometry)
+            self.jobs[job.job_id] = job
+            executor = self.get_executor()
+
+        # Register all the futures before any callback can finish the job
+        with job.lock:
+            for first_game in range(0, num_simulations, self.chunk_games):
+                chunk_size = min(self.chunk_games, num_simulations - first_game)
+                job.futures.append(executor.submit(play_shard, first_game, chunk_size, job.free_cell, engine,
+                                                   job.seed_seq, batch_size, geometry))
+            job.num_chunks = len(job.futures)
+
+        for future in job.futures:
+            future.add_done_callback(job.add_chunk)
+
+        return job.job_id
+
+    # ------------------------------------------------------------------------
+
+    def get_job(self, job_id):
+        """Returns a job.
+        :param: job_id (str) The job id, see submit()
+        :return: (BingoJob) the job"""
+
+        if job_id not in self.jobs:
+            raise KeyError(f'Unknown job id in get_job(): {job_id}.')
+
+        return self.jobs[job_id]
+
+    # ------------------------------------------------------------------------
+
+    def cancel(self, job_id):
+        """Cancels the chunks of a job that have not started.  Chunks being played still finish, but are dropped.
+        :param: job_id (str) The job id, see submit()
+        :return: None"""
+
+        job = self.get_job(job_id)
+        with job.lock:
+            if not job.finished:
+                job.status = JOB_CANCELLED
+                job.finish()
+
+    # ------------------------------------------------------------------------
+
+    def wait(self, job_id, timeout=None):
+        """Waits for a job to finish.
+        :param: job_id (str) The job id, see submit()
+        :param: timeout (float) The maximum number of seconds to wait (default: None, no limit)
+        :return: (dict) the progress of the job, see BingoJob.snapshot()"""
+
+        job = self.get_job(job_id)
+        job.finished_event.wait(timeout)
+
+        return job.snapshot()
+
+    # ------------------------------------------------------------------------
+
+    def shutdown(self, wait=True):
+        """Shuts the worker pool down.
+        :param: wait (bool) Wait for the chunks being played to finish (default: True)
+        :return: None"""
+
+        with self.lock:
+            executor, self.executor = self.executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    # ------------------------------------------------------------------------
@@ -0,0 +1,176 @@
+"""Throughput and phase timing instrumentation for BINGO simulation runs."""
+
+import sys
+import time
+
+# Phases of playing a game that engines time: generating cards, generating draws, marking the called balls on the
+# cards, checking for wins and updating the statistics.  The loop engine finds wins while marking (BingoCard.call_ball),
+# so its win checks are part of its marking time.
+PHASES = ['cards', 'draws', 'marking', 'win_check', 'stats']
+
+
+class PhaseTimer:
+    """Cumulative timers of the phases of a run.  Engines call lap(phase) at the end of each phase, which credits the
+    time since the previous lap to that phase."""
+
+    def __init__(self):
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.last_lap = time.perf_counter()
+
+    def lap(self, phase=None):
+        """Ends a phase.
+        :param: phase (str) One of PHASES to credit the time since the previous lap to, None to discard it
+        :return: None"""
+
+        now = time.perf_counter()
+        if phase is not None:
+            self.phase_times[phase] += now - self.last_lap
+        self.last_lap = now
+
+
+class NullTimer:
+    """A PhaseTimer that does nothing, for runs without instrumentation."""
+
+    def lap(self, phase=None):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class RunMonitor:
+    """Tracks the progress of a simulation run: games played, games/sec, ETA and cumulative phase times.  Hooks are
+    called with a report after each chunk of games, and a live progress line can be printed."""
+
+    def __init__(self, progress=False, hooks=None, progress_interval=1.0, stream=None):
+        """:param: progress (bool) Print a live progress line (default: False)
+        :param: hooks (list) Functions called as hook(report) after each chunk of games, see report()
+        :param: progress_interval (float) Minimum number of seconds between progress lines
+        :param: stream (file) Where to print the progress line (default: sys.stderr)"""
+
+        self.progress = progress
+        self.hooks = list(hooks or [])
+        self.progress_interval = progress_interval
+        self.stream = stream
+
+        self.timer = PhaseTimer()
+        self.engine = None
+        self.total_games = 0
+        self.games_played = 0
+        self.start_games = 0
+        self.start_time = None
+        self.end_time = None
+        self.last_progress = 0.0
+
+    # ------------------------------------------------------------------------
+
+    def add_hook(self, hook):
+        """Adds a function to call as hook(report) after each chunk of games.
+        :param: hook (function) Takes the report() dict
+        :return: None"""
+
+        self.hooks.append(hook)
+
+    # ------------------------------------------------------------------------
+
+    def start(self, total_games, games_played=0, engine=None):
+        """Starts (or restarts) timing a run.
+        :param: total_games (int) The number of games of the whole run
+        :param: games_played (int) The number of games already played, e.g. when resuming a run
+        :param: engine (str) The engine playing the run, for the report
+        :return: None"""
+
+        self.engine = engine
+        self.total_games = total_games
+        self.games_played = games_played
+        self.start_games = games_played
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.timer = PhaseTimer()
+
+    # ------------------------------------------------------------------------
+
+    def update(self, num_games):
+        """Records a chunk of games played, then calls the hooks and prints the progress line if due.
+        :param: num_games (int) The number of games just played
+        :return: None"""
+
+        self.games_played += num_games
+
+        if self.hooks:
+            report = self.report()
+            for hook in self.hooks:
+                hook(report)
+
+        now = time.perf_counter()
+        if self.progress and (now - self.last_progress >= self.progress_interval or
+                              self.games_played >= self.total_games):
+            self.last_progress = now
+            self._print_progress()
+
+    # ------------------------------------------------------------------------
+
+    def finish(self):
+        """Stops timing the run.
+        :param: None
+        :return: None"""
+
+        self.end_time = time.perf_counter()
+        if self.progress:
+            print(file=self.stream or sys.stderr)
+
+    # ------------------------------------------------------------------------
+
+    def report(self):
+        """Returns the instrumentation results so far.
+        :param: None
+        :return: (dict) with keys 'engine', 'total_games', 'games_played', 'wall_time' (s), 'games_per_sec',
+        'eta' (s, None if unknown), 'phase_times' (s per phase of PHASES) and 'phase_shares' (fraction of the timed
+        time per phase)"""
+
+        wall_time = 0.0
+        if self.start_time is not None:
+            wall_time = (self.end_time or time.perf_counter()) - self.start_time
+
+        games_this_run = self.games_played - self.start_games
+        games_per_sec = games_this_run / wall_time if wall_time > 0 else 0.0
+        eta = (self.total_games - self.games_played) / games_per_sec if games_per_sec > 0 else None
+
+        phase_times = dict(self.timer.phase_times)
+        timed = sum(phase_times.values())
+        phase_shares = {phase: (phase_time / timed if timed > 0 else 0.0) for phase, phase_time in phase_times.items()}
+
+        return {'engine': self.engine, 'total_games': self.total_games, 'games_played': self.games_played,
+                'wall_time': wall_time, 'games_per_sec': games_per_sec, 'eta': eta, 'phase_times': phase_times,
+                'phase_shares': phase_shares}
+
+    # ------------------------------------------------------------------------
+
+    def print_report(self):
+        """Prints the instrumentation results to the console.
+        :param: None
+        :return: None"""
+
+        report = self.report()
+
+        print("\nPerformance:\n")
+        print(f"Engine: {report['engine']}")
+        print(f"Games played: {report['games_played']:,} of {report['total_games']:,}")
+        print(f"Wall time: {report['wall_time']:.2f} s")
+        print(f"Games/sec: {report['games_per_sec']:,.0f}")
+
+        for phase in PHASES:
+            print(f"{phase}: {report['phase_times'][phase]:.3f} s, {100.0 * report['phase_shares'][phase]:.1f}%")
+
+    # ------------------------------------------------------------------------
+
+    def _print_progress(self):
+        """Prints the live progress line, overwriting the previous one.
+        :param: None
+        :return: None"""
+
+        report = self.report()
+        eta = '?' if report['eta'] is None else time.strftime('%H:%M:%S', time.gmtime(report['eta']))
+
+        print(f"\r{report['games_played']:,}/{report['total_games']:,} games  {report['games_per_sec']:,.0f} games/s"
+              f"  ETA {eta}  ", end='', file=self.stream or sys.stderr, flush=True)
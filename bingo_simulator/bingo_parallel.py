@@ -0,0 +1,78 @@
+"""Runs BINGO simulations split in shards across a pool of worker processes, then merges their statistics."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from bingo_simulator import bingo_batch
+from bingo_simulator.bingo_simulator_main import BingoSimulator, ENGINE_NUMPY
+
+
+# ------------------------------------------------------------------------
+
+def get_shard_sizes(num_simulations, num_shards):
+    """Splits a number of games into shards as evenly as possible.
+    :param: num_simulations (int) The total number of games to play
+    :param: num_shards (int) The number of shards to split the games into
+    :return: (list) of the number of games in each shard, the first shards being the larger ones"""
+
+    if num_shards < 1:
+        raise ValueError(f'Number of shards must be at least 1 in get_shard_sizes(): {num_shards}.')
+
+    shard_size, remainder = divmod(num_simulations, num_shards)
+    return [shard_size + (1 if shard < remainder else 0) for shard in range(0, num_shards)]
+
+
+# ------------------------------------------------------------------------
+
+def play_shard(first_game, num_simulations, free_cell, engine, seed_seq, batch_size, geometry=None):
+    """Plays a single shard of a run.  Runs in a worker process.
+    :param: first_game (int) The index of the first game of this shard in the run
+    :param: num_simulations (int) The number of games in this shard
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: engine (str) One of bingo_simulator_main.ENGINES
+    :param: seed_seq (np.random.SeedSequence) The master seed of the run
+    :param: batch_size (int) The number of games per block
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (BingoStats) the statistics of this shard"""
+
+    sim = BingoSimulator(num_simulations, seed_seq, first_game, geometry)
+    sim.play_bingo(free_cell, engine, batch_size)
+
+    return sim.stats
+
+
+# ------------------------------------------------------------------------
+
+def play_bingo_parallel(num_simulations, free_cell, engine=ENGINE_NUMPY, workers=None, seed=None, num_shards=None,
+                        batch_size=bingo_batch.DEFAULT_BATCH_SIZE, geometry=None):
+    """Plays BINGO num_simulations times, split in shards over a pool of worker processes.  Each shard plays its own
+    range of game indices of the run (see bingo_rng.py), so the merged result only depends on the seed: it is the
+    same for any number of workers or shards, any engine or batch_size, and the same as a single BingoSimulator run.
+    :param: num_simulations (int) The total number of games to play
+    :param: free_cell (bool) Is the center cell considered free?
+    :param: engine (str) One of bingo_simulator_main.ENGINES (default: ENGINE_NUMPY)
+    :param: workers (int) The number of worker processes (default: the number of CPUs).  1 plays in this process.
+    :param: seed (int or None) The master seed, None for a fresh random one
+    :param: num_shards (int) The number of shards to split the games into (default: workers)
+    :param: batch_size (int) The number of games per block
+    :param: geometry (CardGeometry) The card layout, see bc.get_geometry() (default: bc.DEFAULT_GEOMETRY)
+    :return: (BingoStats) the merged statistics of all shards"""
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if num_shards is None:
+        num_shards = workers
+
+    shard_sizes = get_shard_sizes(num_simulations, num_shards)
+    first_games = [sum(shard_sizes[:shard]) for shard in range(0, num_shards)]
+    seed_seq = np.random.SeedSequence(seed)
+    shard_args = (first_games, shard_sizes, [free_cell] * num_shards, [engine] * num_shards,
+                  [seed_seq] * num_shards, [batch_size] * num_shards, [geometry] * num_shards)
+
+    if workers == 1:
+        shard_stats = list(map(play_shard, *shard_args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shard_stats = list(pool.map(play_shard, *shard_args))
+
+    return sum(shard_stats)
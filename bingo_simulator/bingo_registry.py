@@ -0,0 +1,427 @@
+"""Local SQLite registry of BINGO runs, to combine the results of many runs without replaying any game.
+
+Each run is recorded with its parameters (number of games, free cell, card geometry), seed, seed key, game range,
+engine and counters.  Runs of the same free cell and geometry are compatible: get_combined_stats() sums their counters
+exactly, as BingoStats.merge() does for the shards of a parallel run.  Game g of a seed key is the same game in every
+run (see bingo_rng.py), so runs of one seed key whose game ranges overlap share games: only runs of disjoint ranges are
+counted together, see get_disjoint_runs().  Registering the same results twice (e.g. as a results file and as csv
+files) finds the run already recorded.
+
+From the root folder:
+    python -m bingo_simulator.bingo_registry add bingo_results_10m.bin
+    python -m bingo_simulator.bingo_registry add-csv bingo_tries_1m.csv bingo_stats_1m.csv
+    python -m bingo_simulator.bingo_registry list --no-free-cell
+    python -m bingo_simulator.bingo_registry combine --no-free-cell --output bingo_results_all.bin"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_results
+from bingo_simulator.bingo_simulator_main import BingoStats
+
+REGISTRY_FILENAME = "bingo_registry.db"
+
+# Counters every run has, csv imports included (see bingo_results.import_csv())
+BASE_COUNTERS = ('bingo_counts', 'tries')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    num_simulations INTEGER NOT NULL,
+    free_cell INTEGER NOT NULL,
+    card_length INTEGER NOT NULL,
+    column_range INTEGER NOT NULL,
+    patterns TEXT NOT NULL,
+    seed TEXT,
+    seed_key TEXT,
+    first_game INTEGER NOT NULL DEFAULT 0,
+    engine TEXT,
+    run_params TEXT NOT NULL,
+    source TEXT,
+    fingerprint TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS counters (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (free_cell, card_length, column_range, patterns);
+"""
+
+RUN_COLUMNS = ('run_id', 'created', 'num_simulations', 'free_cell', 'card_length', 'column_range', 'patterns', 'seed',
+               'seed_key', 'first_game', 'engine', 'run_params', 'source')
+
+
+# ------------------------------------------------------------------------
+
+def get_fingerprint(stats, free_cell):
+    """Fingerprints the results of a run, to find runs registered twice.
+    :param: stats (BingoStats) class
+    :param: free_cell (bool) Is the center cell considered free?
+    :return: (str) the fingerprint"""
+
+    digest = hashlib.sha1(repr((stats.geometry.key, bool(free_cell), int(stats.num_simulations))).encode('utf-8'))
+    for name in BASE_COUNTERS:
+        digest.update(np.ascontiguousarray(getattr(stats, name), dtype=bingo_results.COUNTER_DTYPE).tobytes())
+
+    return digest.hexdigest()
+
+
+class BingoRegistry:
+    """A registry of runs in a SQLite database file."""
+
+    def __init__(self, path=REGISTRY_FILENAME):
+        """:param: path (str) The database file path, created if needed (default: REGISTRY_FILENAME)"""
+
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+        # Registries created before game ranges were recorded only hold runs from game 0
+        columns = [row['name'] for row in self.connection.execute('PRAGMA table_info(runs)')]
+        if 'first_game' not in columns:
+            with self.connection:
+                self.connection.execute('ALTER TABLE runs ADD COLUMN first_game INTEGER NOT NULL DEFAULT 0')
+
+    # ------------------------------------------------------------------------
+
+    def close(self):
+        """Closes the database.
+        :return: None"""
+
+        self.connection.close()
+
+    # ------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    # ------------------------------------------------------------------------
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ------------------------------------------------------------------------
+
+    def add_run(self, stats, free_cell, seed=None, seed_key=None, engine=None, run_params=None, source=None,
+                counters=None, first_game=0):
+        """Records a run, or finds the same results already recorded.
+        :param: stats (BingoStats) class
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: seed (int) The master seed of the run (default: None, unknown)
+        :param: seed_key (int) The seed key of the run, see bingo_rng.get_seed_key() (default: None, unknown)
+        :param: engine (str) The engine the run was played with (default: None, unknown)
+        :param: run_params (dict) Other JSON-serializable parameters of the run, e.g. batch_size (default: None)
+        :param: source (str) Where the results come from, e.g. a results file path (default: None)
+        :param: counters (tuple) The counters of stats to record (default: all the counters stats recorded, see
+        BingoStats.recorded_counters)
+        :param: first_game (int) The index of the first game of the run, e.g. of a shard (default: 0), the run
+        playing games first_game to first_game + num_simulations - 1 of its seed key
+        :return: (int) the run id"""
+
+        geometry = stats.geometry
+        fingerprint = get_fingerprint(stats, free_cell)
+
+        with self.connection:
+            row = self.connection.execute('SELECT run_id FROM runs WHERE fingerprint = ?', (fingerprint,)).fetchone()
+            if row is not None:
+                return row['run_id']
+
+            cursor = self.connection.execute(
+                'INSERT INTO runs (created, num_simulations, free_cell, card_length, column_range, patterns, seed, '
+                'seed_key, first_game, engine, run_params, source, fingerprint) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), int(stats.num_simulations), int(bool(free_cell)), geometry.card_length,
+                 geometry.column_range, json.dumps(list(geometry.patterns)), None if seed is None else str(seed),
+                 None if seed_key is None else str(seed_key), int(first_game), engine, json.dumps(run_params or {}),
+                 source, fingerprint))
+
+            for name in counters or stats.recorded_counters:
+                counter = np.ascontiguousarray(stats.get_counter(name), dtype=bingo_results.COUNTER_DTYPE)
+                self.connection.execute('INSERT INTO counters (run_id, name, shape, data) VALUES (?, ?, ?, ?)',
+                                        (cursor.lastrowid, name, json.dumps(list(counter.shape)), counter.tobytes()))
+
+        return cursor.lastrowid
+
+    # ------------------------------------------------------------------------
+
+    def add_results_file(self, path):
+        """Records the run of a binary results file, see bingo_results.save_results(), with the counters the file
+        holds.
+        :param: path (str) The results file path
+        :return: (int) the run id"""
+
+        stats, header = bingo_results.load_results(path)
+        run_params = dict(header['run_params'])
+        if 'run_ids' in run_params:
+            # Its games are those of registered runs: recording it too would count them twice
+            raise ValueError(f'Results file of combined runs {run_params["run_ids"]} in add_results_file(): {path}.')
+        free_cell = run_params.pop('free_cell', False)
+        seed = run_params.pop('seed', None)
+        first_game = run_params.pop('first_game', 0)
+        run_params.pop('geometry', None)
+
+        return self.add_run(stats, free_cell, seed, header['seed_key'], header['engine'], run_params, path,
+                            counters=stats.recorded_counters, first_game=first_game)
+
+    # ------------------------------------------------------------------------
+
+    def add_csv(self, tries_path, num_bingo_path, free_cell=False, geometry=None):
+        """Records the run of the csv files of df_tries and df_num_bingo, see bingo_results.import_csv().  The csv
+        files only hold the bingo_counts and tries counters.
+        :param: tries_path (str) The df_tries CSV file path
+        :param: num_bingo_path (str) The df_num_bingo CSV file path
+        :param: free_cell (bool) Is the center cell considered free? (default: False)
+        :param: geometry (CardGeometry) The card layout of the results (default: bc.DEFAULT_GEOMETRY)
+        :return: (int) the run id"""
+
+        stats = bingo_results.import_csv(tries_path, num_bingo_path, geometry)
+
+        return self.add_run(stats, free_cell, source=tries_path, counters=BASE_COUNTERS)
+
+    # ------------------------------------------------------------------------
+
+    def find_runs(self, free_cell=None, geometry=None, card_length=None, engine=None):
+        """Finds the runs of some parameters, None matching any value.
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: geometry (CardGeometry) The card layout, or a tuple (card_length, column_range, patterns)
+        :param: card_length (int) The number of rows and columns of the card, e.g. 5 for all the 5x5 runs
+        :param: engine (str) The engine the runs were played with
+        :return: (list) of dicts, the runs in the order they were recorded, see RUN_COLUMNS"""
+
+        conditions = []
+        values = []
+        if free_cell is not None:
+            conditions.append('free_cell = ?')
+            values.append(int(bool(free_cell)))
+        if geometry is not None:
+            geometry = bc.as_geometry(geometry)
+            conditions.append('card_length = ? AND column_range = ? AND patterns = ?')
+            values += [geometry.card_length, geometry.column_range, json.dumps(list(geometry.patterns))]
+        if card_length is not None:
+            conditions.append('card_length = ?')
+            values.append(card_length)
+        if engine is not None:
+            conditions.append('engine = ?')
+            values.append(engine)
+
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self.connection.execute(f'SELECT {", ".join(RUN_COLUMNS)} FROM runs{where} ORDER BY run_id', values)
+
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run['free_cell'] = bool(run['free_cell'])
+            run['patterns'] = json.loads(run['patterns'])
+            run['run_params'] = json.loads(run['run_params'])
+            run['seed'] = None if run['seed'] is None else int(run['seed'])
+            run['seed_key'] = None if run['seed_key'] is None else int(run['seed_key'])
+            runs.append(run)
+
+        return runs
+
+    # ------------------------------------------------------------------------
+
+    def get_run_stats(self, run_id):
+        """Returns the statistics of a run.  Counters the run did not record (e.g. csv imports) are None.
+        :param: run_id (int) The run id
+        :return: (BingoStats, set) the statistics and the names of the counters recorded"""
+
+        row = self.connection.execute('SELECT num_simulations, card_length, column_range, patterns FROM runs '
+                                      'WHERE run_id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f'Unknown run id in get_run_stats(): {run_id}.')
+
+        geometry = bc.get_geometry(row['card_length'], row['column_range'], tuple(json.loads(row['patterns'])))
+        stats = BingoStats(row['num_simulations'], geometry)
+
+        names = set()
+        for counter in self.connection.execute('SELECT name, shape, data FROM counters WHERE run_id = ?', (run_id,)):
+            if counter['name'] not in stats.COUNTERS:
+                continue
+            data = np.frombuffer(counter['data'], dtype=bingo_results.COUNTER_DTYPE)
+            getattr(stats, counter['name'])[...] = data.reshape(json.loads(counter['shape']))
+            names.add(counter['name'])
+
+        for name in set(stats.COUNTERS) - names:
+            setattr(stats, name, None)
+
+        return stats, names
+
+    # ------------------------------------------------------------------------
+
+    def get_combined_stats(self, runs):
+        """Sums the counters of compatible runs (same free cell and geometry), counting each game once, see
+        get_disjoint_runs().  Counters that some of the runs did not record are None rather than counting part of the
+        games, see BingoStats.merge().
+        :param: runs (list) of run dicts, see find_runs()
+        :return: (BingoStats) class, the statistics of all the games of the runs"""
+
+        if not runs:
+            raise ValueError('No runs to combine in get_combined_stats().')
+
+        params = {(run['free_cell'], run['card_length'], run['column_range'], tuple(run['patterns'])) for run in runs}
+        if len(params) > 1:
+            raise ValueError(f'Cannot combine runs of different free cell or geometry in get_combined_stats(): '
+                             f'{sorted(params)}.')
+
+        combined = None
+        for run in get_disjoint_runs(runs):
+            stats, _ = self.get_run_stats(run['run_id'])
+            combined = stats if combined is None else combined.merge(stats)
+
+        return combined
+
+    # ------------------------------------------------------------------------
+
+    def combine(self, free_cell=None, geometry=None, card_length=None, engine=None):
+        """Sums the counters of all the runs of some parameters, see find_runs() and get_combined_stats().
+        :return: (BingoStats) class, the statistics of all the games of the runs"""
+
+        return self.get_combined_stats(self.find_runs(free_cell, geometry, card_length, engine))
+
+    # ------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------
+
+def get_disjoint_runs(runs):
+    """Selects runs that share no game.  Runs of one seed key share the games of their overlapping game ranges, and
+    counters cannot be split by game: the largest runs are kept first, then each run whose range does not overlap the
+    ones kept.  A run inside another one's range is thus dropped, and so is the smaller of two partly overlapping runs
+    (its games outside the overlap are not counted).  Runs of an unknown seed key share no game with any other run.
+    :param: runs (list) of run dicts, see find_runs()
+    :return: (list) of the run dicts kept, in the order of runs"""
+
+    kept_ranges = {}
+    kept_ids = set()
+    for run in sorted(runs, key=lambda run: (-run['num_simulations'], run['run_id'])):
+        if run['seed_key'] is None:
+            kept_ids.add(run['run_id'])
+            continue
+
+        first_game, last_game = run['first_game'], run['first_game'] + run['num_simulations']
+        ranges = kept_ranges.setdefault(run['seed_key'], [])
+        if all(last_game <= kept_first or first_game >= kept_last for kept_first, kept_last in ranges):
+            ranges.append((first_game, last_game))
+            kept_ids.add(run['run_id'])
+
+    return [run for run in runs if run['run_id'] in kept_ids]
+
+
+# ------------------------------------------------------------------------
+
+def print_runs(runs):
+    """Prints a table of runs.
+    :param: runs (list) of run dicts, see find_runs()
+    :return: None"""
+
+    print('{:>6} {:>14} {:>14} {:>9} {:>9} {:<24} {:<8} {:>20} {}'.format(
+        'run', 'games', 'first_game', 'free_cell', 'card', 'patterns', 'engine', 'seed_key', 'source'))
+    for run in runs:
+        print('{:>6} {:>14,} {:>14,} {:>9} {:>9} {:<24} {:<8} {:>20} {}'.format(
+            run['run_id'], run['num_simulations'], run['first_game'], str(run['free_cell']),
+            f"{run['card_length']}x{run['card_length']}/{run['column_range']}", ','.join(run['patterns']),
+            run['engine'] or '-', run['seed_key'] or '-', run['source'] or '-'))
+    print(f'{len(runs)} runs, {sum(run["num_simulations"] for run in runs):,} games')
+
+
+# ------------------------------------------------------------------------
+
+def add_query_arguments(parser):
+    """Adds the run query options to a command line parser, see find_runs().
+    :param: parser (argparse.ArgumentParser) The parser
+    :return: None"""
+
+    free_cell = parser.add_mutually_exclusive_group()
+    free_cell.add_argument('--free-cell', dest='free_cell', action='store_true', default=None,
+                           help='Only the runs with a free center cell')
+    free_cell.add_argument('--no-free-cell', dest='free_cell', action='store_false',
+                           help='Only the runs without a free center cell')
+    parser.add_argument('--card-length', type=int, help='Only the runs of this card length, e.g. 5')
+    parser.add_argument('--column-range', type=int, help='Only the runs of this column range (needs --card-length)')
+    parser.add_argument('--patterns', nargs='+', help='Only the runs of these win patterns (needs --card-length)')
+    parser.add_argument('--engine', help='Only the runs of this engine')
+
+
+# ------------------------------------------------------------------------
+
+def find_query_runs(registry, args):
+    """Finds the runs of the query options of the command line, see add_query_arguments().
+    :param: registry (BingoRegistry) class
+    :param: args (argparse.Namespace) The parsed command line
+    :return: (list) of run dicts, see find_runs()"""
+
+    geometry = None
+    if args.column_range is not None or args.patterns is not None:
+        geometry = bc.get_geometry(args.card_length or bc.CARD_LENGTH, args.column_range or bc.COLUMN_RANGE,
+                                   tuple(args.patterns or bc.DEFAULT_PATTERNS))
+
+    return registry.find_runs(args.free_cell, geometry, args.card_length, args.engine)
+
+
+# ------------------------------------------------------------------------
+
+def main(argv=None):
+    """Runs the registry command line.
+    :param: argv (list) The command line arguments (default: sys.argv[1:])
+    :return: (int) the exit status"""
+
+    parser = argparse.ArgumentParser(description='Registry of BINGO runs.')
+    parser.add_argument('--registry', default=REGISTRY_FILENAME, help='Registry database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = commands.add_parser('add', help='Record the runs of binary results files')
+    add_parser.add_argument('paths', nargs='+', help='Results files')
+
+    csv_parser = commands.add_parser('add-csv', help='Record the run of df_tries and df_num_bingo csv files')
+    csv_parser.add_argument('tries_path', help='df_tries csv file')
+    csv_parser.add_argument('num_bingo_path', help='df_num_bingo csv file')
+    csv_parser.add_argument('--free-cell', action='store_true', help='The center cell was free')
+
+    list_parser = commands.add_parser('list', help='List the runs')
+    add_query_arguments(list_parser)
+
+    combine_parser = commands.add_parser('combine', help='Combine runs into one binary results file')
+    add_query_arguments(combine_parser)
+    combine_parser.add_argument('--output', default=bingo_results.RESULTS_FILENAME, help='Results file to write')
+
+    args = parser.parse_args(argv)
+
+    with BingoRegistry(args.registry) as registry:
+        if args.command == 'add':
+            for path in args.paths:
+                print(f'{path}: run {registry.add_results_file(path)}')
+        elif args.command == 'add-csv':
+            print(f'{args.tries_path}: run {registry.add_csv(args.tries_path, args.num_bingo_path, args.free_cell)}')
+        elif args.command == 'list':
+            print_runs(find_query_runs(registry, args))
+        else:
+            runs = find_query_runs(registry, args)
+            if not runs:
+                parser.exit(1, 'No runs match the query: nothing to combine.\n')
+            try:
+                stats = registry.get_combined_stats(runs)
+            except ValueError as error:
+                parser.exit(1, f'{error}\n')
+
+            run_ids = [run['run_id'] for run in get_disjoint_runs(runs)]
+            bingo_results.save_results(stats, args.output, run_params={'free_cell': runs[0]['free_cell'],
+                                                                       'run_ids': run_ids})
+            print(f'{args.output}: {stats.num_simulations:,} games of {len(run_ids)} runs')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
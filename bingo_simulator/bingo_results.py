@@ -0,0 +1,205 @@
+"""Compact binary files of BINGO results, loaded through a memory map, plus CSV export and import.
+
+A results file holds the BingoStats counters as fixed-width little-endian int64 arrays, after a small JSON header:
+    MAGIC (8 bytes) | header length (uint64) | JSON header, padded | array | array | ...
+The header records the run (number of games, seed key, engine, run parameters, card geometry), the dtype, shape
+and offset of each array, and the counters the run did not record (missing_counters), which load as None.  Arrays
+start on ALIGNMENT byte boundaries, so load_results() maps them straight into NumPy arrays, with no parsing and no
+copy: a worker only pages in what it reads.
+
+CSV stays the export format of df_tries and df_num_bingo (as bingo_simulator_main writes them).  The per-pattern
+counters are single columns of those DataFrames, so import_csv() rebuilds them exactly: results -> CSV -> results
+gives back the same bingo_counts and tries.  The completion and tie counters (see BingoStats.add_completions()) have
+no CSV columns and are not exported: imported results do not record them."""
+
+import json
+import os
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator.bingo_simulator_main import BingoStats, get_column_tables
+
+RESULTS_FILENAME = "bingo_results.bin"
+
+MAGIC = b'BINGORES'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+COUNTER_DTYPE = '<i8'
+
+# The counters the CSV files hold, see import_csv()
+CSV_COUNTERS = ('bingo_counts', 'tries')
+
+
+# ------------------------------------------------------------------------
+
+def get_aligned(offset):
+    """Rounds an offset up to the next ALIGNMENT boundary.
+    :param: offset (int) The offset in bytes
+    :return: (int) the aligned offset"""
+
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# ------------------------------------------------------------------------
+
+def save_results(stats, path, seed_key=None, engine=None, run_params=None, counters=None):
+    """Atomically writes the results of a run as a binary results file.
+    :param: stats (BingoStats) class
+    :param: path (str) The results file path
+    :param: seed_key (int) The seed key of the run, see bingo_rng.get_seed_key() (default: None, unknown)
+    :param: engine (str) The engine the run was played with (default: None, unknown)
+    :param: run_params (dict) Other JSON-serializable parameters of the run, e.g. free_cell (default: None)
+    :param: counters (tuple) The counters of stats to write, the others are recorded as missing (default: all the
+    counters stats recorded, see BingoStats.recorded_counters)
+    :return: None"""
+
+    counters = counters or stats.recorded_counters
+    geometry = stats.geometry
+    header = {'format_version': FORMAT_VERSION, 'num_simulations': int(stats.num_simulations), 'seed_key': seed_key,
+              'engine': engine, 'run_params': run_params or {},
+              'geometry': [geometry.card_length, geometry.column_range, list(geometry.patterns)],
+              'missing_counters': [name for name in stats.COUNTERS if name not in counters], 'arrays': {}}
+
+    # Offsets depend on the header length, which depends on the offsets: lay out the arrays after a header sized
+    # generously from a first pass
+    arrays = {name: np.ascontiguousarray(stats.get_counter(name), dtype=COUNTER_DTYPE) for name in counters}
+    header_size = get_aligned(len(MAGIC) + 8 + len(json.dumps(header)) + 64 * len(arrays) + ALIGNMENT)
+
+    offset = header_size
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': COUNTER_DTYPE, 'shape': list(array.shape), 'offset': offset}
+        offset = get_aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 8 + len(header_bytes) > header_size:
+        raise ValueError(f'Results header of {len(header_bytes)} bytes does not fit in save_results().')
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as results_file:
+        results_file.write(MAGIC)
+        results_file.write(np.uint64(len(header_bytes)).astype('<u8').tobytes())
+        results_file.write(header_bytes)
+
+        for name, array in arrays.items():
+            results_file.seek(header['arrays'][name]['offset'])
+            results_file.write(array.tobytes())
+
+        results_file.truncate(offset)
+
+    os.replace(temp_path, path)
+
+
+# ------------------------------------------------------------------------
+
+def read_header(path):
+    """Reads the JSON header of a binary results file.
+    :param: path (str) The results file path
+    :return: (dict) the header, see save_results()"""
+
+    with open(path, 'rb') as results_file:
+        if results_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'Not a BINGO results file in read_header(): {path}.')
+
+        header_length = int(np.frombuffer(results_file.read(8), dtype='<u8')[0])
+        header = json.loads(results_file.read(header_length).decode('utf-8'))
+
+    if header['format_version'] > FORMAT_VERSION:
+        raise ValueError(f'Results file format {header["format_version"]} is newer than {FORMAT_VERSION} in '
+                         f'read_header(): {path}.')
+
+    return header
+
+
+# ------------------------------------------------------------------------
+
+def load_results(path, mmap=True):
+    """Loads a binary results file.
+    :param: path (str) The results file path
+    :param: mmap (bool) Map the counters from the file, read-only and with no copy (default: True), else read
+    them into writable arrays, e.g. to keep playing into the statistics
+    :return: (BingoStats, dict) the statistics of the run and the header of the file, see save_results().  The
+    counters missing from the file are None."""
+
+    header = read_header(path)
+    card_length, column_range, patterns = header['geometry']
+    stats = BingoStats(header['num_simulations'], bc.get_geometry(card_length, column_range, tuple(patterns)))
+
+    buffer = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+
+    # Counters missing from the file (not recorded by the run, or written before they existed) are not counted as zero
+    for name in stats.COUNTERS:
+        if name not in header['arrays']:
+            setattr(stats, name, None)
+
+    for name, layout in header['arrays'].items():
+        if name not in stats.COUNTERS:
+            continue
+        counter = np.ndarray(tuple(layout['shape']), dtype=layout['dtype'], buffer=buffer, offset=layout['offset'])
+        if counter.shape != getattr(stats, name).shape:
+            raise ValueError(f'Results file counter {name} has shape {counter.shape}, not '
+                             f'{getattr(stats, name).shape} in load_results(): {path}.')
+        setattr(stats, name, counter)
+
+    return stats, header
+
+
+# ------------------------------------------------------------------------
+
+def export_csv(stats, tries_path, num_bingo_path):
+    """Exports results as the CSV files of df_tries and df_num_bingo.
+    :param: stats (BingoStats) class
+    :param: tries_path (str) The df_tries CSV file path
+    :param: num_bingo_path (str) The df_num_bingo CSV file path
+    :return: None"""
+
+    stats.df_tries.to_csv(tries_path)
+    stats.df_num_bingo.to_csv(num_bingo_path)
+
+
+# ------------------------------------------------------------------------
+
+def get_single_pattern_columns(columns):
+    """Finds, for each win pattern, a DataFrame column that counts it alone.
+    :param: columns (list) of tuples (column name, list of pattern indices), see get_tries_columns()
+    :return: (dict) of pattern index to column name"""
+
+    single_columns = {}
+    for name, patterns in columns:
+        if len(patterns) == 1:
+            single_columns.setdefault(patterns[0], name)
+
+    return single_columns
+
+
+# ------------------------------------------------------------------------
+
+def import_csv(tries_path, num_bingo_path, geometry=None):
+    """Imports results from the CSV files of df_tries and df_num_bingo, e.g. written by export_csv().
+    :param: tries_path (str) The df_tries CSV file path
+    :param: num_bingo_path (str) The df_num_bingo CSV file path
+    :param: geometry (CardGeometry) The card layout of the results (default: bc.DEFAULT_GEOMETRY)
+    :return: (BingoStats) class, num_simulations being the number of games counted, recording the bingo_counts and
+    tries counters only"""
+
+    import pandas as pd
+
+    df_tries = pd.read_csv(tries_path, index_col=0)
+    df_num_bingo = pd.read_csv(num_bingo_path, index_col=0)
+
+    stats = BingoStats(0, geometry)
+    num_bingo_columns, _, tries_columns, _ = get_column_tables(stats.geometry)
+
+    if len(df_tries) != stats.geometry.num_tries:
+        raise ValueError(f'Tries CSV has {len(df_tries)} rows, not {stats.geometry.num_tries} in import_csv(): '
+                         f'{tries_path}.')
+
+    for p, name in get_single_pattern_columns(tries_columns).items():
+        stats.tries[p] = df_tries[name].to_numpy(dtype=np.int64)
+    for p, name in get_single_pattern_columns(num_bingo_columns).items():
+        stats.bingo_counts[p] = df_num_bingo[name].to_numpy(dtype=np.int64)[0]
+
+    stats.num_simulations = int(stats.bingo_counts.sum())
+    for name in stats.COUNTERS:
+        if name not in CSV_COUNTERS:
+            setattr(stats, name, None)
+
+    return stats
@@ -0,0 +1,120 @@
+"""Counter-based random numbers for BINGO games: every game's card and draw are a pure function of (master seed, game
+index), so any game can be replayed on its own and a run can be split in any way across processes and still play
+the same games.
+
+Random keys are built with the SplitMix64 mixing function from a counter, instead of being read from a stateful
+generator: the key of a slot of a game is mix64(mix64(stream key + game * GOLDEN_GAMMA) + slot * GOLDEN_GAMMA).
+Each card column takes one key, mapped to one of the ordered column samples of bingo_factory.py, and draws are the
+argsort of their keys, the same way bingo_batch.generate_draws() argsorts uniform random numbers.  The low bits of
+each key hold its slot number, so the keys of an index are all distinct and any sorting algorithm gives the same
+order, on any machine."""
+
+import numpy as np
+from bingo_simulator import bingo_card as bc
+from bingo_simulator import bingo_factory
+
+# SplitMix64 constants: the counter increment (2^64 / golden ratio) and the finalizer multipliers
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIER1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_MULTIPLIER2 = np.uint64(0x94D049BB133111EB)
+
+# Number of low key bits replaced by the slot number, enough for the num_balls slots of a draw of any card geometry
+SLOT_BITS = 7
+
+# Independent streams of keys per master seed: card numbers and draw orders.  Cards are indexed by card, draws by
+# game; a game of the simulator plays card #game against draw #game.
+STREAM_CARDS = 1
+STREAM_DRAWS = 2
+
+
+# ------------------------------------------------------------------------
+
+def get_seed_key(seed=None):
+    """Turns a master seed into the 64-bit key of a run.
+    :param: seed (int, np.random.SeedSequence or None) The master seed, None for a fresh random one
+    :return: (int) the seed key, the only state needed to replay the games of the run"""
+
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return int(seed_seq.generate_state(1, np.uint64)[0])
+
+
+# ------------------------------------------------------------------------
+
+def mix64(values):
+    """Scrambles 64-bit values with the SplitMix64 finalizer, a bijection whose outputs look independent even for
+    consecutive inputs.
+    :param: values (np.ndarray) uint64 array, modified in place
+    :return: (np.ndarray) values"""
+
+    values ^= values >> np.uint64(30)
+    values *= MIX_MULTIPLIER1
+    values ^= values >> np.uint64(27)
+    values *= MIX_MULTIPLIER2
+    values ^= values >> np.uint64(31)
+
+    return values
+
+
+# ------------------------------------------------------------------------
+
+def get_keys(seed_key, stream, indices, num_slots):
+    """Returns the random keys of a set of cards or draws.
+    :param: seed_key (int) The seed key of the run, see get_seed_key()
+    :param: stream (int) STREAM_CARDS or STREAM_DRAWS
+    :param: indices (np.ndarray) int array of shape (N,) of the card or game indices
+    :param: num_slots (int) The number of keys per index, at most 2^SLOT_BITS
+    :return: (np.ndarray) uint64 array of shape (N, num_slots), distinct within each row"""
+
+    stream_key = mix64(np.array([(seed_key + stream * int(GOLDEN_GAMMA)) % 2**64], dtype=np.uint64))
+    index_keys = mix64(np.asarray(indices, dtype=np.uint64) * GOLDEN_GAMMA + stream_key)
+    slots = np.arange(0, num_slots, dtype=np.uint64)
+
+    keys = mix64(index_keys[:, np.newaxis] + (slots + np.uint64(1)) * GOLDEN_GAMMA)
+    keys &= ~np.uint64((1 << SLOT_BITS) - 1)
+    keys |= slots
+
+    return keys
+
+
+# ------------------------------------------------------------------------
+
+def get_uniform_ints(keys, bound):
+    """Maps random keys to uniform integers below a bound, as the high 64 bits of key * bound.
+    :param: keys (np.ndarray) uint64 array of random keys
+    :param: bound (int or np.ndarray) The exclusive upper bound, below 2^32, or an array of bounds broadcasting
+    against keys
+    :return: (np.ndarray) int64 array of the same shape as keys"""
+
+    bound = np.asarray(bound, dtype=np.uint64)
+    low_product = ((keys & np.uint64(0xFFFFFFFF)) * bound) >> np.uint64(32)
+
+    return (((keys >> np.uint64(32)) * bound + low_product) >> np.uint64(32)).astype(np.int64)
+
+
+# ------------------------------------------------------------------------
+
+def generate_cards(seed_key, indices, free_cell, geometry=None):
+    """Generates the BINGO cards of a run, each column sampled without replacement from its column range.
+    :param: seed_key (int) The seed key of the run, see get_seed_key()
+    :param: indices (np.ndarray) int array of shape (N,) of the card indices, e.g. the game indices
+    :param: free_cell (bool) Is the center cell considered free?  Free cells hold the number 0.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (N, card_length, card_length), see bingo_factory.build_cards()"""
+
+    bounds = bingo_factory.get_sample_bounds(geometry)
+    keys = get_keys(seed_key, STREAM_CARDS, indices, bounds.size).reshape((-1,) + bounds.shape)
+
+    return bingo_factory.build_cards(get_uniform_ints(keys, bounds), free_cell, geometry)
+
+
+# ------------------------------------------------------------------------
+
+def generate_draws(seed_key, indices, geometry=None):
+    """Generates the bingo ball draw orders of a run.
+    :param: seed_key (int) The seed key of the run, see get_seed_key()
+    :param: indices (np.ndarray) int array of shape (N,) of the game indices
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int8 array of shape (N, num_balls), each row a permutation of 1..num_balls"""
+
+    keys = get_keys(seed_key, STREAM_DRAWS, indices, bc.as_geometry(geometry).num_balls)
+    return (keys.argsort(axis=1) + 1).astype(np.int8)
@@ -1,74 +1,390 @@
 """Contains classes to run BINGO several times, plus keeping statistics of each BINGO win."""
 
 from bingo_simulator import bingo_card as bc
-import pandas as pd
+from bingo_simulator import bingo_batch
+from bingo_simulator import bingo_factory
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_monitor import NULL_TIMER
+from functools import lru_cache
+import numpy as np
+
+# pandas is imported by the properties building DataFrames, keeping it off the simulation path (and out of worker
+# processes), see test_simulation_imports_are_light()
 
 # Global filenames
 STATS_TRIES_FILENAME = "bingo_tries.csv"
 BINGO_STATS_FILENAME = "bingo_stats.csv"
 
+# Available engines to play BINGO with
+ENGINE_LOOP = "loop"  # One game at a time, one BingoCard per game
+ENGINE_NUMPY = "numpy"  # Vectorized blocks of games, see bingo_batch.py
+ENGINE_RANK = "rank"  # Vectorized blocks of games, wins found from draw ranks without marking, see bingo_batch.py
+ENGINES = [ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK]
+
+
+def get_pattern_kinds(geometry):
+    """Returns the kinds of win patterns of a geometry other than the traditional ones, which have their own columns.
+    :param: geometry (CardGeometry) The card layout
+    :return: (list) of tuples (kind, list of indices into geometry.win_patterns), in win_patterns order"""
+
+    return [(kind, patterns) for kind, patterns in geometry.pattern_kinds.items() if kind not in bc.TRADITIONAL_KINDS]
+
+
+# ------------------------------------------------------------------------
+
+def get_num_bingo_columns(geometry=None):
+    """Returns the columns of BingoStats.df_num_bingo and the win patterns each one counts: the traditional columns
+    (rows, columns, diagonals, corners) if the traditional patterns are played, then for any other kind of pattern
+    one column per placement (if several) and one for the kind.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (list) of tuples (column name, list of indices into geometry.win_patterns)"""
+
+    geometry = bc.as_geometry(geometry)
+    columns = get_traditional_num_bingo_columns(geometry) if 'traditional' in geometry.patterns else []
+
+    for kind, patterns in get_pattern_kinds(geometry):
+        if len(patterns) > 1:
+            columns.extend((f'num_bingo_{kind}{geometry.win_patterns[p][1]}', [p]) for p in patterns)
+        columns.append((f'num_{kind}_bingo', patterns))
+
+    return columns
+
+
+# ------------------------------------------------------------------------
+
+def get_traditional_num_bingo_columns(geometry):
+    """Returns the df_num_bingo columns of the traditional win patterns.
+    :param: geometry (CardGeometry) The card layout, playing the traditional patterns
+    :return: (list) of tuples (column name, list of indices into geometry.win_patterns)"""
+
+    pattern_index = geometry.pattern_index
+    rows = [pattern_index[('row', i)] for i in range(0, geometry.card_length)]
+    cols = [pattern_index[('col', i)] for i in range(0, geometry.card_length)]
+    diags = [pattern_index[('diag', i)] for i in [1, 2]]
+
+    columns = []
+
+    # How many times a certain row/col got bingo
+    for i in range(0, geometry.card_length):
+        columns.append((f'num_bingo_row{i}', [rows[i]]))
+        columns.append((f'num_bingo_col{i}', [cols[i]]))
+
+    columns.append(('num_row_bingo', rows))
+    columns.append(('num_col_bingo', cols))
+    columns.append(('num_line_bingo', rows + cols))
+
+    # Two diagonals
+    columns.append(('num_diag1_bingo', [diags[0]]))
+    columns.append(('num_diag2_bingo', [diags[1]]))
+    columns.append(('num_diag_bingo', diags))
+
+    # All 4 corners bingo
+    columns.append(('num_corners_bingo', [pattern_index[('corners', None)]]))
+
+    return columns
+
+
+# ------------------------------------------------------------------------
+
+def get_tries_columns(geometry=None):
+    """Returns the columns of BingoStats.df_tries and the win patterns each one counts, in the same way as
+    get_num_bingo_columns().  The CDF columns (num_bingo_tries_sum, num_bingo_tries_cdf) count no pattern, they are
+    left for plotting to fill in.
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (list) of tuples (column name, list of indices into geometry.win_patterns)"""
+
+    geometry = bc.as_geometry(geometry)
+
+    # Tries to get bingo, histogram
+    columns = [('num_bingo_tries', list(range(0, len(geometry.win_patterns)))),
+               ('num_bingo_tries_sum', []),
+               ('num_bingo_tries_cdf', [])]
+
+    if 'traditional' in geometry.patterns:
+        columns.extend(get_traditional_tries_columns(geometry))
+
+    for kind, patterns in get_pattern_kinds(geometry):
+        if len(patterns) > 1:
+            columns.extend((f'num_tries_{kind}{geometry.win_patterns[p][1]}', [p]) for p in patterns)
+        columns.append((f'num_tries_{kind}', patterns))
+
+    return columns
+
+
+# ------------------------------------------------------------------------
+
+def get_traditional_tries_columns(geometry):
+    """Returns the df_tries columns of the traditional win patterns.
+    :param: geometry (CardGeometry) The card layout, playing the traditional patterns
+    :return: (list) of tuples (column name, list of indices into geometry.win_patterns)"""
+
+    pattern_index = geometry.pattern_index
+    rows = [pattern_index[('row', i)] for i in range(0, geometry.card_length)]
+    cols = [pattern_index[('col', i)] for i in range(0, geometry.card_length)]
+    diags = [pattern_index[('diag', i)] for i in [1, 2]]
+
+    columns = []
+
+    for i in range(0, geometry.card_length):
+        columns.append((f'num_tries_row{i}', [rows[i]]))
+        columns.append((f'num_tries_col{i}', [cols[i]]))
+
+    columns.append(('num_tries_rows', rows))
+    columns.append(('num_tries_cols', cols))
+
+    columns.append(('num_tries_diag1', [diags[0]]))
+    columns.append(('num_tries_diag2', [diags[1]]))
+    columns.append(('num_tries_diag', diags))
+
+    columns.append(('num_tries_corners', [pattern_index[('corners', None)]]))
+
+    return columns
+
+
+# ------------------------------------------------------------------------
+
+def get_column_matrix(columns, geometry=None):
+    """Returns the matrix that sums per-pattern counters into DataFrame columns.
+    :param: columns (list) of tuples (column name, list of indices into geometry.win_patterns)
+    :param: geometry (CardGeometry) The card layout (default: bc.DEFAULT_GEOMETRY)
+    :return: (np.ndarray) int64 matrix of shape (len(columns), len(geometry.win_patterns))"""
+
+    column_matrix = np.zeros((len(columns), len(bc.as_geometry(geometry).win_patterns)), dtype=np.int64)
+
+    for c, (_, patterns) in enumerate(columns):
+        column_matrix[c, patterns] = 1
+
+    return column_matrix
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_column_tables(geometry):
+    """Returns the DataFrame columns of BingoStats for a card layout and their matrices, built once per geometry.
+    :param: geometry (CardGeometry) The card layout
+    :return: (list, np.ndarray, list, np.ndarray) the df_num_bingo columns and matrix, then the df_tries columns and
+    matrix, see get_num_bingo_columns(), get_tries_columns() and get_column_matrix().  Do not modify them."""
+
+    num_bingo_columns = get_num_bingo_columns(geometry)
+    tries_columns = get_tries_columns(geometry)
+
+    return (num_bingo_columns, get_column_matrix(num_bingo_columns, geometry),
+            tries_columns, get_column_matrix(tries_columns, geometry))
+
 
 class BingoStats:
     """A class holding statistics from the outcome of each BINGO, including:
     - Number of BINGO simulations
-    - How many times a certain row/col/diagonal/corners got BINGO
-    - How many bingo balls (tries) it took to get a certain row/col/diagonal/corners BINGO"""
-
-    def __init__(self, num_simulations):
+    - How many times a certain row/col/diagonal/corners (or other win pattern of the geometry) got BINGO
+    - How many bingo balls (tries) it took to get a certain row/col/diagonal/corners (or other) BINGO
+
+    During a run the statistics accumulate per win pattern (in geometry.win_patterns order) in integer arrays:
+    - bingo_counts[p], the number of BINGO wins of pattern p
+    - tries[p, n], the number of BINGO wins of pattern p on the n-th bingo ball
+    and, whatever pattern wins, per pattern and tie (see add_completions()):
+    - completion_tries[p, n], the number of games in which pattern p completes on the n-th bingo ball
+    - tie_matrix[p, q], the number of games in which patterns p and q both complete on the winning ball
+    - num_tied[k], the number of games in which k patterns complete on the winning ball
+    df_num_bingo, df_tries, df_survival, df_ties and df_num_tied are materialized from these counters on demand.
+    Statistics loaded from results without the completion and tie counters (e.g. imported from csv files) hold None
+    for them, see get_counter().
+    They are sized and their columns derived from the geometry, so registering a new win pattern (see
+    bc.register_win_pattern()) needs no change here."""
+
+    # The counters, all summed by merge(); None when not recorded
+    COUNTERS = ('bingo_counts', 'tries', 'completion_tries', 'tie_matrix', 'num_tied')
+
+    def __init__(self, num_simulations, geometry=None):
+        """:param: num_simulations (int) The number of BINGO games the statistics are for
+        :param: geometry (CardGeometry) The card layout, which sizes the counters (default: bc.DEFAULT_GEOMETRY)"""
 
         self.num_simulations = num_simulations
+        self.geometry = bc.as_geometry(geometry)
+
+        num_patterns = len(self.geometry.win_patterns)
+        self.bingo_counts = np.zeros(num_patterns, dtype=np.int64)
+        self.tries = np.zeros((num_patterns, self.geometry.num_tries), dtype=np.int64)
+
+        self.completion_tries = np.zeros((num_patterns, self.geometry.num_balls + 1), dtype=np.int64)
+        self.tie_matrix = np.zeros((num_patterns, num_patterns), dtype=np.int64)
+        self.num_tied = np.zeros(num_patterns + 1, dtype=np.int64)
+
+    # ------------------------------------------------------------------------
 
-        self.df_num_bingo = pd.DataFrame()
+    @property
+    def recorded_counters(self):
+        """(tuple) The names of the counters recorded, in COUNTERS order: those that are not None."""
 
-        # How many times a certain row/col got bingo
-        for i in range(0, bc.CARD_LENGTH):
-            self.df_num_bingo[f'num_bingo_row{i}'] = pd.Series([0])
-            self.df_num_bingo[f'num_bingo_col{i}'] = pd.Series([0])
+        return tuple(name for name in self.COUNTERS if getattr(self, name) is not None)
 
-        self.df_num_bingo['num_row_bingo'] = pd.Series([0])
-        self.df_num_bingo['num_col_bingo'] = pd.Series([0])
-        self.df_num_bingo['num_line_bingo'] = pd.Series([0])
+    # ------------------------------------------------------------------------
+
+    def get_counter(self, name):
+        """Returns a counter, which must have been recorded.
+        :param: name (str) The counter name, one of COUNTERS
+        :return: (np.ndarray) the counter"""
+
+        counter = getattr(self, name)
+        if counter is None:
+            raise ValueError(f'Counter {name} was not recorded for these statistics in get_counter().')
+
+        return counter
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def df_num_bingo(self):
+        """(pd.DataFrame) How many times each row/col/diagonal/corners got BINGO, as a single row."""
+
+        import pandas as pd
+
+        num_bingo_columns, num_bingo_matrix, _, _ = get_column_tables(self.geometry)
+        return pd.DataFrame([num_bingo_matrix @ self.bingo_counts], columns=[name for name, _ in num_bingo_columns])
 
-        # Two diagonals
-        self.df_num_bingo['num_diag1_bingo'] = pd.Series([0])
-        self.df_num_bingo['num_diag2_bingo'] = pd.Series([0])
-        self.df_num_bingo['num_diag_bingo'] = pd.Series([0])
+    # ------------------------------------------------------------------------
+
+    @property
+    def df_tries(self):
+        """(pd.DataFrame) Histograms of the number of bingo balls (tries) it took for each BINGO win, indexed by the
+        number of bingo balls."""
 
-        # All 4 corners bingo
-        self.df_num_bingo['num_corners_bingo'] = pd.Series([0])
+        import pandas as pd
 
-        self.df_tries = pd.DataFrame()
+        _, _, tries_columns, tries_matrix = get_column_tables(self.geometry)
+        return pd.DataFrame((tries_matrix @ self.tries).T, columns=[name for name, _ in tries_columns])
 
-        # Tries to get bingo, histogram
-        self.df_tries['num_bingo_tries'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                        columns=range(1))
+    # ------------------------------------------------------------------------
 
-        self.df_tries['num_bingo_tries_sum'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                            columns=range(1))
+    @property
+    def df_survival(self):
+        """(pd.DataFrame) The survival curve of each win pattern, whether it wins or not: the share of games in
+        which it is not complete yet after n bingo balls, indexed by n (0 to num_balls), one column per pattern named
+        after geometry.pattern_names."""
 
-        self.df_tries['num_bingo_tries_cdf'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                            columns=range(1))
+        import pandas as pd
 
-        for i in range(0, bc.CARD_LENGTH):
-            self.df_tries[f'num_tries_row{i}'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                              columns=range(1))
-            self.df_tries[f'num_tries_col{i}'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                              columns=range(1))
+        completion_tries = self.get_counter('completion_tries')
+        num_games = max(int(completion_tries[0].sum()), 1)
+        survival = 1.0 - np.cumsum(completion_tries, axis=1) / num_games
 
-        self.df_tries['num_tries_rows'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                       columns=range(1))
-        self.df_tries['num_tries_cols'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                       columns=range(1))
+        return pd.DataFrame(survival.T, columns=self.geometry.pattern_names)
+
+    # ------------------------------------------------------------------------
 
-        self.df_tries['num_tries_diag1'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                        columns=range(1))
-        self.df_tries['num_tries_diag2'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                        columns=range(1))
-        self.df_tries['num_tries_diag'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                       columns=range(1))
+    @property
+    def df_ties(self):
+        """(pd.DataFrame) Per win pattern, indexed by geometry.pattern_names: num_bingo, the games credited to it (the
+        first of the patterns completing on the winning ball), and num_tied_bingo, the games in which it completes
+        on the winning ball, tied or not."""
 
-        self.df_tries['num_tries_corners'] = pd.DataFrame(0, index=range(bc.CARD_LENGTH * bc.COLUMN_RANGE),
-                                                          columns=range(1))
+        import pandas as pd
+
+        return pd.DataFrame({'num_bingo': self.bingo_counts, 'num_tied_bingo': np.diag(self.get_counter('tie_matrix'))},
+                            index=self.geometry.pattern_names)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def df_tie_matrix(self):
+        """(pd.DataFrame) The number of games in which two win patterns both complete on the winning ball, indexed
+        and with columns by geometry.pattern_names."""
+
+        import pandas as pd
+
+        return pd.DataFrame(self.get_counter('tie_matrix'), index=self.geometry.pattern_names,
+                            columns=self.geometry.pattern_names)
+
+    # ------------------------------------------------------------------------
+
+    @property
+    def df_num_tied(self):
+        """(pd.DataFrame) The number of games by the number of win patterns completing on the winning ball, indexed
+        by that number (1 for a single winning pattern)."""
+
+        import pandas as pd
+
+        num_tied = self.get_counter('num_tied')
+        return pd.DataFrame({'num_games': num_tied[1:]}, index=np.arange(1, num_tied.size))
+
+    # ------------------------------------------------------------------------
+
+    def record_bingo(self, pattern_index, num_bingo_balls):
+        """Records a single BINGO win.
+        :param: pattern_index (int) The index into geometry.win_patterns of the winning pattern
+        :param: num_bingo_balls (int) The number of bingo balls called to get BINGO
+        :return: None"""
+
+        self.bingo_counts[pattern_index] += 1
+        self.tries[pattern_index, num_bingo_balls] += 1
+
+    # ------------------------------------------------------------------------
+
+    def add_tries(self, tries):
+        """Adds a block of BINGO wins to the statistics, e.g. from a batch engine.
+        :param: tries (np.ndarray) Integer matrix of shape (len(geometry.win_patterns), geometry.num_tries), where
+        tries[p, n] is the number of games won by pattern geometry.win_patterns[p] on the n-th bingo ball.
+        :return: None"""
+
+        self.tries += tries
+        self.bingo_counts += tries.sum(axis=1)
+
+    # ------------------------------------------------------------------------
+
+    def add_completions(self, completion, num_bingo_balls):
+        """Adds the completion times of every win pattern of a block of games to the statistics.
+        :param: completion (np.ndarray) int array of shape (N, len(geometry.win_patterns)), [g, p] being the bingo
+        ball on which pattern p completes in game g, see bingo_batch.get_completion_ranks()
+        :param: num_bingo_balls (np.ndarray) int array of shape (N,), the number of bingo balls each game took to get
+        BINGO, i.e. the smallest completion of each game
+        :return: None"""
+
+        num_patterns, num_columns = self.completion_tries.shape
+        flat_index = np.arange(0, num_patterns) * num_columns + completion
+        self.completion_tries += np.bincount(flat_index.ravel(), minlength=num_patterns * num_columns).reshape(
+            num_patterns, num_columns)
+
+        # Ties: most games have a single winning pattern, only the others need the pairwise counts
+        tied = completion == num_bingo_balls[:, np.newaxis]
+        games_tied = tied.sum(axis=1)
+        self.num_tied += np.bincount(games_tied, minlength=num_patterns + 1)
+
+        shared = tied[games_tied > 1].astype(np.int64)
+        self.tie_matrix += shared.T @ shared
+        self.tie_matrix[np.diag_indices(num_patterns)] += tied[games_tied == 1].sum(axis=0)
+
+    # ------------------------------------------------------------------------
+
+    def merge(self, other):
+        """Merges the statistics of another run (e.g. a shard of a parallel run) into these statistics.  A counter
+        that either run did not record is not recorded for both (None), rather than counting part of the games.
+        :param: other (BingoStats) class, of the same geometry
+        :return: (BingoStats) self, holding the statistics of both runs"""
+
+        if other.geometry != self.geometry:
+            raise ValueError(f'Cannot merge statistics of {other.geometry} into {self.geometry} in merge().')
+
+        self.num_simulations += other.num_simulations
+        for name in self.COUNTERS:
+            if getattr(self, name) is None or getattr(other, name) is None:
+                setattr(self, name, None)
+            else:
+                getattr(self, name)[...] += getattr(other, name)
+
+        return self
+
+    # ------------------------------------------------------------------------
+
+    def __add__(self, other):
+        return BingoStats(0, self.geometry).merge(self).merge(other)
+
+    # ------------------------------------------------------------------------
+
+    def __radd__(self, other):
+        # Allows sum() over a list of BingoStats, which starts from 0
+        if other == 0:
+            return BingoStats(0, self.geometry).merge(self)
+        return NotImplemented
 
     # ------------------------------------------------------------------------
 
@@ -78,7 +394,8 @@ class BingoStats:
         :param: num_result (pd.Series) The number of BINGO(s) that occurred.
         :return: None"""
 
-        print("{} bingo:  {}, {}%".format(item, int(num_result.values), self._compute_percentage(num_result)))
+        num_result = int(num_result.values[0])
+        print("{} bingo:  {}, {}%".format(item, num_result, self._compute_percentage(num_result)))
 
     # ------------------------------------------------------------------------
 
@@ -97,93 +414,218 @@ class BingoStats:
         :param: None
         :return: None"""
 
-        bingo_ref = {0: 'B', 1: 'I', 2: 'N', 3: 'G', 4: 'O'}
+        bingo_ref = self.geometry.column_labels
+        traditional = 'traditional' in self.geometry.patterns
+        pattern_kinds = get_pattern_kinds(self.geometry)
+        df_num_bingo = self.df_num_bingo
+        df_tries = self.df_tries
 
         print("\nSummary:\n")
 
-        for i in range(0, bc.CARD_LENGTH):
-            self._print_bingo_result(f"Row {i}", self.df_num_bingo[f'num_bingo_row{i}'])
-            self._print_bingo_result(f"Column {bingo_ref[i]}", self.df_num_bingo[f'num_bingo_col{i}'])
+        if traditional:
+            for i in range(0, self.geometry.card_length):
+                self._print_bingo_result(f"Row {i}", df_num_bingo[f'num_bingo_row{i}'])
+                self._print_bingo_result(f"Column {bingo_ref[i]}", df_num_bingo[f'num_bingo_col{i}'])
 
-        self._print_bingo_result("Row", self.df_num_bingo[f'num_row_bingo'])
-        self._print_bingo_result("Column", self.df_num_bingo[f'num_col_bingo'])
-        self._print_bingo_result("Line", self.df_num_bingo[f'num_line_bingo'])
+            self._print_bingo_result("Row", df_num_bingo[f'num_row_bingo'])
+            self._print_bingo_result("Column", df_num_bingo[f'num_col_bingo'])
+            self._print_bingo_result("Line", df_num_bingo[f'num_line_bingo'])
 
-        for i in [1, 2]:
-            self._print_bingo_result(f"Diagonal {i}", self.df_num_bingo[f'num_diag{i}_bingo'])
+            for i in [1, 2]:
+                self._print_bingo_result(f"Diagonal {i}", df_num_bingo[f'num_diag{i}_bingo'])
 
-        self._print_bingo_result("Diagonal", self.df_num_bingo[f'num_diag_bingo'])
+            self._print_bingo_result("Diagonal", df_num_bingo[f'num_diag_bingo'])
 
-        self._print_bingo_result("Corners", self.df_num_bingo['num_corners_bingo'])
+            self._print_bingo_result("Corners", df_num_bingo['num_corners_bingo'])
 
-        print("Num total tries:", self.df_tries['num_bingo_tries'].values)
-        print("Num corner tries:", self.df_tries['num_tries_corners'].values)
+        for kind, patterns in pattern_kinds:
+            label = kind.replace('_', ' ').capitalize()
+            if len(patterns) > 1:
+                for p in patterns:
+                    line_num = self.geometry.win_patterns[p][1]
+                    self._print_bingo_result(f"{label} {line_num}", df_num_bingo[f'num_bingo_{kind}{line_num}'])
+            self._print_bingo_result(label, df_num_bingo[f'num_{kind}_bingo'])
 
-        for i in range(0, bc.CARD_LENGTH):
-            if i in [1, 2]:
-                print(f"Num diag {i} tries: ", self.df_tries[f'num_tries_diag{i}'].values)
-            print(f"Num row {i} tries: ", self.df_tries[f'num_tries_row{i}'].values)
-            print(f"Num col {i} tries: ", self.df_tries[f'num_tries_col{i}'].values)
+        print("Num total tries:", df_tries['num_bingo_tries'].values)
+
+        if traditional:
+            print("Num corner tries:", df_tries['num_tries_corners'].values)
+
+            for i in range(0, self.geometry.card_length):
+                if i in [1, 2]:
+                    print(f"Num diag {i} tries: ", df_tries[f'num_tries_diag{i}'].values)
+                print(f"Num row {i} tries: ", df_tries[f'num_tries_row{i}'].values)
+                print(f"Num col {i} tries: ", df_tries[f'num_tries_col{i}'].values)
+
+        for kind, _ in pattern_kinds:
+            print(f"Num {kind.replace('_', ' ')} tries: ", df_tries[f'num_tries_{kind}'].values)
 
     # ------------------------------------------------------------------------
 
 
 class BingoSimulator:
-    """A class that runs a BINGO card multiple times and keeps track of statistics of each BINGO win."""
+    """A class that runs a BINGO card multiple times and keeps track of statistics of each BINGO win.  Games are
+    random, keyed by a master seed and their game index (see bingo_rng.py): game g always plays the same card and
+    draw, whatever the engine, batch_size or split of the run, and can be replayed on its own with replay_game()."""
+
+    def __init__(self, num_simulations, seed=None, first_game=0, geometry=None):
+        """:param: num_simulations (int) The number of BINGO games to play
+        :param: seed (int, np.random.SeedSequence or None) The master seed, None for a fresh random one
+        :param: first_game (int) The index of the first game to play, to play one shard of a larger run (default: 0)
+        :param: geometry (CardGeometry) The card layout, see bc.get_geometry() (default: bc.DEFAULT_GEOMETRY)"""
+
+        self.stats = BingoStats(num_simulations, geometry)
+        self.geometry = self.stats.geometry
 
-    def __init__(self, num_simulations):
-        self.stats = BingoStats(num_simulations)
+        self.seed_key = bingo_rng.get_seed_key(seed)
+        self.first_game = first_game
+
+        self.games_played = 0
 
     # ------------------------------------------------------------------------
 
-    def play_bingo(self, free_cell):
-        """Plays BINGO num_simulations times!
+    def play_bingo(self, free_cell, engine=ENGINE_LOOP, batch_size=bingo_batch.DEFAULT_BATCH_SIZE, monitor=None):
+        """Plays BINGO num_simulations times!  Only the games not played yet are played, e.g. after resuming.
         :param: free_cell (bool) Is the center cell considered free?  True marks it free (already marked/dabbed),
         False makes it unmarked.  Only applicable for BINGO cards that have an odd-number dimensions.
+        :param: engine (str) One of ENGINES: ENGINE_LOOP (default) plays one game at a time, ENGINE_NUMPY plays
+        blocks of games as NumPy arrays, ENGINE_RANK too but finds wins from the draw order without marking.
+        :param: batch_size (int) The number of games per block for ENGINE_NUMPY and ENGINE_RANK
+        :param: monitor (RunMonitor) Instruments the run: games/sec, ETA, phase times, hooks and progress line
+        (default: None, no instrumentation).  monitor.report() holds the results after the run.
+        :return: None"""
+
+        if monitor is not None:
+            monitor.start(self.stats.num_simulations, self.games_played, engine)
+
+        self.play_games(free_cell, self.stats.num_simulations - self.games_played, engine, batch_size, monitor)
+
+        if monitor is not None:
+            monitor.finish()
+
+    # ------------------------------------------------------------------------
+
+    def play_games(self, free_cell, num_games, engine=ENGINE_LOOP, batch_size=bingo_batch.DEFAULT_BATCH_SIZE,
+                   monitor=None):
+        """Plays some more games of BINGO, e.g. one chunk of a long run.  Playing a run in chunks plays the same games
+        as playing it at once.
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: num_games (int) The number of games to play
+        :param: engine (str) One of ENGINES, see play_bingo()
+        :param: batch_size (int) The number of games per block (of cards and draws generated at once)
+        :param: monitor (RunMonitor) Updated after every batch_size games (default: None, no instrumentation)
         :return: None"""
 
-        for _ in range(self.stats.num_simulations):
+        if engine not in ENGINES:
+            raise ValueError(f'Engine must be one of {ENGINES} in play_bingo(): {engine}.')
+
+        # Without a monitor, play all games at once with no timing; with one, update it after every chunk
+        chunk_size = num_games if monitor is None else batch_size
+        timer = NULL_TIMER if monitor is None else monitor.timer
+        games_left = num_games
 
-            game_card = bc.BingoCard(free_cell)
+        while games_left > 0:
+            chunk = min(chunk_size, games_left)
+            first_game = self.first_game + self.games_played
 
-            # Play bingo
-            random_all = bc.random.sample(game_card.under_all, bc.CARD_LENGTH * bc.COLUMN_RANGE)
-            num_bingo_balls = 0
-            got_bingo = False
+            if engine == ENGINE_NUMPY:
+                bingo_batch.play_bingo_batch(self.stats, free_cell, chunk, batch_size, self.seed_key, first_game,
+                                             timer=timer)
 
-            # Grab a random bingo ball and stop playing if BINGO is found
-            for bingo_ball in (bingo_ball for bingo_ball in random_all if not got_bingo):
-                num_bingo_balls += 1
+            elif engine == ENGINE_RANK:
+                bingo_batch.play_bingo_batch(self.stats, free_cell, chunk, batch_size, self.seed_key, first_game,
+                                             bingo_batch.find_bingo_ranks, timer)
 
-                # Go through each bingo cell to check if the bingo ball is on the bingo card
-                for i in (i for i in range(0, bc.CARD_LENGTH) if not got_bingo):
-                    for j in range(0, bc.CARD_LENGTH):
-                        if game_card.bingo_card[i][j][False] == bingo_ball:
-                            game_card.bingo_card[i][j][True] = True
+            else:
+                self._play_loop(free_cell, first_game, chunk, batch_size, timer)
 
-                        # Check for BINGO
-                        if game_card.check_traditional_bingo(self.stats, num_bingo_balls):
-                            got_bingo = True
-                            self.stats.df_tries['num_bingo_tries'][num_bingo_balls] += 1
-                            break
+            self.games_played += chunk
+            games_left -= chunk
+
+            if monitor is not None:
+                monitor.update(chunk)
 
     # ------------------------------------------------------------------------
 
+    def _play_loop(self, free_cell, first_game, num_games, batch_size=bingo_batch.DEFAULT_BATCH_SIZE,
+                   timer=NULL_TIMER):
+        """Plays games of BINGO one at a time, with one BingoCard per game.  The cards and draws are generated in
+        blocks of batch_size games, the same as the vectorized engines, and the completion times of all patterns
+        (see BingoStats.add_completions()) are found from each block's draw ranks.
+        :param: free_cell (bool) Is the center cell considered free?
+        :param: first_game (int) The index of the first game to play
+        :param: num_games (int) The number of games to play
+        :param: batch_size (int) The number of games per block
+        :param: timer (PhaseTimer) Times the phases of each game (default: no timing)
+        :return: None"""
 
-# Plotting is only to be done if this module is called directly
-if __name__ == '__main__':
-    from bingo_simulator import plot_bingo as pb
+        geometry = self.geometry
 
-    num_simulations = 10000000
+        for block_start in range(first_game, first_game + num_games, batch_size):
+            games = np.arange(block_start, min(block_start + batch_size, first_game + num_games))
+            timer.lap()
 
-    bingo_game_sim = BingoSimulator(num_simulations)
-    bingo_game_sim.play_bingo(False)
-    bingo_game_sim.stats.print_summary()
+            cards = bingo_rng.generate_cards(self.seed_key, games, free_cell, geometry)
+            cards = cards.reshape(games.size, geometry.num_cells)
+            timer.lap('cards')
+            draws = bingo_rng.generate_draws(self.seed_key, games, geometry)
+            timer.lap('draws')
 
-    # Save data from simulation in csv files
-    bingo_game_sim.stats.df_tries.to_csv(STATS_TRIES_FILENAME)
-    bingo_game_sim.stats.df_num_bingo.to_csv(BINGO_STATS_FILENAME)
+            block_balls = np.zeros(games.size, dtype=np.int8)
+            for game, (card_numbers, draw) in enumerate(zip(cards, draws.tolist())):
+                game_card = bc.BingoCard.from_numbers(card_numbers.tobytes(), free_cell, geometry)
+                num_bingo_balls, pattern_index = self._play_game(game_card, draw)
+                timer.lap('marking')
+                self.stats.record_bingo(pattern_index, num_bingo_balls)
+                block_balls[game] = num_bingo_balls
+                timer.lap('stats')
+
+            completion = bingo_batch.get_completion_ranks(cards, bingo_batch.get_draw_ranks(draws), geometry)
+            self.stats.add_completions(completion, block_balls)
+            timer.lap('stats')
+
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _play_game(game_card, draw):
+        """Plays a single game: calls the bingo balls until one completes a win pattern.
+        :param: game_card (BingoCard) class, marked as the balls are called
+        :param: draw (list) The bingo balls in the order they are called
+        :return: (int, int) the number of bingo balls called to get BINGO and the index into the card's win_patterns
+        of the winning pattern"""
+
+        for num_bingo_balls, bingo_ball in enumerate(draw, start=1):
+            pattern_index = game_card.call_ball(bingo_ball)
+
+            if pattern_index >= 0:
+                return num_bingo_balls, pattern_index
+
+    # ------------------------------------------------------------------------
+
+    def replay_game(self, game_index, free_cell):
+        """Replays a single game of the run on its own, e.g. to inspect an unusual result.  Does not change stats.
+        :param: game_index (int) The index of the game in the run (from 0, counting from the first game of the whole
+        run, not of this shard)
+        :param: free_cell (bool) Is the center cell considered free?
+        :return: (BingoCard, list, int, int) the card marked at the end of the game, the draw order, the number of
+        bingo balls called to get BINGO and the index into geometry.win_patterns of the winning pattern"""
+
+        games = np.array([game_index])
+        cards = bingo_rng.generate_cards(self.seed_key, games, free_cell, self.geometry)
+        game_card = bingo_factory.get_card(cards, 0, free_cell, self.geometry)
+        draw = bingo_rng.generate_draws(self.seed_key, games, self.geometry)[0].tolist()
+
+        num_bingo_balls, pattern_index = self._play_game(game_card, draw)
+
+        return game_card, draw, num_bingo_balls, pattern_index
+
+    # ------------------------------------------------------------------------
+
+
+# Plotting is only to be done if this module is called directly
+if __name__ == '__main__':
+    import sys
+    from bingo_simulator import bingo_cli
 
-    # Plot results in histogram and pie chart
-    pb.plot_bingo_histo(bingo_game_sim.stats.df_tries, dark_mode=True)
-    pb.plot_bingo_pie(bingo_game_sim.stats.df_num_bingo, detail="subplot_cols", dark_mode=True)
+    # 10M games of a fresh random seed, saved in the current folder, then plotted
+    sys.exit(bingo_cli.main(['--games', '10000000', '--engine', ENGINE_RANK, '--progress', '--summary', '--plot']))
@@ -1,24 +1,77 @@
 """The main app to run the dash server to display the results of the bingo simulation with interactive features."""
 
+import os
+import hashlib
+import json
+from functools import lru_cache
 import dash
 from dash import dcc
 from dash import html
 import dash_daq as daq
 import pandas as pd
-from dash.dependencies import Input, Output
-from plot_bingo import plot_bingo_histo, plot_bingo_pie, FONT_FAMILY
+from dash.dependencies import Input, Output, State
+from plot_bingo import plot_bingo_histo, plot_bingo_pie, get_figure_patch, FONT_FAMILY
 from dash.exceptions import PreventUpdate
+from bingo_simulator.bingo_jobs import BingoJobManager, JobLimitError, JOB_CANCELLED, JOB_DONE, JOB_FAILED
 
 app = dash.Dash(__name__, assets_folder='assets', title='Bingo Simulator', update_title='Please wait...')
 
 server = app.server
 
-# df = pd.read_csv(bingo_simulator_main.STATS_TRIES_FILENAME)
-# df_pie = pd.read_csv(bingo_simulator_main.BINGO_STATS_FILENAME)
-df = pd.read_csv("bingo_tries_10m.csv")
-df_pie = pd.read_csv("bingo_stats_10m.csv")
-
-NUM_SIMULATIONS = df['num_bingo_tries'].sum()
+# Data source: the simulated 10M game binary results file (default), memory-mapped so that every worker shares its
+# pages, or set BINGO_DATA=csv to read the same results from the csv files, or BINGO_DATA=exact to show the exact
+# distribution (expected counts for the same number of games), computed in a few seconds at start up, or
+# BINGO_DATA=registry to combine all the runs of the traditional 5x5 card without a free cell recorded in the
+# BINGO_REGISTRY database (see bingo_registry.py)
+BINGO_DATA = os.environ.get('BINGO_DATA', 'results')
+RESULTS_FILENAME = "bingo_results_10m.bin"
+EXACT_NUM_SIMULATIONS = 10000000
+
+if BINGO_DATA == 'exact':
+    from bingo_simulator import bingo_exact
+    df = bingo_exact.exact_tries(False, EXACT_NUM_SIMULATIONS)
+    df_pie = bingo_exact.exact_num_bingo(False, EXACT_NUM_SIMULATIONS)
+elif BINGO_DATA == 'csv':
+    # df = pd.read_csv(bingo_simulator_main.STATS_TRIES_FILENAME)
+    # df_pie = pd.read_csv(bingo_simulator_main.BINGO_STATS_FILENAME)
+    df = pd.read_csv("bingo_tries_10m.csv")
+    df_pie = pd.read_csv("bingo_stats_10m.csv")
+elif BINGO_DATA == 'registry':
+    from bingo_simulator import bingo_card
+    from bingo_simulator import bingo_registry
+    with bingo_registry.BingoRegistry(os.environ.get('BINGO_REGISTRY', bingo_registry.REGISTRY_FILENAME)) as registry:
+        registry_stats = registry.combine(free_cell=False, geometry=bingo_card.DEFAULT_GEOMETRY)
+    df = registry_stats.df_tries
+    df_pie = registry_stats.df_num_bingo
+else:
+    from bingo_simulator import bingo_results
+    results_stats, _ = bingo_results.load_results(RESULTS_FILENAME)
+    df = results_stats.df_tries
+    df_pie = results_stats.df_num_bingo
+
+NUM_SIMULATIONS = int(round(df['num_bingo_tries'].sum()))
+
+# Figures are built once per (dataset version, detail, layout) and then served from an LRU cache: the inputs take only
+# a handful of values, and every build reruns all the bar/pie traces.  Each figure is built in both color modes, and
+# the changes between them go to the browser with it, so toggling dark mode never calls the server.
+FIGURE_CACHE_SIZE = 32
+MOBILE_SMALL_LENGTH = 430
+
+# On-demand runs are played in the background on a local pool of worker processes (BINGO_JOB_WORKERS, default: the
+# number of CPUs), polled by the page, their partial results streaming into the graphs.  Jobs live in the process
+# serving the app, so the Procfile runs a single gunicorn worker; a poll for a job the process does not know (after a
+# restart) reports the run as lost.  Only a few runs are played at a time (see BingoJobManager.max_active_jobs): a
+# run submitted beyond them is refused until one finishes.
+RUN_SIZES = [100000, 1000000, 10000000]
+JOB_POLL_INTERVAL = 1000  # milliseconds
+JOB_CHUNK_GAMES = 100000
+JOB_WORKERS = int(os.environ['BINGO_JOB_WORKERS']) if 'BINGO_JOB_WORKERS' in os.environ else None
+job_manager = BingoJobManager(workers=JOB_WORKERS, chunk_games=JOB_CHUNK_GAMES)
+
+# Figure data of the partial and final results of jobs, by dataset version, see get_dataset_frames().  A version
+# dropped from it is shown as lost, see get_lost_figures()
+JOB_FRAMES = {}
+LOST_RESULTS_TEXT = "Simulation results lost (dropped from the server): please run it again."
 
 # Dash HTML layout
 app.layout = html.Div(
@@ -41,6 +94,26 @@ app.layout = html.Div(
                              color='skyblue')
         ]
     ),
+    html.Div(
+        [
+            html.H2("Run a Fresh Simulation:"),
+            dcc.RadioItems(
+                [{'label': "{:,} games".format(run_size), 'value': run_size} for run_size in RUN_SIZES],
+                id="run_size",
+                value=RUN_SIZES[0],
+                inline=True,
+                labelStyle={'margin-left': '15px'}
+            ),
+            dcc.Checklist(["Free center cell"], [], id="run_free_cell", inline=True,
+                          labelStyle={'margin-left': '15px'}),
+            dcc.Input(id="run_seed", type="number", placeholder="Seed (random if empty)", min=0, step=1),
+            html.Button("Run", id="run-button", n_clicks=0),
+            html.Div(id="run-progress"),
+            dcc.Store(id='job-id'),
+            dcc.Store(id='dataset'),
+            dcc.Interval(id='job-poll', interval=JOB_POLL_INTERVAL, disabled=True)
+        ], id='simulation-run'
+    ),
     html.Div(
         [
             html.H2("Select Level of Detail for Histogram:"),
@@ -54,6 +127,7 @@ app.layout = html.Div(
         ], id='histo-detail'
     ),
     dcc.Graph(id="graph1", mathjax='cdn', responsive='auto'),
+    dcc.Store(id='graph1-data'),
     html.Hr(),
     html.Div(
         [
@@ -68,6 +142,7 @@ app.layout = html.Div(
             )
         ], id='pie-detail'),
     dcc.Graph(id="graph2", responsive='auto'),
+    dcc.Store(id='graph2-data'),
     html.Hr(),
     html.Footer(
         [
@@ -97,30 +172,170 @@ app.layout = html.Div(
 # ------------------------------------------------------------------------
 
 
-def get_pie_chart(screen_size, dark_mode):
-    """Returns a pie chart based on the layout desired and current viewport (screen size).
+def get_dataset_version(df_tries, df_num_bingo):
+    """Fingerprints the dataset on display, so that figures of another dataset are never served from the cache.
+    :param: df_tries (pandas.df) DataFrame containing number of tries for each BINGO win
+    :param: df_num_bingo (pandas.df) DataFrame containing number of BINGO wins per pattern
+    :return: (str) the dataset version"""
+
+    digest = hashlib.sha1()
+    for df_data in (df_tries, df_num_bingo):
+        digest.update(pd.util.hash_pandas_object(df_data, index=True).to_numpy().tobytes())
+        digest.update(repr(list(df_data.columns)).encode('utf-8'))
+
+    return digest.hexdigest()[:16]
+
+
+dataset_version = get_dataset_version(df, df_pie)
+
+
+# ------------------------------------------------------------------------
+
+def set_dataset(df_tries, df_num_bingo):
+    """Replaces the dataset on display, dropping the cached figures of the previous one.
+    :param: df_tries (pandas.df) DataFrame containing number of tries for each BINGO win
+    :param: df_num_bingo (pandas.df) DataFrame containing number of BINGO wins per pattern
+    :return: None"""
+
+    global df, df_pie, dataset_version
+
+    df, df_pie = df_tries, df_num_bingo
+    dataset_version = get_dataset_version(df, df_pie)
+    get_histo_figure.cache_clear()
+    get_pie_figure.cache_clear()
+
+
+# ------------------------------------------------------------------------
+
+def get_job_dataset_version(job_id):
+    """Snapshots the results of a job so far as a dataset to display.
+    :param: job_id (str) The job id, see BingoJobManager.submit()
+    :return: (str) the dataset version of the snapshot, see get_dataset_frames()"""
+
+    stats = job_manager.get_job(job_id).get_stats()
+    version = f'job-{job_id}-{stats.num_simulations}'
+
+    # Games are only ever added to a job, so a version is never rebuilt; keep the frames of the latest few
+    if version not in JOB_FRAMES:
+        if len(JOB_FRAMES) >= FIGURE_CACHE_SIZE:
+            del JOB_FRAMES[next(iter(JOB_FRAMES))]
+        JOB_FRAMES[version] = (stats.df_tries, stats.df_num_bingo)
+
+    return version
+
+
+# ------------------------------------------------------------------------
+
+def get_dataset_frames(version):
+    """Returns the data of a dataset version: the results on display at start up, or a snapshot of a job.
+    :param: version (str) The dataset version, dataset_version or see get_job_dataset_version()
+    :return: (pandas.df, pandas.df) DataFrames of the number of tries and of the number of BINGO wins"""
+
+    if version == dataset_version:
+        return df, df_pie
+
+    return JOB_FRAMES[version]
+
+
+# ------------------------------------------------------------------------
+
+def get_viewport_layout(screen_size):
+    """Buckets the viewport (screen size) into the pie chart layouts.
     :param: screen_size (dict) Dictionary of 'height' and 'width' the screen size
+    :return: (str) 'landscape' or 'portrait' for small screens, else 'large'"""
+
+    if screen_size['height'] < MOBILE_SMALL_LENGTH:
+        return 'landscape'
+    elif screen_size['width'] < MOBILE_SMALL_LENGTH:
+        return 'portrait'
+
+    return 'large'
+
+
+# ------------------------------------------------------------------------
+
+def get_pie_chart(df_num_bingo, layout, dark_mode):
+    """Returns a pie chart based on the layout desired and current viewport (screen size).
+    :param: df_num_bingo (pandas.df) DataFrame containing number of BINGO wins per pattern
+    :param: layout (str) The viewport layout, see get_viewport_layout()
     :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
     :return: (go.Figure) object of the pie chart"""
 
-    mobile_small_length = 430
-
-    if screen_size['height'] < mobile_small_length:  # Landscape orientation
-        fig = plot_bingo_pie(df_pie, False, "subplot_cols", 10, dark_mode)
-    elif screen_size['width'] < mobile_small_length:  # Portrait orientation
-        fig = plot_bingo_pie(df_pie, False, "subplot_rows", 10, dark_mode)
+    if layout == 'landscape':
+        fig = plot_bingo_pie(df_num_bingo, False, "subplot_cols", 10, dark_mode)
+    elif layout == 'portrait':
+        fig = plot_bingo_pie(df_num_bingo, False, "subplot_rows", 10, dark_mode)
     else:
-        fig = plot_bingo_pie(df_pie, False, dark_mode=dark_mode)
+        fig = plot_bingo_pie(df_num_bingo, False, dark_mode=dark_mode)
 
     return fig
 
 
 # ------------------------------------------------------------------------
 
-@app.callback(Output('main', 'style'), [Input('dark-mode-switch', 'value')])
-def update_layout(dark_mode):
-    """CALLBACK: Updates the histogram based on the radio-button detail-size selected.
-    TRIGGER: Upon page loading and when selecting the toggle for dark mode
+def get_themed_figures(plot_figure):
+    """Builds a figure in both color modes, with the changes switching between them.
+    :param: plot_figure (function) Takes dark_mode (bool) and returns the go.Figure in that color mode
+    :return: (dict, dict) the figures and the changes to the figure of each color mode, keyed 'dark' and 'light', see
+    plot_bingo.get_figure_patch()"""
+
+    figures = {'dark': plot_figure(True), 'light': plot_figure(False)}
+    themes = {'dark': get_figure_patch(figures['light'], figures['dark']),
+              'light': get_figure_patch(figures['dark'], figures['light'])}
+
+    return figures, themes
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def get_histo_figure(version, detail_size):
+    """Builds the histogram, or returns it from the cache.  The cached figures are shared: never modify them.
+    :param: version (str) The dataset version, see get_dataset_frames()
+    :param: detail_size (str) The details put in the histogram plot as: 'small', 'medium', or 'large'
+    :return: (dict, dict) the histograms and their color mode changes, see get_themed_figures()"""
+
+    df_tries, _ = get_dataset_frames(version)
+
+    def plot_figure(dark_mode):
+        fig = plot_bingo_histo(df_tries, detail_size, False, dark_mode)
+        fig.update_layout(transition_duration=500)
+        return fig
+
+    return get_themed_figures(plot_figure)
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def get_pie_figure(version, detail_size, layout):
+    """Builds the pie chart, or returns it from the cache.  The cached figures are shared: never modify them.
+    :param: version (str) The dataset version, see get_dataset_frames()
+    :param: detail_size (str) The details put in the pie plot as: 'Separate' or a plot_bingo_pie() detail
+    :param: layout (str) The viewport layout of 'Separate' pie charts, see get_viewport_layout(), else None
+    :return: (dict, dict) the pie charts and their color mode changes, see get_themed_figures()"""
+
+    _, df_num_bingo = get_dataset_frames(version)
+
+    def plot_figure(dark_mode):
+        # Two pie charts
+        if detail_size == "Separate":
+            fig = get_pie_chart(df_num_bingo, layout, dark_mode=dark_mode)
+
+        # Single pie chart
+        else:
+            fig = plot_bingo_pie(df_num_bingo, False, detail_size.lower(), dark_mode=dark_mode)
+
+        fig.update_layout(transition_duration=1000)
+        return fig
+
+    return get_themed_figures(plot_figure)
+
+
+# ------------------------------------------------------------------------
+
+def get_page_style(dark_mode):
+    """Returns the global style of the page.
     :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
     :return: Global style layout as dark or light theme"""
 
@@ -133,49 +348,172 @@ def update_layout(dark_mode):
 
 # ------------------------------------------------------------------------
 
-@app.callback(Output('graph1', 'figure'), [Input('radio_options', 'value'), Input('dark-mode-switch', 'value')])
-def update_histo(detail_size, dark_mode):
+def submit_run(run_size, free_cell, seed):
+    """Submits a fresh simulation run in the background.
+    :param: run_size (int) The number of games to play, one of RUN_SIZES
+    :param: free_cell (list) ["Free center cell"] if the center cell is considered free, else empty
+    :param: seed (int) The master seed, None for a fresh random one
+    :return: (str) the job id, JobLimitError being raised while too many runs are going on"""
+
+    if run_size not in RUN_SIZES:
+        raise PreventUpdate
+
+    return job_manager.submit(run_size, bool(free_cell), seed=None if seed is None else int(seed))
+
+
+# ------------------------------------------------------------------------
+
+def get_run_progress(job_id):
+    """Returns the progress of a simulation run and a snapshot of its results so far.
+    :param: job_id (str) The job id of the run
+    :return: (str, str, bool) the progress text, the dataset version to display (dash.no_update if there is nothing
+    new to show) and whether the run is over"""
+
+    # Jobs live in the process serving the app: a restart, or a finished job dropped since, loses the run
+    try:
+        progress = job_manager.get_job(job_id).snapshot()
+    except KeyError:
+        return "Simulation run lost (the server was restarted): please run it again.", dash.no_update, True
+
+    finished = progress['status'] in (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+    if progress['status'] == JOB_FAILED:
+        return f"Simulation failed: {progress['error']}", dash.no_update, finished
+
+    text = "Simulation {}: {:,} of {:,} games played ({:.0%}), {:,.0f} games/sec".format(
+        progress['status'], progress['games_played'], progress['total_games'], progress['fraction_done'],
+        progress['games_per_sec'])
+    dataset = get_job_dataset_version(job_id) if progress['games_played'] > 0 else dash.no_update
+
+    return text, dataset, finished
+
+
+# ------------------------------------------------------------------------
+
+@app.callback(Output('job-id', 'data'), Output('job-poll', 'disabled'), Output('run-progress', 'children'),
+              Output('dataset', 'data'), [Input('run-button', 'n_clicks'), Input('job-poll', 'n_intervals')],
+              [State('run_size', 'value'), State('run_free_cell', 'value'), State('run_seed', 'value'),
+               State('job-id', 'data')], prevent_initial_call=True)
+def update_run(n_clicks, n_intervals, run_size, free_cell, seed, job_id):
+    """CALLBACK: Submits a fresh simulation run in the background, then shows its progress and streams its results so
+    far into the graphs.
+    TRIGGER: When clicking the run button, and every JOB_POLL_INTERVAL while a run is going on.
+    :param: n_clicks (int) The number of clicks of the run button
+    :param: n_intervals (int) The number of polls
+    :param: run_size (int) The number of games to play, one of RUN_SIZES
+    :param: free_cell (list) ["Free center cell"] if the center cell is considered free, else empty
+    :param: seed (int) The master seed, None for a fresh random one
+    :param: job_id (str) The job id of the current run, None before any run
+    :return: (str, bool, str, str) the job id, whether to stop polling, the progress text and the dataset version to
+    display"""
+
+    if dash.callback_context.triggered[0]['prop_id'] == 'run-button.n_clicks':
+        if not n_clicks:
+            raise PreventUpdate
+        try:
+            job_id = submit_run(run_size, free_cell, seed)
+        except JobLimitError:
+            # The run of this page, if any, keeps being polled
+            return (dash.no_update, dash.no_update, "Too many simulations are running: please try again in a moment.",
+                    dash.no_update)
+    elif job_id is None:
+        raise PreventUpdate
+
+    text, dataset, finished = get_run_progress(job_id)
+
+    return job_id, finished, text, dataset
+
+
+# ------------------------------------------------------------------------
+
+def get_display_version(dataset):
+    """Returns the dataset version to display.
+    :param: dataset (str) The dataset version of the latest job results, None before any run
+    :return: (str) the dataset version, see get_dataset_frames(), None if the job results were dropped since"""
+
+    if dataset is None:
+        return dataset_version
+
+    return dataset if dataset in JOB_FRAMES else None
+
+
+# ------------------------------------------------------------------------
+
+def get_lost_figure(dark_mode):
+    """Returns an empty figure saying that the job results to display are lost, in place of a graph.
+    :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
+    :return: (go.Figure) object"""
+
+    import plotly.graph_objs as go
+
+    color_mode = {'text': ('black', 'white'),
+                  'paper_bgcolor': ('white', 'black')}
+
+    fig = go.Figure()
+    fig.update_layout(paper_bgcolor=color_mode['paper_bgcolor'][dark_mode],
+                      plot_bgcolor=color_mode['paper_bgcolor'][dark_mode],
+                      xaxis={'visible': False}, yaxis={'visible': False},
+                      annotations=[dict(text=LOST_RESULTS_TEXT, showarrow=False, xref='paper', yref='paper', x=0.5,
+                                        y=0.5, font=dict(family=FONT_FAMILY, size=24,
+                                                         color=color_mode['text'][dark_mode]))])
+
+    return fig
+
+
+# ------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def get_lost_figures():
+    """Builds the lost results figure, or returns it from the cache.  The cached figures are shared: never modify
+    them.
+    :return: (dict, dict) the figures and their color mode changes, see get_themed_figures()"""
+
+    return get_themed_figures(get_lost_figure)
+
+
+# ------------------------------------------------------------------------
+
+@app.callback(Output('graph1-data', 'data'), [Input('radio_options', 'value'), Input('dataset', 'data')])
+def update_histo(detail_size, dataset):
     """CALLBACK: Updates the histogram based on the radio-button detail-size selected.
-    TRIGGER: Upon page load, toggling the dark mode switch, and when selecting the radio options for the histogram plot.
+    TRIGGER: Upon page load, when selecting the radio options for the histogram plot and when new results of a
+    simulation run arrive.  The color mode is applied in the browser, see THEME_FIGURE_JS.
     :param: detail_size (str) The details put in the histogram plot as: 'small', 'medium', or 'large' (default)
-    :param: dark_mode (bool) Whether the plot is done in dark mode or not
-    :return: (go.Figure) object to be dynamically updated"""
+    :param: dataset (str) The dataset version of the latest job results, None before any run
+    :return: (dict) of the dark mode 'figure' (go.Figure) and its color mode changes 'themes'"""
 
     if detail_size is None:
         raise PreventUpdate
 
-    fig = plot_bingo_histo(df, detail_size, False, dark_mode)
+    version = get_display_version(dataset)
+    figures, themes = get_histo_figure(version, detail_size) if version is not None else get_lost_figures()
 
-    fig.update_layout(transition_duration=500)
-    return fig
+    return {'figure': figures['dark'], 'themes': themes}
 
 
 # ------------------------------------------------------------------------
 
-@app.callback(Output('graph2', 'figure'), [Input('radio_options_pie', 'value'), Input('viewport-container', 'data'),
-                                           Input('dark-mode-switch', 'value')])
-def update_pie(detail_size, screen_size, dark_mode):
+@app.callback(Output('graph2-data', 'data'),
+              [Input('radio_options_pie', 'value'), Input('viewport-container', 'data'), Input('dataset', 'data')])
+def update_pie(detail_size, screen_size, dataset):
     """CALLBACK: Updates the pie chart based on the radio-button detail-size selected.
-    TRIGGER: Upon page load, toggling the dark mode switch, and when selecting the radio options for the pie plot.
+    TRIGGER: Upon page load, when selecting the radio options for the pie plot and when new results of a simulation
+    run arrive.  The color mode is applied in the browser, see THEME_FIGURE_JS.
     :param: detail_size (str) The details put in the pie plot as: 'small' or 'large' (default)
     :param: screen_size (dict) Dictionary of 'height' and 'width' the screen size
-    :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
-    :return: (go.Figure) object to be dynamically updated"""
+    :param: dataset (str) The dataset version of the latest job results, None before any run
+    :return: (dict) of the dark mode 'figure' (go.Figure) and its color mode changes 'themes'"""
 
     if detail_size is None:
         raise PreventUpdate
 
-    # Two pie charts
-    if detail_size == "Separate":
-        fig = get_pie_chart(screen_size, dark_mode=dark_mode)
-
-    # Single pie chart
-    else:
-        fig = plot_bingo_pie(df_pie, False, detail_size.lower(), dark_mode=dark_mode)
+    # Only separate pie charts depend on the viewport
+    layout = get_viewport_layout(screen_size) if detail_size == "Separate" else None
 
-    fig.update_layout(transition_duration=1000)
+    version = get_display_version(dataset)
+    figures, themes = get_pie_figure(version, detail_size, layout) if version is not None else get_lost_figures()
 
-    return fig
+    return {'figure': figures['dark'], 'themes': themes}
 
 
 # ------------------------------------------------------------------------
@@ -195,5 +533,48 @@ app.clientside_callback(
     Input('url', 'href')
 )
 
+"""CALLBACK: A client callback to switch the page between dark and light mode.
+TRIGGER: Upon page loading and when selecting the toggle for dark mode."""
+app.clientside_callback(
+    """
+    function(dark_mode) {
+        var styles = %s;
+        return styles[dark_mode ? 'dark' : 'light'];
+    }
+    """ % json.dumps({'dark': get_page_style(True), 'light': get_page_style(False)}),
+    Output('main', 'style'),
+    Input('dark-mode-switch', 'value')
+)
+
+# Shows a figure sent by the server in the selected color mode, applying its color mode changes (see
+# get_themed_figures()) to a copy of it
+THEME_FIGURE_JS = """
+    function(dark_mode, data) {
+        if (!data) {
+            return window.dash_clientside.no_update;
+        }
+        var themed = JSON.parse(JSON.stringify(data.figure));
+        data.themes[dark_mode ? 'dark' : 'light'].forEach(function(change) {
+            var path = change[0];
+            var node = themed;
+            for (var i = 0; i < path.length - 1; i++) {
+                node = node[path[i]];
+            }
+            node[path[path.length - 1]] = change[1];
+        });
+        return themed;
+    }
+    """
+
+"""CALLBACK: Client callbacks to show the figures in dark or light mode, with no call to the server on a toggle.
+TRIGGER: When a figure arrives from the server and when selecting the toggle for dark mode."""
+for graph_id in ['graph1', 'graph2']:
+    app.clientside_callback(
+        THEME_FIGURE_JS,
+        Output(graph_id, 'figure'),
+        Input('dark-mode-switch', 'value'),
+        Input(f'{graph_id}-data', 'data')
+    )
+
 if __name__ == '__main__':
     app.run_server()
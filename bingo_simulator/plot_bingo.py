@@ -1,12 +1,13 @@
 """Functions to plot the statistics from running the BINGO simulator."""
 
-import plotly.offline as pyo
-import plotly.graph_objs as go
-from plotly.subplots import make_subplots
-import plotly.colors as pc
+import hashlib
+import json
 import numpy as np
-from scipy.optimize import curve_fit
-from bingo_card import CARD_LENGTH
+from bingo_simulator.bingo_card import as_geometry
+from bingo_simulator.bingo_simulator_main import get_num_bingo_columns, get_tries_columns
+
+# plotly and scipy are imported by the functions plotting and fitting: importing this module stays cheap until a plot
+# is made
 
 FONT_FAMILY = "MV Boli"
 FONT_FAMILY2 = "Century Gothic"
@@ -14,6 +15,15 @@ FONT_FAMILY2 = "Century Gothic"
 HTML_HISTO_FILE = "bingo_histo.html"
 HTML_PIE_FILE = "bingo_pie.html"
 
+# Histogram statistics (curve fit, CDF, moments, quantiles) memoized by the fingerprint of the data they come from,
+# see get_histo_stats()
+HISTO_STATS_CACHE = {}
+HISTO_STATS_CACHE_SIZE = 16
+HISTO_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Labels of the traditional kinds of win patterns, in legend order: the other kinds follow, in the order played
+KIND_LABELS = {'row': 'Rows', 'col': 'Columns', 'diag': 'Diagonals', 'corners': 'Corners'}
+
 
 # ------------------------------------------------------------------------
 
@@ -40,6 +50,8 @@ def get_bar_object(df, df_name, name, marker_color, marker_line_color):
     :param: marker_line_color (str) The color of the border of the bars
     :return: (go.Bar) object"""
 
+    import plotly.graph_objs as go
+
     return go.Bar(x=df.index, y=df[df_name], name=name, opacity=1,
                   marker=dict(color=marker_color),
                   marker_line=dict(width=1, color=marker_line_color),
@@ -48,15 +60,158 @@ def get_bar_object(df, df_name, name, marker_color, marker_line_color):
 
 # ------------------------------------------------------------------------
 
+def get_kind_label(kind):
+    """Returns the label of a kind of win pattern, e.g. 'Rows' or 'Postage stamp'.
+    :param: kind (str) The kind of win pattern, see bingo_card.get_win_patterns()
+    :return: (str) the label"""
+
+    return KIND_LABELS.get(kind, kind.replace('_', ' ').capitalize())
+
+
+# ------------------------------------------------------------------------
+
+def get_pattern_label(geometry, pattern):
+    """Returns the label of a win pattern, e.g. 'Row 1', 'Column B' or 'Diagonal 2'.
+    :param: geometry (CardGeometry) The card layout
+    :param: pattern (int) The index of the win pattern into geometry.win_patterns
+    :return: (str) the label"""
+
+    kind, line_num, _ = geometry.win_patterns[pattern]
+
+    if kind == 'row':
+        return f"Row {line_num + 1}"
+    elif kind == 'col':
+        return f"Column {geometry.column_labels[line_num]}"
+    elif kind == 'diag':
+        return f"Diagonal {line_num}"
+    elif line_num is None:
+        return get_kind_label(kind)
+
+    return f"{get_kind_label(kind)} {line_num + 1}"
+
+
+# ------------------------------------------------------------------------
+
+def get_plot_columns(columns, geometry):
+    """Returns the DataFrame columns to plot for a card layout, in legend order: one per kind of win pattern played
+    (e.g. all the rows), and one per win pattern (e.g. a single row).
+    :param: columns (list) of tuples (column name, list of indices into geometry.win_patterns) of the DataFrame, see
+    bingo_simulator_main.get_tries_columns() and get_num_bingo_columns()
+    :param: geometry (CardGeometry) The card layout
+    :return: (list, list) the kind columns and the win pattern columns, as tuples (column name, label)"""
+
+    kinds = [kind for kind in KIND_LABELS if kind in geometry.pattern_kinds]
+    kinds.extend(kind for kind in geometry.pattern_kinds if kind not in KIND_LABELS)
+
+    # The last column counting exactly the patterns of a kind, or a single pattern: the first ones are the totals
+    kind_columns = {}
+    pattern_columns = {}
+    for column, patterns in columns:
+        for kind in kinds:
+            if patterns == geometry.pattern_kinds[kind]:
+                kind_columns[kind] = column
+        if len(patterns) == 1:
+            pattern_columns[patterns[0]] = column
+
+    return ([(kind_columns[kind], get_kind_label(kind)) for kind in kinds],
+            [(pattern_columns[p], get_pattern_label(geometry, p)) for kind in kinds
+             for p in geometry.pattern_kinds[kind]])
+
+
+# ------------------------------------------------------------------------
+
+def get_histo_fingerprint(df):
+    """Fingerprints the content of a histogram DataFrame, as far as the histogram statistics depend on it.
+    :param: df (pandas.df) DataFrame containing number of tries for each BINGO win
+    :return: (str) the fingerprint"""
+
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(df.index.to_numpy(), dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(df['num_bingo_tries'].to_numpy(), dtype=np.float64).tobytes())
+
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------------------
+
+def compute_histo_stats(df):
+    """Computes the statistics of the BINGO histogram: its Gauss curve fit, CDF, mean, standard deviation and
+    quantiles.  The DataFrame is left untouched.
+    :param: df (pandas.df) DataFrame containing number of tries for each BINGO win
+    :return: (dict) of 'num_simulations' (int), 'curve_param' (tuple of the fit a, x0 and sigma), 'gauss_curve' and
+    'cdf' (read-only np.ndarray of the fit curve and the CDF in %, one value per row of df), 'mean' and 'std'
+    (float) and 'quantiles' (dict of quantile to number of bingo balls)"""
+
+    from scipy.optimize import curve_fit
+
+    balls = df.index.to_numpy(dtype=np.float64)
+    num_bingo_tries = df['num_bingo_tries'].to_numpy(dtype=np.float64)
+
+    # Preliminary stats and estimates are required to generate a bell curve: the fit starts from the moments of the
+    # data, whatever the card layout
+    num_simulations = int(round(num_bingo_tries.sum()))  # Exact (expected count) data is not integer
+    mean = float((balls * num_bingo_tries).sum() / num_bingo_tries.sum())
+    std = float(np.sqrt((num_bingo_tries * (balls - mean) ** 2).sum() / num_bingo_tries.sum()))
+    p0 = [num_bingo_tries.max(), mean, std if std > 0 else 1.0]
+
+    # Get curve fit parameters: a histogram too far from a bell curve for the fit to converge (e.g. blackout wins,
+    # piled up against the last balls) keeps the starting point
+    try:
+        curve_param, curve_covariance = curve_fit(gauss_curve, df.index, df['num_bingo_tries'], p0=p0)
+    except RuntimeError:
+        curve_param = p0
+
+    # Generate curve model and CDF
+    y_gauss_curve = np.asarray(gauss_curve(balls, *curve_param), dtype=np.float64)
+    num_bingo_tries_sum = num_bingo_tries.cumsum()
+    cdf = (num_bingo_tries_sum / num_simulations) * 100
+
+    quantile_ranks = np.searchsorted(num_bingo_tries_sum / num_bingo_tries.sum(), np.array(HISTO_QUANTILES) - 1e-12)
+    quantiles = {q: float(balls[min(rank, len(balls) - 1)]) for q, rank in zip(HISTO_QUANTILES, quantile_ranks)}
+
+    y_gauss_curve.flags.writeable = False
+    cdf.flags.writeable = False
+
+    return {'num_simulations': num_simulations, 'curve_param': tuple(float(param) for param in curve_param),
+            'gauss_curve': y_gauss_curve, 'cdf': cdf, 'mean': mean, 'std': std, 'quantiles': quantiles}
+
+
+# ------------------------------------------------------------------------
+
+def get_histo_stats(df):
+    """Returns the statistics of the BINGO histogram, computed once per dataset: they are memoized by the
+    fingerprint of the data, so many figure variants of one dataset share a single curve fit.
+    :param: df (pandas.df) DataFrame containing number of tries for each BINGO win
+    :return: (dict) of the histogram statistics, see compute_histo_stats(); shared, never modify it"""
+
+    fingerprint = get_histo_fingerprint(df)
+
+    if fingerprint not in HISTO_STATS_CACHE:
+        if len(HISTO_STATS_CACHE) >= HISTO_STATS_CACHE_SIZE:
+            del HISTO_STATS_CACHE[next(iter(HISTO_STATS_CACHE))]
+        HISTO_STATS_CACHE[fingerprint] = compute_histo_stats(df)
+
+    return HISTO_STATS_CACHE[fingerprint]
 
-def plot_bingo_histo(df, detail_size="Large", plot_offline=True, dark_mode=True):
-    """Plots the BINGO histogram.
+
+# ------------------------------------------------------------------------
+
+def plot_bingo_histo(df, detail_size="Large", plot_offline=True, dark_mode=True, histo_stats=None, geometry=None):
+    """Plots the BINGO histogram.  The DataFrame is left untouched.
     :param: df (pandas.df) DataFrame containing number of tries for each BINGO win
     :param: detail_size (str) The details put in the histogram plot as: 'small', 'medium', or 'large' (default)
     :param: plot_offline (bool) If an offline plot is to be generated (default: True)
     :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
+    :param: histo_stats (dict) The precomputed statistics of df, see compute_histo_stats() (default: None, from
+    get_histo_stats())
+    :param: geometry (CardGeometry) The card layout the statistics are for (default: bingo_card.DEFAULT_GEOMETRY)
     :return: (go.Figure) object"""
 
+    import plotly.offline as pyo
+    import plotly.graph_objs as go
+    from plotly.subplots import make_subplots
+    import plotly.colors as pc
+
     # Color mode dictionary, each key contains a tuple that is the color to use when dark_mode is False/True
     # E.g. color_mode['title'][True] will provide 'orange', otherwise 'black'.
     color_mode = {'title': ('black', 'orange'),
@@ -69,75 +224,41 @@ def plot_bingo_histo(df, detail_size="Large", plot_offline=True, dark_mode=True)
                   'marker_line_color': ('black', 'white'),
                   'color_discrete_sequence': (pc.qualitative.Alphabet, pc.qualitative.Light24)}
 
-    # Preliminary stats and estimates are required to generate a bell curve
-    num_simulations = sum(df['num_bingo_tries'])
-    peak_estimate = max(df['num_bingo_tries'])
-    mean_estimate = 45.0  # 5x5 bingo card with 15 columns will have this approx mean
-    sigma_estimate = 10.0  # Ditto for the standard deviation
-    p0 = [peak_estimate, mean_estimate, sigma_estimate]
-
-    # Get curve fit parameters
-    curve_param, curve_covariance = curve_fit(gauss_curve, df.index, df['num_bingo_tries'], p0=p0)
+    # Curve fit and CDF, computed once per dataset
+    if histo_stats is None:
+        histo_stats = get_histo_stats(df)
 
-    curve_a, curve_mean, curve_std = curve_param
-
-    # Generate curve model
-    y_gauss_curve = gauss_curve(df.index, *curve_param)
-
-    # Generate CDF
-    df['num_bingo_tries_sum'] = df['num_bingo_tries'].cumsum()
-    df['num_bingo_tries_cdf'] = (df['num_bingo_tries_sum'] / num_simulations) * 100
+    geometry = as_geometry(geometry)
+    num_simulations = histo_stats['num_simulations']
+    curve_a, curve_mean, curve_std = histo_stats['curve_param']
+    y_gauss_curve = histo_stats['gauss_curve']
 
     # Get bar graph (stacked) objects
     data_total = get_bar_object(df, 'num_bingo_tries', 'frequency', pc.qualitative.Plotly[0],
                                 color_mode['marker_line_color'][dark_mode])
 
-    # Done in this order for proper legend presentation
-    data_rows = get_bar_object(df, 'num_tries_rows', 'Rows', pc.qualitative.Plotly[0],
-                               color_mode['marker_line_color'][dark_mode])
-    data_cols = get_bar_object(df, 'num_tries_cols', 'Columns', pc.qualitative.Plotly[1],
-                               color_mode['marker_line_color'][dark_mode])
-    data_diag = get_bar_object(df, 'num_tries_diag', 'Diagonals', pc.qualitative.Plotly[2],
-                               color_mode['marker_line_color'][dark_mode])
-    data_corners = get_bar_object(df, 'num_tries_corners', 'Corners', pc.qualitative.Plotly[3],
-                                  color_mode['marker_line_color'][dark_mode])
-
-    data_row0 = get_bar_object(df, 'num_tries_row0', 'Row 1', color_mode['color_discrete_sequence'][dark_mode][1],
-                               color_mode['marker_line_color'][dark_mode])
-    data_row1 = get_bar_object(df, 'num_tries_row1', 'Row 2', color_mode['color_discrete_sequence'][dark_mode][2],
-                               color_mode['marker_line_color'][dark_mode])
-    data_row2 = get_bar_object(df, 'num_tries_row2', 'Row 3', color_mode['color_discrete_sequence'][dark_mode][3],
-                               color_mode['marker_line_color'][dark_mode])
-    data_row3 = get_bar_object(df, 'num_tries_row3', 'Row 4', color_mode['color_discrete_sequence'][dark_mode][4],
-                               color_mode['marker_line_color'][dark_mode])
-    data_row4 = get_bar_object(df, 'num_tries_row4', 'Row 5', color_mode['color_discrete_sequence'][dark_mode][5],
-                               color_mode['marker_line_color'][dark_mode])
-
-    data_col0 = get_bar_object(df, 'num_tries_col0', 'Column B', color_mode['color_discrete_sequence'][dark_mode][6],
-                               color_mode['marker_line_color'][dark_mode])
-    data_col1 = get_bar_object(df, 'num_tries_col1', 'Column I', color_mode['color_discrete_sequence'][dark_mode][7],
-                               color_mode['marker_line_color'][dark_mode])
-    data_col2 = get_bar_object(df, 'num_tries_col2', 'Column N', color_mode['color_discrete_sequence'][dark_mode][8],
-                               color_mode['marker_line_color'][dark_mode])
-    data_col3 = get_bar_object(df, 'num_tries_col3', 'Column G', color_mode['color_discrete_sequence'][dark_mode][9],
-                               color_mode['marker_line_color'][dark_mode])
-    data_col4 = get_bar_object(df, 'num_tries_col4', 'Column O', color_mode['color_discrete_sequence'][dark_mode][10],
-                               color_mode['marker_line_color'][dark_mode])
-
-    data_diag1 = get_bar_object(df, 'num_tries_diag1', 'Diagonal 1',
-                                color_mode['color_discrete_sequence'][dark_mode][11],
-                                color_mode['marker_line_color'][dark_mode])
-    data_diag2 = get_bar_object(df, 'num_tries_diag2', 'Diagonal 2',
-                                color_mode['color_discrete_sequence'][dark_mode][12],
-                                color_mode['marker_line_color'][dark_mode])
+    # Bars of each kind of win pattern (e.g. all the rows), and of each win pattern (e.g. a single row); a kind with a
+    # single pattern (e.g. corners) keeps its color in both
+    kind_columns, pattern_columns = get_plot_columns(get_tries_columns(geometry), geometry)
+    colors = {column: pc.qualitative.Plotly[i % len(pc.qualitative.Plotly)]
+              for i, (column, _) in enumerate(kind_columns)}
+    pattern_colors = color_mode['color_discrete_sequence'][dark_mode][1:]
+    for column, _ in pattern_columns:
+        if column not in colors:
+            colors[column] = pattern_colors[(len(colors) - len(kind_columns)) % len(pattern_colors)]
+
+    data_kinds = [get_bar_object(df, column, label, colors[column], color_mode['marker_line_color'][dark_mode])
+                  for column, label in kind_columns]
+    data_patterns = [get_bar_object(df, column, label, colors[column], color_mode['marker_line_color'][dark_mode])
+                     for column, label in pattern_columns]
 
     # Small data is simply num BINGO wins
     # Medium data is details of BINGO wins (rows, cols, diagonals, corners), but not specific like row0, col1, etc.
     # High data is all details of BINGO wins (which row, col, diag. etc.) got a BINGO!
+    # Stacked bars are added in reverse, for proper legend presentation
     data_small = data_total
-    data_medium = [data_corners, data_diag, data_cols, data_rows]
-    data_large = [data_corners, data_diag2, data_diag1, data_col4, data_col3, data_col2, data_col1, data_col0,
-                  data_row4, data_row3, data_row2, data_row1, data_row0]
+    data_medium = data_kinds[::-1]
+    data_large = data_patterns[::-1]
 
     # Dictionary for data selector based on input to this function
     data_selector = {"Small": data_small, "Medium": data_medium, "Large": data_large}
@@ -146,7 +267,7 @@ def plot_bingo_histo(df, detail_size="Large", plot_offline=True, dark_mode=True)
     data2 = go.Scatter(x=df.index, y=y_gauss_curve, name="Gauss Fit", line=dict(width=4, color='red'), hovertemplate='%{x} bingo balls happened %{y:.0f} times<extra></extra>')
 
     # CDF
-    cdf_data = go.Scatter(x=df.index, y=df['num_bingo_tries_cdf'], name="CDF", line=dict(width=4, color='blue'), hovertemplate='%{x} bingo balls resulted in %{y:.0f}% bingo wins<extra></extra>')
+    cdf_data = go.Scatter(x=df.index, y=histo_stats['cdf'], name="CDF", line=dict(width=4, color='blue'), hovertemplate='%{x} bingo balls resulted in %{y:.0f}% bingo wins<extra></extra>')
 
     layout = go.Layout(
         title={
@@ -191,9 +312,11 @@ def plot_bingo_histo(df, detail_size="Large", plot_offline=True, dark_mode=True)
     x_arrow_vector = -200
     y_arrow_vector = -50
 
-    # Annotation variables
-    x_annotation_point = int(mean_estimate - sigma_estimate)
-    y_annotation_point = y_gauss_curve[x_annotation_point]
+    # Annotation variables: the fit curve one standard deviation below the mean of the data
+    annotation_index = int(np.abs(df.index.to_numpy(dtype=np.float64) -
+                                  (histo_stats['mean'] - histo_stats['std'])).argmin())
+    x_annotation_point = df.index[annotation_index]
+    y_annotation_point = y_gauss_curve[annotation_index]
 
     # Border of annotation properties
     bordercolor = "red"
@@ -274,6 +397,8 @@ def get_pie_fig_and_annotation(detail, x1, y1, x2, y2, font_size, color_mode, da
     :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
     :return: fig (go.Figure) and annotation (dict)"""
 
+    from plotly.subplots import make_subplots
+
     spec = {'type': 'domain'}
 
     if detail == "subplot_cols":
@@ -298,13 +423,15 @@ def add_trace(fig, label, value, detail, row, col):
     :param: col (int) as 1 or 2 (location in subplot)
     :return: None (fig is automatically updated by reference)"""
 
+    import plotly.graph_objs as go
+
     fig.add_trace(go.Pie(labels=label, values=value, name=f"Bingo {detail} Level Breakdown",
                          textfont=dict(family=FONT_FAMILY2)), row, col)
 
 
 # ------------------------------------------------------------------------------------------------------------------
 
-def plot_bingo_pie(df, plot_offline=True, detail="subplot_cols", font_size=20, dark_mode=True):
+def plot_bingo_pie(df, plot_offline=True, detail="subplot_cols", font_size=20, dark_mode=True, geometry=None):
     """Plots the BINGO pie charts.
     :param: df (pandas.df) DataFrame containing number of tries for each BINGO win
     :param: plot_offline (bool) If an offline plot is to be generated (default: True)
@@ -314,12 +441,19 @@ def plot_bingo_pie(df, plot_offline=True, detail="subplot_cols", font_size=20, d
             - "large" - Plots a single high detail pie chart
             - "small" - Plots a single low detail pie chart
     :param: dark_mode (bool) If dark mode plotting is done (True), light mode plotting (False)
+    :param: geometry (CardGeometry) The card layout the statistics are for (default: bingo_card.DEFAULT_GEOMETRY)
     :return: (go.Figure) object"""
 
-    # Total number of simulations
-    num_simulations = int(df['num_line_bingo'].values + df['num_diag_bingo'].values + df['num_corners_bingo'].values)
+    import plotly.offline as pyo
+    import plotly.graph_objs as go
+    import plotly.colors as pc
+
+    # Slices of each win pattern (e.g. a single row), and of each kind of win pattern (e.g. all the rows)
+    geometry = as_geometry(geometry)
+    kind_columns, pattern_columns = get_plot_columns(get_num_bingo_columns(geometry), geometry)
 
-    bingo_ref = {0: 'B', 1: 'I', 2: 'N', 3: 'G', 4: 'O'}
+    # Total number of simulations: every game is credited to a single win pattern
+    num_simulations = int(round(sum(df[column].values[0] for column, _ in kind_columns)))
 
     # Color mode dictionary, each key contains a tuple that is the color to use when dark_mode is False/True
     # E.g. color_mode['title'][True] will provide 'white', otherwise 'black'.
@@ -334,26 +468,15 @@ def plot_bingo_pie(df, plot_offline=True, detail="subplot_cols", font_size=20, d
     labels1 = []
     values1 = []
 
-    # Done in this order for proper legend presentation
-    for i in range(0, CARD_LENGTH):
-        set_labels_and_values(df, labels1, values1, f"Column {bingo_ref[i]}", f"num_bingo_col{i}")
-
-    set_labels_and_values(df, labels1, values1, "Corners", "num_corners_bingo")
-
-    for i in [1, 2]:
-        set_labels_and_values(df, labels1, values1, f"Diagonal {i}", f"num_diag{i}_bingo")
-
-    for i in range(0, CARD_LENGTH):
-        set_labels_and_values(df, labels1, values1, f"Row {i + 1}", f"num_bingo_row{i}")
+    for column, label in pattern_columns:
+        set_labels_and_values(df, labels1, values1, label, column)
 
     # Labels and values for second pie chart
     labels2 = []
     values2 = []
 
-    set_labels_and_values(df, labels2, values2, "Columns", "num_col_bingo")
-    set_labels_and_values(df, labels2, values2, "Corners", "num_corners_bingo")
-    set_labels_and_values(df, labels2, values2, "Diagonals", "num_diag_bingo")
-    set_labels_and_values(df, labels2, values2, "Rows", "num_row_bingo")
+    for column, label in kind_columns:
+        set_labels_and_values(df, labels2, values2, label, column)
 
     # 2 pie charts in subplots, as rows or cols, or single plot as high or low details
     if detail == "subplot_cols":
@@ -409,3 +532,42 @@ def plot_bingo_pie(df, plot_offline=True, detail="subplot_cols", font_size=20, d
         pyo.plot(fig, filename=HTML_PIE_FILE)
 
     return fig
+
+
+# ------------------------------------------------------------------------------------------------------------------
+
+def add_figure_changes(from_data, to_data, path, changes):
+    """Lists the changes between two parts of figure JSON, recursively.
+    :param: from_data (dict, list or value) The part of the figure to change from
+    :param: to_data (dict, list or value) The same part of the figure to change to
+    :param: path (list) of the keys and indices leading to this part of the figure
+    :param: changes (list) of the changes found so far, added to, see get_figure_patch()
+    :return: None"""
+
+    if isinstance(from_data, dict) and isinstance(to_data, dict) and from_data.keys() == to_data.keys():
+        for key in from_data:
+            add_figure_changes(from_data[key], to_data[key], path + [key], changes)
+    elif isinstance(from_data, list) and isinstance(to_data, list) and len(from_data) == len(to_data):
+        for index, (from_item, to_item) in enumerate(zip(from_data, to_data)):
+            add_figure_changes(from_item, to_item, path + [index], changes)
+    elif from_data != to_data:
+        changes.append([path, to_data])
+
+
+# ------------------------------------------------------------------------------------------------------------------
+
+def get_figure_patch(from_fig, to_fig):
+    """Returns the changes turning a figure into another one of the same structure, e.g. the same plot in the other
+    color mode.  Applying them to either figure gives to_fig, so the browser can switch color modes on its own.
+    :param: from_fig (go.Figure) The figure to change from
+    :param: to_fig (go.Figure) The figure to change to
+    :return: (list) of [path, value] changes, path being the list of keys and indices to the value in the figure
+    JSON"""
+
+    changes = []
+    add_figure_changes(json.loads(from_fig.to_json()), json.loads(to_fig.to_json()), [], changes)
+
+    if any(not path for path, _ in changes):
+        raise ValueError('Figures of different structures in get_figure_patch().')
+
+    return changes
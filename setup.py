@@ -9,6 +9,7 @@ DESCRIPTION = '"Bingo Simulator that plots histograms of the results."'
 AUTHOR = 'Colin Huber'
 AUTHOR_EMAIL = 'cbhuber@gmail.com'
 INSTALL_REQUIRES = ['plotly', 'numpy', 'scipy', 'pandas']
+PYTHON_REQUIRES = '>=3.9'  # math.perm, statistics.NormalDist, tracemalloc.reset_peak, Executor.shutdown(cancel_futures)
 
 
 '''AUTOMATICALLY GENERATED. DO NOT MODIFY ANYTHING BELOW THIS UNLESS YOU KNOW WHAT YOU ARE DOING'''
@@ -46,7 +47,8 @@ setup(
     packages=find_packages(exclude=['test', 'doc']),
     cmdclass={'test': PyTestCommand},
     tests_require=['pytest'],
+    python_requires=PYTHON_REQUIRES,
     install_requires=INSTALL_REQUIRES,
-    entry_points={},
+    entry_points={'console_scripts': ['bingo-simulator=bingo_simulator.bingo_cli:main']},
     include_package_data=True,
     zip_safe=False,)
@@ -1,7 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+import threading
 import pytest
-from bingo_simulator.bingo_card import BingoCard
-from bingo_simulator.bingo_card import CARD_LENGTH
-from bingo_simulator.bingo_simulator_main import BingoStats
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from bingo_simulator import bingo_batch
+from bingo_simulator import bingo_benchmark
+from bingo_simulator import bingo_card
+from bingo_simulator import bingo_checkpoint
+from bingo_simulator import bingo_cli
+from bingo_simulator import bingo_convergence
+from bingo_simulator import bingo_exact
+from bingo_simulator import bingo_factory
+from bingo_simulator import bingo_jobs
+from bingo_simulator.bingo_hall import BingoHall
+from bingo_simulator.bingo_monitor import PHASES, RunMonitor
+from bingo_simulator import bingo_parallel
+from bingo_simulator import bingo_registry
+from bingo_simulator import bingo_results
+from bingo_simulator import bingo_rng
+from bingo_simulator.bingo_card import BingoCard, get_geometry
+from bingo_simulator.bingo_card import CARD_LENGTH, COLUMN_RANGE, DEFAULT_GEOMETRY
+from bingo_simulator.bingo_simulator_main import BingoStats, BingoSimulator, ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK
 
 PACKAGE_NAME = "bingo_simulator"
 
@@ -329,3 +351,1071 @@ def test_invalid_traditional_bingo():
            stats.df_num_bingo['num_bingo_col0'].values == 0 and \
            stats.df_num_bingo['num_bingo_col0'].values == 0 and \
            stats.df_num_bingo['num_corners_bingo'].values == 0
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def replay_with_bingo_card(cards, draws):
+    """Replays pre-generated cards and draws one game at a time with BingoCard.check_traditional_bingo()."""
+    stats = BingoStats(len(cards))
+    num_bingo_balls = []
+
+    for numbers, draw in zip(cards, draws):
+        card = BingoCard(False)
+        for i in range(0, CARD_LENGTH):
+            for j in range(0, CARD_LENGTH):
+                card.bingo_card[i][j] = [int(numbers[i][j]), numbers[i][j] == 0]
+
+        for n, bingo_ball in enumerate(draw, start=1):
+            for i in range(0, CARD_LENGTH):
+                for j in range(0, CARD_LENGTH):
+                    if card.bingo_card[i][j][False] == bingo_ball:
+                        card.bingo_card[i][j][True] = True
+            if card.check_traditional_bingo(stats, n):
+                num_bingo_balls.append(n)
+                break
+
+    return stats, num_bingo_balls
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('free_cell', [False, True])
+def test_batch_engine_matches_bingo_card(free_cell):
+    rng = np.random.default_rng(2022)
+    cards = bingo_batch.generate_cards(300, free_cell, rng)
+    draws = bingo_batch.generate_draws(300, rng)
+
+    num_bingo_balls, win_pattern = bingo_batch.find_bingo(cards, draws)
+    batch_stats = BingoStats(len(cards))
+    batch_stats.add_tries(bingo_batch.count_tries(num_bingo_balls, win_pattern))
+
+    loop_stats, loop_bingo_balls = replay_with_bingo_card(cards, draws)
+
+    assert list(num_bingo_balls) == loop_bingo_balls
+    assert batch_stats.df_num_bingo.equals(loop_stats.df_num_bingo)
+    assert batch_stats.df_tries.equals(loop_stats.df_tries)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_generate_cards():
+    cards = bingo_batch.generate_cards(1000, True, np.random.default_rng(1))
+
+    for i in range(0, CARD_LENGTH):
+        column = np.delete(cards[:, :, i], CARD_LENGTH // 2, axis=1) if i == CARD_LENGTH // 2 else cards[:, :, i]
+        assert column.min() >= COLUMN_RANGE * i + 1 and column.max() <= COLUMN_RANGE * (i + 1)
+        assert all(len(set(numbers)) == len(numbers) for numbers in column)
+
+    assert (cards[:, CARD_LENGTH // 2, CARD_LENGTH // 2] == 0).all()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_numpy_engine():
+    sim = BingoSimulator(5000)
+    sim.play_bingo(False, ENGINE_NUMPY, batch_size=1500)
+
+    assert sim.stats.df_tries['num_bingo_tries'].sum() == 5000
+    assert (sim.stats.df_num_bingo['num_line_bingo'] + sim.stats.df_num_bingo['num_diag_bingo'] +
+            sim.stats.df_num_bingo['num_corners_bingo']).values[0] == 5000
+    assert (sim.stats.df_tries['num_tries_rows'] + sim.stats.df_tries['num_tries_cols'] +
+            sim.stats.df_tries['num_tries_diag'] + sim.stats.df_tries['num_tries_corners']).equals(
+        sim.stats.df_tries['num_bingo_tries'])
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_invalid_engine():
+    with pytest.raises(ValueError):
+        BingoSimulator(1).play_bingo(False, "abacus")
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_card_view_writes_marks():
+    card, _ = get_valid_row(2)
+    assert card.marks == DEFAULT_GEOMETRY.row_masks[2]
+
+    card.bingo_card[2][3][True] = False
+    assert card.marks == DEFAULT_GEOMETRY.row_masks[2] & ~(1 << (2 * CARD_LENGTH + 3))
+
+    card.bingo_card[0][1] = [17, True]
+    assert card.numbers[1] == 17 and card.bingo_card[0][1][True]
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_card_free_cell():
+    card = BingoCard(True)
+    mid_index = CARD_LENGTH // 2
+
+    assert card.bingo_card[mid_index][mid_index] == [0, True]
+    assert card.marks == 1 << (mid_index * CARD_LENGTH + mid_index)
+    assert sorted(card.numbers)[1:] == sorted(set(card.numbers) - {0})
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_stats_columns():
+    stats = BingoStats(1)
+    lines = [f'num_{kind}{i}' for i in range(0, CARD_LENGTH) for kind in ['tries_row', 'tries_col']]
+
+    assert list(stats.df_tries.columns) == ['num_bingo_tries', 'num_bingo_tries_sum', 'num_bingo_tries_cdf'] + \
+        lines + ['num_tries_rows', 'num_tries_cols', 'num_tries_diag1', 'num_tries_diag2', 'num_tries_diag',
+                 'num_tries_corners']
+    assert list(stats.df_tries.index) == list(range(0, CARD_LENGTH * COLUMN_RANGE))
+    assert list(stats.df_num_bingo.columns) == \
+        [f'num_bingo_{kind}{i}' for i in range(0, CARD_LENGTH) for kind in ['row', 'col']] + \
+        ['num_row_bingo', 'num_col_bingo', 'num_line_bingo', 'num_diag1_bingo', 'num_diag2_bingo', 'num_diag_bingo',
+         'num_corners_bingo']
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_traditional_bingo_tries():
+    card, stats = get_valid_col(3)
+    assert card.check_traditional_bingo(stats, 12)
+
+    df_tries = stats.df_tries
+    for column in ['num_bingo_tries', 'num_tries_col3', 'num_tries_cols']:
+        assert df_tries[column][12] == 1 and df_tries[column].sum() == 1
+    assert df_tries['num_tries_rows'].sum() == 0 and stats.df_num_bingo['num_line_bingo'].values == 1
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_loop_engine():
+    sim = BingoSimulator(200)
+    sim.play_bingo(True)
+
+    assert sim.stats.df_tries['num_bingo_tries'].sum() == 200
+    assert sim.stats.df_tries['num_bingo_tries'].equals(sim.stats.df_tries['num_tries_rows'] +
+                                                        sim.stats.df_tries['num_tries_cols'] +
+                                                        sim.stats.df_tries['num_tries_diag'] +
+                                                        sim.stats.df_tries['num_tries_corners'])
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('free_cell', [False, True])
+def test_call_ball_matches_batch_engine(free_cell):
+    rng = np.random.default_rng(4)
+    cards = bingo_batch.generate_cards(300, free_cell, rng)
+    draws = bingo_batch.generate_draws(300, rng)
+    num_bingo_balls, win_pattern = bingo_batch.find_bingo(cards, draws)
+
+    for numbers, draw, expected_balls, expected_pattern in zip(cards, draws, num_bingo_balls, win_pattern):
+        card = BingoCard(free_cell)
+        for i in range(0, CARD_LENGTH):
+            for j in range(0, CARD_LENGTH):
+                card.bingo_card[i][j] = [int(numbers[i][j]), numbers[i][j] == 0]
+
+        pattern_index = -1
+        for n, bingo_ball in enumerate(draw, start=1):
+            pattern_index = card.call_ball(int(bingo_ball))
+            if pattern_index >= 0:
+                break
+
+        assert (n, pattern_index) == (expected_balls, expected_pattern)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_call_ball_counters_follow_marks():
+    card, _ = get_valid_diagonal1()
+    card.bingo_card[3][3][True] = False
+
+    assert card.call_ball(0) == -1
+    assert card.call_ball(card.numbers[3 * CARD_LENGTH + 3]) == DEFAULT_GEOMETRY.pattern_index['diag', 1]
+    assert card.call_ball(card.numbers[3 * CARD_LENGTH + 3]) == -1
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_stats_merge():
+    first = BingoSimulator(300, seed=1)
+    first.play_bingo(False, ENGINE_NUMPY)
+    second = BingoSimulator(200, seed=2)
+    second.play_bingo(False)
+
+    merged = first.stats + second.stats
+
+    assert merged.num_simulations == 500
+    assert merged.df_tries.equals(first.stats.df_tries + second.stats.df_tries)
+    assert merged.df_num_bingo.equals(first.stats.df_num_bingo + second.stats.df_num_bingo)
+    assert sum([first.stats, second.stats]).df_tries.equals(merged.df_tries)
+    assert first.stats.num_simulations == 300
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('engine', [ENGINE_LOOP, ENGINE_NUMPY])
+def test_seed_reproducible(engine):
+    stats = []
+    for _ in range(0, 2):
+        sim = BingoSimulator(300, seed=7)
+        sim.play_bingo(True, engine)
+        stats.append(sim.stats)
+
+    assert stats[0].df_tries.equals(stats[1].df_tries)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_parallel_matches_single_process():
+    single = bingo_parallel.play_bingo_parallel(3001, False, workers=1, seed=11, num_shards=3, batch_size=500)
+    parallel = bingo_parallel.play_bingo_parallel(3001, False, workers=2, seed=11, num_shards=3, batch_size=500)
+
+    assert bingo_parallel.get_shard_sizes(3001, 3) == [1001, 1000, 1000]
+    assert parallel.num_simulations == 3001
+    assert parallel.df_tries.equals(single.df_tries)
+    assert parallel.df_num_bingo.equals(single.df_num_bingo)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('free_cell', [False, True])
+def test_rank_engine_matches_batch_engine(free_cell):
+    rng = np.random.default_rng(6)
+    cards = bingo_batch.generate_cards(2000, free_cell, rng)
+    draws = bingo_batch.generate_draws(2000, rng)
+
+    num_bingo_balls, win_pattern = bingo_batch.find_bingo_ranks(cards, draws)
+    expected_balls, expected_pattern = bingo_batch.find_bingo(cards, draws)
+
+    assert (num_bingo_balls == expected_balls).all() and (win_pattern == expected_pattern).all()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_rank_engine():
+    stats = []
+    for engine in [ENGINE_NUMPY, ENGINE_RANK]:
+        sim = BingoSimulator(3000, seed=3)
+        sim.play_bingo(True, engine, batch_size=1000)
+        stats.append(sim.stats)
+
+    assert stats[0].df_tries.equals(stats[1].df_tries)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('free_cell', [False, True])
+def test_exact_matches_simulation(free_cell):
+    num_simulations = 20000
+    sim = BingoSimulator(num_simulations, seed=7)
+    sim.play_bingo(free_cell, ENGINE_RANK)
+
+    exact = bingo_exact.exact_tries(free_cell)
+    expected = bingo_exact.exact_tries(free_cell, num_simulations)
+    simulated = sim.stats.df_tries
+    balls = np.arange(0, CARD_LENGTH * COLUMN_RANGE)
+
+    assert list(exact.columns) == list(simulated.columns)
+    assert exact['num_bingo_tries'].sum() == pytest.approx(1.0)
+    assert expected['num_bingo_tries'].sum() == pytest.approx(num_simulations)
+    assert (exact['num_bingo_tries'] * balls).sum() == \
+        pytest.approx((simulated['num_bingo_tries'] * balls).sum() / num_simulations, abs=0.3)
+
+    exact_share = bingo_exact.exact_num_bingo(free_cell).values[0]
+    simulated_share = sim.stats.df_num_bingo.values[0] / num_simulations
+    assert np.abs(exact_share - simulated_share).max() < 0.015
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_hall_of_one_card_matches_simulator():
+    hall = BingoHall(2000, 1, seed=8)
+    hall.play_bingo(False, batch_size=500)
+    sim = BingoSimulator(2000, seed=8)
+    sim.play_bingo(False, ENGINE_RANK, batch_size=500)
+
+    assert hall.stats.card_stats.df_tries.equals(sim.stats.df_tries)
+    assert hall.stats.first_win_stats.df_tries.equals(sim.stats.df_tries)
+    assert list(hall.stats.num_winners) == [0, 2000]
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_hall_stats():
+    hall = BingoHall(300, 50, seed=9)
+    hall.play_bingo(True, batch_size=1000)
+    stats = hall.stats + hall.stats
+    balls = np.arange(0, CARD_LENGTH * COLUMN_RANGE)
+
+    assert stats.num_games == 600 and stats.df_num_winners['num_games'].sum() == 600
+    assert stats.card_stats.df_tries['num_bingo_tries'].sum() == 600 * 50
+    assert stats.first_win_stats.df_tries['num_bingo_tries'].sum() == 600
+    assert (stats.first_win_stats.tries.sum(axis=0) * balls).sum() / 600 < \
+        (stats.card_stats.tries.sum(axis=0) * balls).sum() / (600 * 50)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('engine', [ENGINE_LOOP, ENGINE_RANK])
+def test_checkpoint_resume_matches_uninterrupted_run(engine, tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    uninterrupted = BingoSimulator(2500, seed=5)
+    uninterrupted.play_bingo(True, engine, batch_size=400)
+
+    # Crash after the third chunk, one chunk after the last checkpoint
+    crashed = BingoSimulator(2500, seed=5)
+    play_games = crashed.play_games
+    chunks_played = []
+
+    def crash_after_three_chunks(*args):
+        if len(chunks_played) == 3:
+            raise KeyboardInterrupt
+        chunks_played.append(args)
+        play_games(*args)
+
+    crashed.play_games = crash_after_three_chunks
+    with pytest.raises(KeyboardInterrupt):
+        bingo_checkpoint.play_bingo_checkpointed(crashed, True, path, engine, 400, every_games=800)
+
+    resumed = BingoSimulator(2500, seed=5)
+    bingo_checkpoint.play_bingo_checkpointed(resumed, True, path, engine, 400, every_games=800)
+
+    assert resumed.games_played == 2500
+    assert not os.path.exists(path)
+    assert resumed.stats.df_tries.equals(uninterrupted.stats.df_tries)
+    assert resumed.stats.df_num_bingo.equals(uninterrupted.stats.df_num_bingo)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_checkpoint_rejects_other_run(tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    interrupted = BingoSimulator(100, seed=1)
+    interrupted.play_games(False, 50)
+    bingo_checkpoint.save_checkpoint(interrupted, path, {'free_cell': False, 'geometry': [5, 15, ['traditional']],
+                                                         'seed_key': interrupted.seed_key, 'first_game': 0})
+
+    # Not resumed with another free cell or another seed, whose games would not continue the checkpointed ones
+    with pytest.raises(ValueError):
+        bingo_checkpoint.play_bingo_checkpointed(BingoSimulator(100, seed=1), True, path, batch_size=50)
+    with pytest.raises(ValueError):
+        bingo_checkpoint.play_bingo_checkpointed(BingoSimulator(100, seed=2), False, path, batch_size=50)
+
+    # Resumed by the same run, which leaves no checkpoint behind once over: running again plays a new run
+    resumed = BingoSimulator(100, seed=1)
+    bingo_checkpoint.play_bingo_checkpointed(resumed, False, path, batch_size=50)
+    assert resumed.games_played == 100 and not os.path.exists(path)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('engine', [ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK])
+def test_monitor_does_not_change_results(engine):
+    plain = BingoSimulator(1000, seed=9)
+    plain.play_bingo(False, engine, batch_size=300)
+
+    reports = []
+    monitor = RunMonitor(hooks=[reports.append])
+    monitored = BingoSimulator(1000, seed=9)
+    monitored.play_bingo(False, engine, batch_size=300, monitor=monitor)
+
+    assert monitored.stats.df_tries.equals(plain.stats.df_tries)
+    assert [report['games_played'] for report in reports] == [300, 600, 900, 1000]
+
+    report = monitor.report()
+    assert report['engine'] == engine and report['games_played'] == report['total_games'] == 1000
+    assert report['games_per_sec'] > 0 and report['eta'] == 0
+    assert set(report['phase_times']) == set(PHASES) and report['phase_times']['cards'] > 0
+    assert sum(report['phase_shares'].values()) == pytest.approx(1.0)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_rng_cards_and_draws():
+    seed_key = bingo_rng.get_seed_key(4)
+    cards = bingo_rng.generate_cards(seed_key, np.arange(0, 1000), True)
+    draws = bingo_rng.generate_draws(seed_key, np.arange(0, 1000))
+
+    for i in range(0, CARD_LENGTH):
+        column = cards[:, :, i]
+        if i == CARD_LENGTH // 2:
+            column = np.delete(column, CARD_LENGTH // 2, axis=1)
+        assert ((column > COLUMN_RANGE * i) & (column <= COLUMN_RANGE * (i + 1))).all()
+        assert (np.diff(np.sort(column, axis=1), axis=1) > 0).all()
+
+    assert (np.sort(draws, axis=1) == np.arange(1, CARD_LENGTH * COLUMN_RANGE + 1)).all()
+    assert (bingo_rng.generate_cards(seed_key, np.array([737, 5]), True) == cards[[737, 5]]).all()
+    assert (bingo_rng.generate_draws(seed_key, np.array([737])) == draws[737]).all()
+    assert not (bingo_rng.generate_draws(bingo_rng.get_seed_key(5), np.arange(0, 1000)) == draws).all()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_engines_and_splits_play_the_same_games():
+    expected = BingoSimulator(1200, seed=12)
+    expected.play_bingo(False, ENGINE_RANK)
+
+    for engine, batch_size in [(ENGINE_LOOP, 1000), (ENGINE_NUMPY, 70), (ENGINE_RANK, 333)]:
+        sim = BingoSimulator(1200, seed=12)
+        sim.play_games(False, 500, engine, batch_size)
+        sim.play_bingo(False, engine, batch_size)
+        assert sim.stats.df_tries.equals(expected.stats.df_tries)
+
+    for num_shards in [1, 4, 7]:
+        merged = bingo_parallel.play_bingo_parallel(1200, False, ENGINE_RANK, workers=1, seed=12,
+                                                    num_shards=num_shards, batch_size=100)
+        assert merged.df_tries.equals(expected.stats.df_tries)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_replay_game():
+    sim = BingoSimulator(1, seed=13)
+    seed_key = bingo_rng.get_seed_key(13)
+    games = np.arange(7341000, 7341100)
+    num_bingo_balls, win_pattern = bingo_batch.find_bingo_ranks(bingo_rng.generate_cards(seed_key, games, True),
+                                                                bingo_rng.generate_draws(seed_key, games))
+
+    for i in [0, 41, 99]:
+        card, draw, balls, pattern = sim.replay_game(games[i], True)
+        assert (balls, pattern) == (num_bingo_balls[i], win_pattern[i])
+        assert card.bingo_card[2][2][True] and sorted(draw) == list(range(1, CARD_LENGTH * COLUMN_RANGE + 1))
+
+    shard = BingoSimulator(1, seed=13, first_game=games[41])
+    shard.play_bingo(True)
+    assert shard.stats.tries[win_pattern[41], num_bingo_balls[41]] == 1
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_until_converged():
+    sim = BingoSimulator(1000000, seed=14)
+    report = bingo_convergence.play_bingo_until_converged(sim, False, share_width=0.02, quantile_error=0.1,
+                                                          batch_size=2000)
+
+    assert report['converged'] and report['games_played'] < 1000000
+    assert sim.stats.num_simulations == report['games_played'] == sim.stats.bingo_counts.sum()
+    assert (report['share_intervals']['width'] <= 0.02).all()
+    assert (report['quantile_intervals']['rel_error'] <= 0.1).all()
+
+    # Exact shares fall within the intervals
+    intervals = report['share_intervals']
+    exact = bingo_exact.exact_num_bingo(False).iloc[0]
+    assert ((intervals['lower'] <= exact) & (exact <= intervals['upper'])).mean() > 0.8
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_play_bingo_until_converged_budget():
+    sim = BingoSimulator(3000, seed=15)
+    report = bingo_convergence.play_bingo_until_converged(sim, True, share_width=0.0001, batch_size=1000)
+
+    assert not report['converged'] and report['games_played'] == 3000
+    assert list(report['share_intervals'].index) == list(sim.stats.df_num_bingo.columns)
+
+    with pytest.raises(ValueError):
+        bingo_convergence.play_bingo_until_converged(BingoSimulator(10), True)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_benchmark_compare(tmp_path):
+    baseline = {'meta': {}, 'results': {'fast': {'seconds': 1.0, 'ops_per_sec': 100.0, 'peak_memory': 1000},
+                                        'gone': {'seconds': 1.0, 'ops_per_sec': 100.0, 'peak_memory': None}}}
+    current = {'meta': {}, 'results': {'fast': {'seconds': 1.0, 'ops_per_sec': 80.0, 'peak_memory': 1050}}}
+
+    comparisons = bingo_benchmark.compare_results(baseline, current, tolerance=0.1)
+    assert [(name, metric, regression) for name, metric, _, _, _, regression in comparisons] == \
+        [('fast', 'ops_per_sec', True), ('fast', 'peak_memory', False)]
+
+    bingo_benchmark.save_results(baseline, str(tmp_path / 'baseline.json'))
+    bingo_benchmark.save_results(current, str(tmp_path / 'current.json'))
+    assert bingo_benchmark.main(['compare', str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json')]) == 1
+    assert bingo_benchmark.main(['compare', str(tmp_path / 'baseline.json'), str(tmp_path / 'current.json'),
+                                 '--tolerance', '0.3']) == 0
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_card_factory():
+    samples = bingo_factory.get_column_samples()
+    num_samples = bingo_factory.get_num_column_samples(DEFAULT_GEOMETRY)
+    assert samples.shape == (num_samples, CARD_LENGTH)
+    assert len(set(map(bytes, samples))) == num_samples
+    assert all(len(set(sample)) == CARD_LENGTH for sample in samples[::997])
+
+    cards = bingo_factory.build_cards(np.array([[0] * CARD_LENGTH, [num_samples - 1] * 5]), False)
+    assert list(cards[0, :, 0]) == [1, 2, 3, 4, 5] and list(cards[1, :, 4]) == [75, 74, 73, 72, 71]
+
+    card = bingo_factory.get_card(cards, 1, True)
+    assert [card.bingo_card[i][0][False] for i in range(0, CARD_LENGTH)] == [15, 14, 13, 12, 11]
+    assert card.bingo_card[2][2] == [0, True] and card.marks == 1 << 12
+    assert card.call_ball(71) == -1 and card.bingo_card[4][4][True]
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_geometry_cache():
+    geometry = get_geometry(4, 10)
+    assert get_geometry(4, 10) is geometry and get_geometry() is not geometry
+    assert geometry.num_balls == 40 and geometry.mid_cell is None and len(geometry.win_patterns) == 11
+    assert get_geometry(3, 5).mid_cell == 4 and get_geometry(7, 18).column_labels == list('1234567')
+
+    with pytest.raises(ValueError):
+        get_geometry(2, 10)
+    with pytest.raises(ValueError):
+        get_geometry(9, 15)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('card_length, column_range', [(3, 5), (4, 10), (7, 18)])
+def test_geometry_engines_play_the_same_games(card_length, column_range):
+    geometry = get_geometry(card_length, column_range)
+    stats = []
+
+    for engine in [ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK]:
+        sim = BingoSimulator(500, seed=16, geometry=geometry)
+        sim.play_bingo(True, engine, batch_size=200)
+        stats.append(sim.stats)
+
+    assert stats[0].tries.shape == (len(geometry.win_patterns), geometry.num_balls)
+    assert stats[0].bingo_counts.sum() == 500
+    assert all((other.tries == stats[0].tries).all() for other in stats[1:])
+    assert len(stats[0].df_num_bingo.columns) == 2 * card_length + 7
+
+    card, draw, _, _ = BingoSimulator(1, seed=16, geometry=geometry).replay_game(3, True)
+    assert sorted(draw) == list(range(1, geometry.num_balls + 1))
+    for col in range(0, card_length):
+        numbers = [card.bingo_card[row][col][False] for row in range(0, card_length)]
+        assert len(set(numbers)) == card_length
+        assert all(n == 0 or n in geometry.column_ranges[col] for n in numbers)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_geometry_stats_merge_mismatch():
+    with pytest.raises(ValueError):
+        BingoStats(1).merge(BingoStats(1, get_geometry(4, 10)))
+
+    merged = sum([BingoStats(1, get_geometry(4, 10)), BingoStats(2, get_geometry(4, 10))])
+    assert merged.geometry == get_geometry(4, 10) and merged.num_simulations == 3
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_geometry_exact_matches_simulation():
+    geometry = get_geometry(4, 10)
+    sim = BingoSimulator(20000, seed=17, geometry=geometry)
+    sim.play_bingo(False, ENGINE_RANK)
+
+    exact_share = bingo_exact.exact_num_bingo(False, geometry=geometry).values[0]
+    simulated_share = sim.stats.df_num_bingo.values[0] / 20000
+    assert np.abs(exact_share - simulated_share).max() < 0.015
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('patterns', [('blackout',), ('x', 'frame'), ('postage_stamp', 'small_diamond',
+                                                                        'large_diamond')])
+def test_registered_patterns_engines_and_exact(patterns):
+    geometry = get_geometry(patterns=patterns)
+    stats = []
+
+    for engine in [ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK]:
+        sim = BingoSimulator(2000, seed=18, geometry=geometry)
+        sim.play_bingo(True, engine, batch_size=500)
+        stats.append(sim.stats)
+
+    assert all((other.tries == stats[0].tries).all() for other in stats[1:])
+
+    balls = np.arange(0, geometry.num_tries)
+    exact = bingo_exact.exact_tries(True, geometry=geometry)
+    assert list(exact.columns) == list(stats[0].df_tries.columns)
+    assert (exact['num_bingo_tries'] * balls).sum() == \
+        pytest.approx((stats[0].df_tries['num_bingo_tries'] * balls).sum() / 2000, abs=0.5)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_register_win_pattern():
+    geometry = get_geometry(patterns=('traditional', 'postage_stamp'))
+    columns = list(BingoStats(1, geometry).df_num_bingo.columns)
+    assert columns[:len(BingoStats(1).df_num_bingo.columns)] == list(BingoStats(1).df_num_bingo.columns)
+    assert columns[-5:] == [f'num_bingo_postage_stamp{i}' for i in range(0, 4)] + ['num_postage_stamp_bingo']
+
+    if 'center_cross' not in bingo_card.WIN_PATTERN_REGISTRY:
+        bingo_card.register_win_pattern('center_cross', lambda card_length: bingo_card.get_registry_patterns(
+            'center_cross', [card_length * card_length // 2 + i for i in [-card_length, -1, 0, 1, card_length]]))
+    with pytest.raises(ValueError):
+        bingo_card.register_win_pattern('blackout', None)
+
+    card = BingoCard(True, geometry=get_geometry(patterns=('blackout', 'center_cross')))
+    assert [card.call_ball(card.bingo_card[row][col][False]) for row, col in [(1, 2), (2, 1), (2, 3)]] == [-1] * 3
+    assert card.call_ball(card.bingo_card[3][2][False]) == 1
+
+    with pytest.raises(ValueError):
+        get_geometry(patterns=('no_such_pattern',))
+    with pytest.raises(ValueError):
+        get_geometry(4, 10, ('small_diamond',))
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_pattern_completions_and_ties():
+    stats = []
+    for engine in [ENGINE_LOOP, ENGINE_NUMPY, ENGINE_RANK]:
+        sim = BingoSimulator(3000, seed=19)
+        sim.play_bingo(True, engine, batch_size=1000)
+        stats.append(sim.stats)
+
+    for name in BingoStats.COUNTERS:
+        assert all((getattr(other, name) == getattr(stats[0], name)).all() for other in stats[1:])
+
+    stats = stats[0]
+    assert (stats.completion_tries.sum(axis=1) == 3000).all()
+    assert stats.num_tied.sum() == 3000 and stats.num_tied[0] == 0 and stats.num_tied[2:].sum() > 0
+    assert (stats.tie_matrix == stats.tie_matrix.T).all()
+
+    ties = stats.df_ties
+    assert (ties['num_tied_bingo'] >= ties['num_bingo']).all() and ties['num_bingo'].sum() == 3000
+    assert ties['num_tied_bingo'].sum() == (stats.df_num_tied['num_games'] * stats.df_num_tied.index).sum()
+
+    survival = stats.df_survival
+    assert list(survival.columns) == stats.geometry.pattern_names and len(survival) == 76
+    assert (survival.iloc[0] == 1.0).all() and (survival.iloc[-1] == 0.0).all()
+    assert (survival.diff().iloc[1:] <= 0).all().all()
+
+    # Every pattern completes no earlier than the game's BINGO
+    first_win = stats.df_tries['num_bingo_tries'].cumsum() / 3000
+    assert ((1.0 - survival.iloc[:75]).le(first_win + 1e-12, axis=0)).all().all()
+
+    merged = stats + stats
+    assert (merged.tie_matrix == 2 * stats.tie_matrix).all()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('patterns', [('traditional',), ('traditional', 'postage_stamp', 'blackout')])
+def test_results_binary_and_csv_round_trips(patterns, tmp_path):
+    sim = BingoSimulator(2000, seed=23, geometry=get_geometry(patterns=patterns))
+    sim.play_bingo(True, ENGINE_RANK, batch_size=500)
+    path = str(tmp_path / 'results.bin')
+    bingo_results.save_results(sim.stats, path, sim.seed_key, ENGINE_RANK, {'free_cell': True})
+
+    loaded, header = bingo_results.load_results(path)
+    assert header['seed_key'] == sim.seed_key and header['engine'] == ENGINE_RANK
+    assert header['run_params'] == {'free_cell': True} and loaded.geometry == sim.geometry
+    assert loaded.num_simulations == 2000
+    for name in BingoStats.COUNTERS:
+        counter = getattr(loaded, name)
+        assert (counter == getattr(sim.stats, name)).all()
+        assert not counter.flags.writeable and isinstance(counter.base, np.memmap)
+        assert header['arrays'][name]['offset'] % bingo_results.ALIGNMENT == 0
+    assert loaded.df_tries.equals(sim.stats.df_tries)
+
+    copied, _ = bingo_results.load_results(path, mmap=False)
+    copied.merge(sim.stats)
+    assert (copied.tries == 2 * sim.stats.tries).all()
+
+    tries_path, num_bingo_path = str(tmp_path / 'tries.csv'), str(tmp_path / 'num_bingo.csv')
+    bingo_results.export_csv(loaded, tries_path, num_bingo_path)
+    imported = bingo_results.import_csv(tries_path, num_bingo_path, sim.geometry)
+    assert imported.num_simulations == 2000
+    assert (imported.tries == sim.stats.tries).all() and (imported.bingo_counts == sim.stats.bingo_counts).all()
+
+    # The csv files have no completion or tie counters: they are not written as zeros, nor loaded as such
+    assert imported.recorded_counters == bingo_results.CSV_COUNTERS
+    bingo_results.save_results(imported, path)
+    partial, header = bingo_results.load_results(path)
+    assert list(header['arrays']) == list(bingo_results.CSV_COUNTERS)
+    assert header['missing_counters'] == ['completion_tries', 'tie_matrix', 'num_tied']
+    assert partial.tie_matrix is None and partial.df_tries.equals(sim.stats.df_tries)
+    with pytest.raises(ValueError):
+        partial.df_ties
+    assert (partial + sim.stats).recorded_counters == bingo_results.CSV_COUNTERS
+    with pytest.raises(ValueError):
+        bingo_results.save_results(partial, path, counters=BingoStats.COUNTERS)
+
+    with pytest.raises(ValueError):
+        bingo_results.import_csv(tries_path, num_bingo_path, get_geometry(4, 15))
+    with pytest.raises(ValueError):
+        bingo_results.load_results(tries_path)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_jobs_stream_and_coalesce():
+    manager = bingo_jobs.BingoJobManager(chunk_games=700, executor=ThreadPoolExecutor(max_workers=2))
+    job_id = manager.submit(3000, False, seed=29)
+    assert manager.submit(3000, False, seed=29) == job_id
+    other_id = manager.submit(3000, True, seed=29)
+    assert other_id != job_id
+
+    progress = manager.wait(job_id)
+    assert manager.wait(other_id)['status'] == bingo_jobs.JOB_DONE
+    assert progress['status'] == bingo_jobs.JOB_DONE and progress['games_played'] == 3000
+    assert progress['num_chunks'] == 5 and progress['chunks_done'] == 5
+
+    single = BingoSimulator(3000, seed=29)
+    single.play_bingo(False, ENGINE_RANK)
+    for name in BingoStats.COUNTERS:
+        assert (getattr(manager.get_job(job_id).get_stats(), name) == getattr(single.stats, name)).all()
+
+    # Finished runs of an explicit seed are reused, cancelled ones are not
+    assert manager.submit(3000, False, seed=29) == job_id
+    random_id = manager.submit(100000, False)
+    assert manager.submit(100000, False) == random_id
+    manager.cancel(random_id)
+    assert manager.get_job(random_id).snapshot()['status'] == bingo_jobs.JOB_CANCELLED
+    assert manager.submit(100000, False) != random_id
+    manager.shutdown(wait=False)
+
+    with pytest.raises(ValueError):
+        manager.submit(100, False, engine='fast')
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_simulation_imports_are_light():
+    # The simulation path, including worker processes, must not import the DataFrame or plotting libraries, which
+    # take most of the start up time; they load when statistics are turned into DataFrames
+    code = """
+import sys
+from bingo_simulator import bingo_checkpoint, bingo_jobs, bingo_parallel, bingo_results
+from bingo_simulator.bingo_simulator_main import BingoSimulator
+sim = BingoSimulator(200, seed=1)
+sim.play_bingo(False, batch_size=100)
+bingo_parallel.play_bingo_parallel(200, False, workers=2, seed=1, batch_size=100)
+heavy = [name for name in ('pandas', 'plotly', 'scipy', 'dash') if name in sys.modules]
+assert not heavy, heavy
+sim.stats.df_tries
+assert 'pandas' in sys.modules
+"""
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(bingo_batch.__file__)))
+    env = dict(os.environ, PYTHONPATH=package_root)
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cli_run(tmp_path, capsys, workers):
+    assert bingo_cli.main(['--games', '300', '--seed', '5', '--workers', str(workers), '--batch-size', '100',
+                           '--output', str(tmp_path), '--metadata', str(tmp_path / 'run.json')]) == 0
+
+    metadata = json.loads(capsys.readouterr().out)
+    assert metadata == json.loads((tmp_path / 'run.json').read_text())
+    assert metadata['games'] == 300 and metadata['seed'] == 5 and metadata['engine'] == ENGINE_RANK
+    assert metadata['games_per_sec'] > 0 and metadata['free_cell'] is False
+
+    # Same games as a BingoSimulator run of the same seed, whatever the number of workers
+    sim = BingoSimulator(300, seed=5)
+    sim.play_bingo(False, ENGINE_RANK, 100)
+    stats, header = bingo_results.load_results(metadata['outputs']['results'])
+    assert header['seed_key'] == sim.seed_key == metadata['seed_key']
+    assert np.array_equal(stats.tries, sim.stats.tries)
+    assert os.path.exists(metadata['outputs']['tries_csv'])
+
+    with pytest.raises(SystemExit):
+        bingo_cli.main(['--games', '10', '--workers', '2', '--checkpoint', str(tmp_path / 'run.ckpt')])
+    with pytest.raises(SystemExit):
+        bingo_cli.main(['--games', '10', '--checkpoint', str(tmp_path / 'run.ckpt')])
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('geometry_args', [['--card-length', '3', '--column-range', '5'],
+                                           ['--patterns', 'blackout'], ['--patterns', 'traditional', 'frame']])
+def test_cli_plots_any_geometry(monkeypatch, capsys, geometry_args):
+    plotly_offline = pytest.importorskip('plotly.offline')
+    pytest.importorskip('scipy')
+
+    # The figures are built in full, only the html files and the browser are left out
+    plotted = []
+    monkeypatch.setattr(plotly_offline, 'plot', lambda fig, filename, **kwargs: plotted.append((filename, fig)))
+
+    assert bingo_cli.main(['--games', '500', '--seed', '5', '--format', 'none', '--plot'] + geometry_args) == 0
+    assert json.loads(capsys.readouterr().out)['games'] == 500
+
+    from bingo_simulator import plot_bingo
+    assert [filename for filename, _ in plotted] == [plot_bingo.HTML_HISTO_FILE, plot_bingo.HTML_PIE_FILE]
+    histo_fig, pie_fig = [fig for _, fig in plotted]
+    assert sum(sum(trace.y) for trace in histo_fig.data[:-2]) == 500
+    assert sum(pie_fig.data[0].values) == sum(pie_fig.data[1].values) == 500
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_registry_combines_runs(tmp_path):
+    sims = {}
+    for seed, first_game, num, free_cell in [(1, 0, 300, False), (1, 0, 200, False), (2, 0, 300, False),
+                                             (3, 0, 100, True), (2, 300, 300, False), (2, 100, 300, False)]:
+        sims[seed, first_game, num] = BingoSimulator(num, seed=seed, first_game=first_game)
+        sims[seed, first_game, num].play_bingo(free_cell, ENGINE_RANK, 100)
+
+    with bingo_registry.BingoRegistry(str(tmp_path / 'runs.db')) as registry:
+        run_ids = [registry.add_run(sim.stats, seed == 3, seed, sim.seed_key, ENGINE_RANK, first_game=first_game)
+                   for (seed, first_game, num), sim in sims.items()]
+        assert registry.add_run(sims[2, 0, 300].stats, False, 2, sims[2, 0, 300].seed_key) == run_ids[2]
+
+        # The 200 games of seed 1 are the first of its 300 game run, and games 100 to 399 of seed 2 overlap its
+        # other runs: each game is counted once, the two disjoint shards of seed 2 making its first 600 games
+        runs = registry.find_runs(free_cell=False, geometry=bingo_card.DEFAULT_GEOMETRY)
+        assert [run['run_id'] for run in runs] == run_ids[:3] + run_ids[4:]
+        assert [run['run_id'] for run in bingo_registry.get_disjoint_runs(runs)] == [run_ids[0], run_ids[2],
+                                                                                     run_ids[4]]
+        combined = registry.get_combined_stats(runs)
+        seed_2 = BingoSimulator(600, seed=2)
+        seed_2.play_bingo(False, ENGINE_RANK, 100)
+        expected = sims[1, 0, 300].stats + seed_2.stats
+        assert combined.num_simulations == 900
+        for name in BingoStats.COUNTERS:
+            assert np.array_equal(getattr(combined, name), getattr(expected, name))
+
+        # Nothing to combine: a clear error rather than a traceback
+        with pytest.raises(SystemExit) as exit_info:
+            bingo_registry.main(['--registry', str(tmp_path / 'runs.db'), 'combine', '--card-length', '7'])
+        assert exit_info.value.code == 1
+
+        # The csv files of a run hold its base counters only: the others are not partially counted
+        bingo_results.export_csv(sims[2, 0, 300].stats, str(tmp_path / 'tries.csv'),
+                                 str(tmp_path / 'num_bingo.csv'))
+        assert registry.add_csv(str(tmp_path / 'tries.csv'), str(tmp_path / 'num_bingo.csv')) == run_ids[2]
+        csv_sim = BingoSimulator(200, seed=4)
+        csv_sim.play_bingo(False, ENGINE_RANK, 100)
+        bingo_results.export_csv(csv_sim.stats, str(tmp_path / 'tries.csv'), str(tmp_path / 'num_bingo.csv'))
+        csv_run_id = registry.add_csv(str(tmp_path / 'tries.csv'), str(tmp_path / 'num_bingo.csv'))
+        csv_runs = [run for run in registry.find_runs(card_length=5) if run['run_id'] in (run_ids[2], csv_run_id)]
+        combined = registry.get_combined_stats(csv_runs)
+        assert combined.num_simulations == 500
+        assert np.array_equal(combined.tries, (csv_sim.stats + sims[2, 0, 300].stats).tries)
+        assert combined.tie_matrix is None and combined.recorded_counters == bingo_registry.BASE_COUNTERS
+
+        with pytest.raises(ValueError):
+            registry.combine(card_length=5)
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_histo_stats_are_memoized_and_leave_the_frame_alone(monkeypatch):
+    pytest.importorskip('plotly')
+    pytest.importorskip('scipy')
+    from bingo_simulator import plot_bingo
+    monkeypatch.setattr(plot_bingo, 'HISTO_STATS_CACHE', {})
+
+    sim = BingoSimulator(5000, seed=3)
+    sim.play_bingo(False, ENGINE_RANK)
+    df_tries = sim.stats.df_tries
+    df_before = df_tries.copy()
+
+    plot_bingo.plot_bingo_histo(df_tries, plot_offline=False)
+    assert list(df_tries.columns) == list(df_before.columns)
+    assert df_tries.equals(df_before)
+
+    # An equal frame reuses the statistics of the plot instead of fitting the curve again
+    histo_stats = plot_bingo.get_histo_stats(df_tries.copy())
+    assert list(plot_bingo.HISTO_STATS_CACHE.values()) == [histo_stats]
+    assert plot_bingo.get_histo_stats(df_before) is histo_stats
+    assert histo_stats['num_simulations'] == 5000
+
+    monkeypatch.setattr(plot_bingo, 'HISTO_STATS_CACHE_SIZE', 3)
+    for scale in range(2, 7):
+        plot_bingo.get_histo_stats(df_tries * scale)
+    assert len(plot_bingo.HISTO_STATS_CACHE) == 3
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('card_length, column_range', [(3, 5), (5, 15), (7, 18)])
+def test_histo_plots_every_row_and_column(card_length, column_range):
+    pytest.importorskip('plotly')
+    pytest.importorskip('scipy')
+    from bingo_simulator import plot_bingo
+
+    geometry = get_geometry(card_length, column_range)
+    sim = BingoSimulator(2000, seed=5, geometry=geometry)
+    sim.play_bingo(False, ENGINE_RANK)
+    histo_stats = plot_bingo.get_histo_stats(sim.stats.df_tries)
+
+    fig = plot_bingo.plot_bingo_histo(sim.stats.df_tries, "Large", plot_offline=False, geometry=geometry)
+    names = [trace.name for trace in fig.data]
+    assert names[:-2] == (['Corners', 'Diagonal 2', 'Diagonal 1'] +
+                          [f'Column {label}' for label in reversed(geometry.column_labels)] +
+                          [f'Row {i}' for i in range(card_length, 0, -1)])
+    assert sum(sum(trace.y) for trace in fig.data[:-2]) == 2000
+
+    fig = plot_bingo.plot_bingo_histo(sim.stats.df_tries, "Medium", plot_offline=False, geometry=geometry)
+    assert [trace.name for trace in fig.data][:-2] == ['Corners', 'Diagonals', 'Columns', 'Rows']
+
+    # The curve fit starts from, and the equation points at, the data rather than a 5x5 card
+    assert abs(histo_stats['curve_param'][1] - histo_stats['mean']) < histo_stats['std']
+    assert abs(fig.layout.annotations[0].x - (histo_stats['mean'] - histo_stats['std'])) <= 1
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize('patterns, kinds', [(('blackout',), ['Blackout']),
+                                             (('x', 'traditional', 'postage_stamp'),
+                                              ['Rows', 'Columns', 'Diagonals', 'Corners', 'X', 'Postage stamp'])])
+def test_plots_follow_the_win_patterns_played(patterns, kinds):
+    pytest.importorskip('plotly')
+    pytest.importorskip('scipy')
+    from bingo_simulator import plot_bingo
+
+    geometry = get_geometry(patterns=patterns)
+    sim = BingoSimulator(2000, seed=6, geometry=geometry)
+    sim.play_bingo(False, ENGINE_RANK)
+
+    fig = plot_bingo.plot_bingo_histo(sim.stats.df_tries, "Medium", plot_offline=False, geometry=geometry)
+    assert [trace.name for trace in fig.data][:-2] == kinds[::-1]
+    assert sum(sum(trace.y) for trace in fig.data[:-2]) == 2000
+
+    fig = plot_bingo.plot_bingo_pie(sim.stats.df_num_bingo, plot_offline=False, geometry=geometry)
+    detailed, high_level = fig.data
+    assert list(high_level.labels) == [f'<b>{kind}</b>' for kind in kinds]
+    assert sum(high_level.values) == sum(detailed.values) == 2000
+    assert 'N=2,000' in fig.layout.title.text
+    if len(kinds) > 1:
+        assert '<b>Postage stamp 4</b>' in detailed.labels
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def import_dash_app(monkeypatch):
+    # The app imports plot_bingo as a top-level module and loads its dataset from the root folder, as when served
+    for name in ('dash', 'dash_daq', 'plotly', 'scipy'):
+        pytest.importorskip(name)
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(bingo_batch.__file__)))
+    monkeypatch.syspath_prepend(os.path.join(package_root, 'bingo_simulator'))
+    monkeypatch.chdir(package_root)
+    import dash_bingo
+
+    return dash_bingo
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_dash_run_submit_poll_and_lost_job(monkeypatch):
+    dash_bingo = import_dash_app(monkeypatch)
+    manager = bingo_jobs.BingoJobManager(chunk_games=500, executor=ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(dash_bingo, 'job_manager', manager)
+    monkeypatch.setattr(dash_bingo, 'RUN_SIZES', [1000])
+    client = dash_bingo.server.test_client()
+
+    def update_run(changed, job_id, n_clicks=1, n_intervals=None, seed=4):
+        outputs = [('job-id', 'data'), ('job-poll', 'disabled'), ('run-progress', 'children'), ('dataset', 'data')]
+        state = [('run_size', 'value', 1000), ('run_free_cell', 'value', []), ('run_seed', 'value', seed),
+                 ('job-id', 'data', job_id)]
+        body = {'output': '..' + '...'.join(f'{name}.{prop}' for name, prop in outputs) + '..',
+                'outputs': [{'id': name, 'property': prop} for name, prop in outputs],
+                'inputs': [{'id': 'run-button', 'property': 'n_clicks', 'value': n_clicks},
+                           {'id': 'job-poll', 'property': 'n_intervals', 'value': n_intervals}],
+                'state': [{'id': name, 'property': prop, 'value': value} for name, prop, value in state],
+                'changedPropIds': [changed]}
+        response = client.post('/_dash-update-component', json=body)
+        assert response.status_code == 200
+        return json.loads(response.data)['response']
+
+    response = update_run('run-button.n_clicks', None)
+    job_id = response['job-id']['data']
+    manager.wait(job_id)
+
+    response = update_run('job-poll.n_intervals', job_id, n_intervals=1)
+    assert response['job-poll']['disabled'] is True
+    assert '1,000 of 1,000 games' in response['run-progress']['children']
+    dataset = response['dataset']['data']
+    assert dataset in dash_bingo.JOB_FRAMES
+
+    # A job this process does not know (e.g. after a restart) stops the polling instead of failing every poll
+    response = update_run('job-poll.n_intervals', 'unknown', n_intervals=2)
+    assert response['job-poll']['disabled'] is True
+    assert 'lost' in response['run-progress']['children']
+
+    # Beyond the runs the server plays at a time, a new run is refused with a message
+    monkeypatch.setattr(manager, 'max_active_jobs', 0)
+    response = update_run('run-button.n_clicks', job_id, n_clicks=2, seed=5)
+    assert 'Too many simulations' in response['run-progress']['children']
+    assert 'job-id' not in response and 'dataset' not in response
+    manager.shutdown()
+
+    # Job results dropped from the figure data are shown as lost, not as the results on display at start up
+    monkeypatch.setattr(dash_bingo, 'JOB_FRAMES', {})
+    assert dash_bingo.get_display_version(dataset) is None
+    for graph_data in (dash_bingo.update_histo('Small', dataset), dash_bingo.update_pie('Small', None, dataset)):
+        assert graph_data['figure'].layout.annotations[0].text == dash_bingo.LOST_RESULTS_TEXT
+    assert dash_bingo.get_display_version(None) == dash_bingo.dataset_version
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_jobs_drop_old_finished_jobs():
+    manager = bingo_jobs.BingoJobManager(chunk_games=100, executor=ThreadPoolExecutor(max_workers=1),
+                                         max_finished_jobs=2)
+    job_ids = []
+    for seed in range(4):
+        job_ids.append(manager.submit(100, False, seed=seed))
+        manager.wait(job_ids[-1])
+
+    manager.submit(100, False, seed=4)
+    assert list(manager.jobs)[:2] == job_ids[2:]
+    with pytest.raises(KeyError):
+        manager.get_job(job_ids[0])
+    manager.shutdown()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_jobs_cap_active_jobs_and_share_one_pool(monkeypatch):
+    # Concurrent first submits create a single pool
+    pools = []
+    monkeypatch.setattr(bingo_jobs, 'ProcessPoolExecutor',
+                        lambda max_workers: pools.append(ThreadPoolExecutor(max_workers=1)) or pools[-1])
+    manager = bingo_jobs.BingoJobManager(chunk_games=100, max_active_jobs=2)
+    with ThreadPoolExecutor(max_workers=2) as submitters:
+        job_ids = list(submitters.map(lambda seed: manager.submit(100, False, seed=seed), [0, 1]))
+    assert len(pools) == 1
+
+    # Queued behind a blocked worker, the jobs stay active: a third one is refused, the same ones coalesce
+    unblock = threading.Event()
+    for job_id in job_ids:
+        manager.wait(job_id)
+    pools[0].submit(unblock.wait)
+    job_ids = [manager.submit(100, False, seed=seed) for seed in [2, 3]]
+    with pytest.raises(bingo_jobs.JobLimitError):
+        manager.submit(100, False, seed=4)
+    assert manager.submit(100, False, seed=3) == job_ids[1]
+
+    unblock.set()
+    manager.wait(job_ids[0])
+    manager.wait(job_ids[1])
+    manager.wait(manager.submit(100, False, seed=4))
+    manager.shutdown()
+
+
+# -------------------------------------------------------------------------------------------------------------
+
+def test_dash_figures_follow_the_dataset(monkeypatch):
+    dash_bingo = import_dash_app(monkeypatch)
+    df_tries, df_num_bingo = dash_bingo.df, dash_bingo.df_pie
+    version = dash_bingo.dataset_version
+
+    histo_data = dash_bingo.update_histo('Small', None)
+    assert dash_bingo.get_histo_figure(version, 'Small')[0]['dark'] is histo_data['figure']
+
+    sim = BingoSimulator(2000, seed=8)
+    sim.play_bingo(False, ENGINE_RANK)
+    try:
+        dash_bingo.set_dataset(sim.stats.df_tries, sim.stats.df_num_bingo)
+        assert dash_bingo.dataset_version != version
+        assert dash_bingo.get_histo_figure.cache_info().currsize == 0
+        assert dash_bingo.get_pie_figure.cache_info().currsize == 0
+
+        new_histo_data = dash_bingo.update_histo('Small', None)
+        assert new_histo_data['figure'] is not histo_data['figure']
+        assert list(new_histo_data['figure'].data[0].y) == list(sim.stats.df_tries['num_bingo_tries'])
+        pie_data = dash_bingo.update_pie('Small', None, None)
+        assert pie_data['figure'] is dash_bingo.get_pie_figure(dash_bingo.dataset_version, 'Small', None)[0]['dark']
+    finally:
+        dash_bingo.set_dataset(df_tries, df_num_bingo)
+
+    assert dash_bingo.dataset_version == version